@@ -0,0 +1,98 @@
+"""
+Benchmark the audio encoding stage: bytes per second of speech and encoding cost.
+
+Renders ``--utterances`` replies with the synthetic ``sine`` backend (or reads
+WAV files given with ``--wav``) and encodes each with every codec in
+``--codecs``, through ``AudioEncoder``'s process pool exactly as the server
+does. Reports, per codec: bytes per second of speech, the size ratio
+against the WAV the engine produced, and encoding time per second of speech.
+
+Usage:
+    python -m benchmarks.bench_encoding
+    python -m benchmarks.bench_encoding --codecs opus:16000 opus:24000 flac --wav reply1.wav reply2.wav
+"""
+import argparse
+import json
+import sys
+import time
+from pathlib import Path
+from typing import Dict, List
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from src.ai.audio_encoder import AudioEncoder
+from src.ai.audio_format import pcm_to_wav
+from src.ai.tts_backends import SineBackend
+
+REPLIES = [
+    "Hello! How can I help you today?",
+    "I understand. Could you tell me more about what you're looking for?",
+    "Thanks for asking, the trip to the mountains next week sounds like a plan.",
+    "Of course. Let me know if there is anything else I can do for you.",
+]
+
+
+def sine_replies(count: int, sample_rate: int) -> List[bytes]:
+    backend = SineBackend(sample_rate=sample_rate)
+    return [
+        pcm_to_wav(b"".join(backend._render(REPLIES[i % len(REPLIES)])), sample_rate)
+        for i in range(count)
+    ]
+
+
+def run(codec: str, bitrate: int, workers: int, replies: List[bytes]) -> Dict:
+    encoder = AudioEncoder(codec=codec, bitrate=bitrate, workers=workers)
+    encoder.start()
+    try:
+        # Spawn the worker process before timing
+        warm = AudioEncoder(codec=codec, bitrate=bitrate)
+        warm._executor = encoder._executor
+        warm.encode(replies[0])
+        start = time.perf_counter()
+        for reply in replies:
+            encoder.encode(reply)
+        elapsed = time.perf_counter() - start
+    finally:
+        encoder.shutdown()
+    stats = encoder.stats()
+    return {
+        "bytes_per_second": stats["bytes_per_second"],
+        "kbit_per_second": round(stats["bytes_per_second"] * 8 / 1000, 1),
+        "ratio_vs_wav": stats["compression_ratio"],
+        "encode_ms_per_speech_second": round(1000 * elapsed / stats["speech_seconds"], 2),
+        "failed": stats["failed"]
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the audio encoding stage")
+    parser.add_argument("--codecs", nargs="+", default=["opus:16000", "opus:24000", "opus:32000", "vorbis", "flac"],
+                        help="Codecs to compare, as codec or codec:bitrate")
+    parser.add_argument("--utterances", type=int, default=20)
+    parser.add_argument("--sample-rate", type=int, default=16000)
+    parser.add_argument("--workers", type=int, default=1, help="Encoder processes")
+    parser.add_argument("--wav", nargs="*", help="WAV files to encode instead of sine renderings")
+    parser.add_argument("--output", help="Write results as JSON to this file")
+    args = parser.parse_args()
+
+    replies = [Path(path).read_bytes() for path in args.wav] if args.wav else sine_replies(
+        args.utterances, args.sample_rate
+    )
+    wav_bytes = sum(len(reply) for reply in replies)
+    results = {}
+    for spec in args.codecs:
+        codec, _, bitrate = spec.partition(":")
+        results[spec] = run(codec, int(bitrate or 24000), args.workers, replies)
+    report = {
+        "utterances": len(replies),
+        "wav_bytes": wav_bytes,
+        "workers": args.workers,
+        "results": results
+    }
+    print(json.dumps(report, indent=2))
+    if args.output:
+        Path(args.output).write_text(json.dumps(report, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,102 @@
+"""
+Benchmark Dia inference modes: real-time factor and memory for each mode on the same prompts.
+
+Each mode runs in a fresh process so load time and resident memory are not
+skewed by a previously loaded model.
+
+Usage:
+    python -m benchmarks.bench_inference_modes --modes float32 bfloat16 int8 --threads 4
+"""
+import argparse
+import json
+import multiprocessing
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+PROMPTS = [
+    "Hi, I'm Dia, your voice assistant. How can I help you today?",
+    "Got it. Could you tell me more about what you're looking for?",
+    "You're welcome! Is there anything else I can help you with?",
+]
+
+
+def run_mode(mode, threads, interop_threads, use_torch_compile, repeats, results):
+    """Load the model in ``mode`` and time generation of every prompt."""
+    from src.ai.dia_agent import DiaAgent, SAMPLE_RATE
+    from src.ai.inference import InferenceOptions
+    from src.ai.model_manager import ModelManager, resident_memory
+
+    options = InferenceOptions(
+        mode=mode,
+        num_threads=threads,
+        interop_threads=interop_threads,
+        use_torch_compile=use_torch_compile
+    )
+    manager = ModelManager(options=options)
+    agent = DiaAgent(model_manager=manager)
+
+    synth_seconds = 0.0
+    audio_seconds = 0.0
+    for _ in range(repeats):
+        for prompt in PROMPTS:
+            start = time.perf_counter()
+            audio = agent.generate_batch([prompt])[0]
+            synth_seconds += time.perf_counter() - start
+            if audio is not None:
+                audio_seconds += len(audio) / SAMPLE_RATE
+
+    stats = manager.stats()
+    results.put({
+        "mode": mode,
+        "threads": threads,
+        "torch_compile": use_torch_compile,
+        "load_seconds": stats["load_seconds"],
+        "synth_seconds": synth_seconds,
+        "audio_seconds": audio_seconds,
+        "real_time_factor": synth_seconds / audio_seconds if audio_seconds else None,
+        "load_rss_delta_mib": stats["load_rss_delta_bytes"] / 2**20,
+        "rss_mib": resident_memory() / 2**20
+    })
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--modes", nargs="+", default=["float32", "bfloat16", "int8"])
+    parser.add_argument("--threads", type=int, default=None, help="torch intra-op threads")
+    parser.add_argument("--interop-threads", type=int, default=None, help="torch inter-op threads")
+    parser.add_argument("--torch-compile", action="store_true")
+    parser.add_argument("--repeats", type=int, default=1)
+    parser.add_argument("--output", help="Write results as JSON to this file")
+    args = parser.parse_args()
+
+    context = multiprocessing.get_context("spawn")
+    results = []
+    for mode in args.modes:
+        queue = context.Queue()
+        process = context.Process(
+            target=run_mode,
+            args=(mode, args.threads, args.interop_threads, args.torch_compile, args.repeats, queue)
+        )
+        process.start()
+        process.join()
+        if process.exitcode != 0:
+            print(f"{mode}: failed (exit code {process.exitcode})")
+            continue
+        result = queue.get()
+        results.append(result)
+        rtf = result["real_time_factor"]
+        print(
+            f"{mode:>9}: RTF {rtf:.2f}  load {result['load_seconds']:.1f}s  "
+            f"model +{result['load_rss_delta_mib']:.0f} MiB  RSS {result['rss_mib']:.0f} MiB"
+            if rtf is not None else f"{mode:>9}: no audio generated"
+        )
+
+    if args.output:
+        Path(args.output).write_text(json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+    main()
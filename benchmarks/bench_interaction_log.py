@@ -0,0 +1,99 @@
+"""
+Benchmark the interaction log and the dashboard's incremental aggregation.
+
+Records ``--events`` interactions through ``InteractionLog`` at full speed
+and reports:
+
+- record:    time ``record`` takes on the event loop (the request path's cost)
+- write:     events per second the background writer sustains, and how many
+             flushes and segments that took
+- dashboard: time for ``InteractionMetrics.update`` to aggregate the whole
+             history from scratch, against an update that only reads the
+             last ``--new`` events (what a dashboard refresh costs)
+
+Usage:
+    python -m benchmarks.bench_interaction_log
+    python -m benchmarks.bench_interaction_log --events 1000000 --output interactions.json
+"""
+import argparse
+import asyncio
+import json
+import random
+import sys
+import tempfile
+import time
+from pathlib import Path
+from typing import Dict
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from benchmarks.load_test import summarize
+from src.interaction_log import SENTIMENTS, InteractionLog, InteractionMetrics
+
+
+async def write(log: InteractionLog, events: int, rng: random.Random) -> Dict:
+    latencies = []
+    log.start()
+    start = time.perf_counter()
+    for number in range(events):
+        sentiment = rng.choice(SENTIMENTS)
+        began = time.perf_counter()
+        log.record(
+            id=f"m{number}", session_id=f"s{number % 500}", worker=None, input="text",
+            sentiment=sentiment, sentiment_score=round(rng.uniform(-1, 1), 3),
+            response_ms=round(rng.uniform(1, 20), 2)
+        )
+        latencies.append(time.perf_counter() - began)
+        # Yield like a server between messages, so the writer can run
+        if number % 100 == 0:
+            await asyncio.sleep(0)
+    await log.stop()
+    elapsed = time.perf_counter() - start
+    return {
+        "record": summarize(latencies),
+        "events_per_s": round(events / elapsed),
+        **{name: log.stats()[name] for name in ("written", "dropped", "flushes", "segments", "bytes_written")}
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the interaction log and dashboard aggregation")
+    parser.add_argument("--events", type=int, default=200000)
+    parser.add_argument("--new", type=int, default=1000, help="Events appended before the incremental update")
+    parser.add_argument("--segment-mb", type=float, default=8.0)
+    parser.add_argument("--output", help="Write results as JSON to this file")
+    args = parser.parse_args()
+
+    rng = random.Random(7)
+    with tempfile.TemporaryDirectory() as directory:
+        log = InteractionLog(directory, segment_bytes=int(args.segment_mb * 2 ** 20),
+                             max_pending=args.events)
+        writing = asyncio.run(write(log, args.events, rng))
+
+        metrics = InteractionMetrics(directory)
+        start = time.perf_counter()
+        metrics.update()
+        full_s = time.perf_counter() - start
+
+        asyncio.run(write(InteractionLog(directory), args.new, rng))
+        start = time.perf_counter()
+        added = metrics.update()
+        metrics.snapshot()
+        incremental_s = time.perf_counter() - start
+
+    report = {
+        "events": args.events,
+        "write": writing,
+        "dashboard": {
+            "full_update_s": round(full_s, 3),
+            "incremental_update_ms": round(incremental_s * 1000, 2),
+            "incremental_events": added
+        }
+    }
+    print(json.dumps(report, indent=2))
+    if args.output:
+        Path(args.output).write_text(json.dumps(report, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,165 @@
+"""
+Benchmark the cost of hot-path logging on the thread that handles messages.
+
+Replays the log calls made while handling one WebSocket message and
+reports messages per second and per-message logging latency on the calling
+thread for three setups:
+
+- legacy:     synchronous ``StreamHandler`` with the original per-message
+              INFO lines, including the payload and the full response dict
+- queued:     the same calls through the queue handler and background writer
+- structured: the current calls (one structured INFO record per message,
+              payload lines at DEBUG and dropped) through the queue handler
+
+Output goes to ``--sink`` (default: a temporary file). ``--sink-delay-us``
+adds a delay per write to model a slow terminal or a full pipe, which is
+where a synchronous handler stalls the event loop.
+
+Usage:
+    python -m benchmarks.bench_logging --messages 20000
+    python -m benchmarks.bench_logging --messages 5000 --sink-delay-us 50
+"""
+import argparse
+import json
+import logging
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from src.logging_setup import PAYLOAD, TEXT_FORMAT, bind, configure_logging, shutdown_logging
+
+MODES = ("legacy", "queued", "structured")
+
+TEXT = "Can you tell me more about the weather today in the mountains?"
+RESPONSE = "I understand. Could you tell me more about what you're looking for?"
+AUDIO_PATH = "tts_3f0c2a9d41b7e6a85c1d0e2f4a6b8c9d.wav"
+
+
+class SlowStream:
+    """File wrapper that sleeps on every write, like a terminal that cannot keep up."""
+
+    def __init__(self, stream, delay: float):
+        self.stream = stream
+        self.delay = delay
+
+    def write(self, text):
+        time.sleep(self.delay)
+        return self.stream.write(text)
+
+    def flush(self):
+        self.stream.flush()
+
+
+def legacy_calls(main_logger, agent_logger, backend_logger):
+    data = json.dumps({"text": TEXT, "require_audio": True})
+    main_logger.info("Waiting for message...")
+    main_logger.info(f"Received message: {data}")
+    main_logger.info(f"Processing message: {TEXT}")
+    agent_logger.info(f"Processing message: {TEXT[:50]}...")
+    agent_logger.info(f"Generated response: {RESPONSE[:50]}...")
+    main_logger.info(f"Generated response: {RESPONSE}")
+    main_logger.info("Generating speech...")
+    backend_logger.info(f"Serving cached speech: {AUDIO_PATH}")
+    main_logger.info(f"Speech generated successfully: {AUDIO_PATH}")
+    response = {"text": RESPONSE, "sentiment": "neutral", "audio_path": AUDIO_PATH,
+                "error": None, "busy": False}
+    main_logger.info(f"Sending response: {response}")
+    main_logger.info("Response sent successfully")
+
+
+def structured_calls(main_logger, agent_logger, backend_logger, index: int):
+    data = json.dumps({"text": TEXT, "require_audio": True})
+    bind(request_id=f"{index:016x}")
+    main_logger.debug(f"Received message: {data}", extra=PAYLOAD)
+    agent_logger.debug(f"Processing message: {TEXT[:50]}...", extra=PAYLOAD)
+    agent_logger.debug(f"Generated response: {RESPONSE[:50]}...", extra=PAYLOAD)
+    backend_logger.debug(f"Serving cached speech: {AUDIO_PATH}")
+    main_logger.info("Message handled", extra={"fields": {
+        "sentiment": "neutral", "audio_path": AUDIO_PATH, "busy": False, "error": None,
+        "duration_ms": 1.23
+    }})
+
+
+def run(mode: str, messages: int, sink, queue_size: int):
+    root = logging.getLogger()
+    for handler in list(root.handlers):
+        root.removeHandler(handler)
+    runtime = None
+    if mode == "legacy":
+        handler = logging.StreamHandler(sink)
+        handler.setFormatter(logging.Formatter(TEXT_FORMAT))
+        root.addHandler(handler)
+        root.setLevel(logging.INFO)
+    else:
+        runtime = configure_logging(level="INFO", json_format=mode == "structured",
+                                    log_payloads=False, queue_size=queue_size, stream=sink)
+    bind(session_id="bench-session")
+    loggers = [logging.getLogger(name) for name in ("src.main", "src.ai.dia_model", "src.ai.tts_backends")]
+
+    latencies = []
+    start = time.perf_counter()
+    for index in range(messages):
+        began = time.perf_counter()
+        if mode == "structured":
+            structured_calls(*loggers, index)
+        else:
+            legacy_calls(*loggers)
+        latencies.append(time.perf_counter() - began)
+    elapsed = time.perf_counter() - start
+
+    stats = runtime.stats() if runtime is not None else {}
+    drain_start = time.perf_counter()
+    if runtime is not None:
+        shutdown_logging()
+    else:
+        root.removeHandler(root.handlers[0])
+    drain = time.perf_counter() - drain_start
+    latencies.sort()
+    return {
+        "messages_per_s": round(messages / elapsed, 1),
+        "latency_us": {
+            "p50": round(latencies[len(latencies) // 2] * 1e6, 2),
+            "p99": round(latencies[int(len(latencies) * 0.99)] * 1e6, 2),
+            "max": round(latencies[-1] * 1e6, 2)
+        },
+        "drain_s": round(drain, 3),
+        "dropped": stats.get("dropped_queue_full", 0)
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark hot-path logging")
+    parser.add_argument("--messages", type=int, default=20000)
+    parser.add_argument("--modes", nargs="+", default=list(MODES), choices=MODES)
+    parser.add_argument("--sink", help="File to write log records to (default: a temporary file)")
+    parser.add_argument("--sink-delay-us", type=float, default=0.0,
+                        help="Simulated delay per write to the sink, in microseconds")
+    parser.add_argument("--queue-size", type=int, default=100000)
+    parser.add_argument("--output", help="Write results as JSON to this file")
+    args = parser.parse_args()
+
+    results = {}
+    for mode in args.modes:
+        with open(args.sink, "a") if args.sink else tempfile.TemporaryFile("w+") as sink:
+            stream = SlowStream(sink, args.sink_delay_us / 1e6) if args.sink_delay_us else sink
+            results[mode] = run(mode, args.messages, stream, args.queue_size)
+    report = {
+        "messages": args.messages,
+        "sink_delay_us": args.sink_delay_us,
+        "results": results
+    }
+    if "legacy" in results:
+        base = results["legacy"]["messages_per_s"]
+        report["speedup_vs_legacy"] = {
+            mode: round(result["messages_per_s"] / base, 2) for mode, result in results.items()
+        }
+    print(json.dumps(report, indent=2))
+    if args.output:
+        Path(args.output).write_text(json.dumps(report, indent=2))
+
+
+if __name__ == "__main__":
+    main()
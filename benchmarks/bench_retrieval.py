@@ -0,0 +1,152 @@
+"""
+Benchmark local knowledge retrieval on a synthetic corpus.
+
+Writes ``--passages`` passages of Zipf-distributed words, spread over
+``--documents`` files in a temporary folder, and reports:
+
+- build:       full index build time and index size on disk
+- load:        time for a second ``KnowledgeBase`` (another worker) to find
+               the index up to date and map it
+- query:       latency of ``answer`` for queries made of a few content words
+               (outside the ``--common`` most frequent) of a random passage,
+               and how often that passage ranks first
+- incremental: rebuild time after ``--changed`` percent of the documents
+               are rewritten, against the full build
+
+Usage:
+    python -m benchmarks.bench_retrieval
+    python -m benchmarks.bench_retrieval --passages 20000 --queries 500 --output retrieval.json
+"""
+import argparse
+import json
+import sys
+import tempfile
+import time
+from pathlib import Path
+from typing import Dict, List
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+import numpy as np
+
+from benchmarks.load_test import summarize
+from src.ai.retrieval import KnowledgeBase
+
+
+def vocabulary(size: int, rng: np.random.Generator) -> List[str]:
+    letters = np.array(list("abcdefghijklmnopqrstuvwxyz"))
+    words = set()
+    while len(words) < size:
+        words.add("".join(rng.choice(letters, rng.integers(4, 10))))
+    return sorted(words)
+
+
+def passage(words: List[str], rng: np.random.Generator, length: int) -> str:
+    ranks = np.minimum(rng.zipf(1.2, length), len(words)) - 1
+    return " ".join(words[rank] for rank in ranks) + "."
+
+
+def write_corpus(directory: Path, passages: int, documents: int, words: List[str],
+                 rng: np.random.Generator, length: int) -> List[List[str]]:
+    per_document = passages // documents
+    corpus = []
+    for number in range(documents):
+        texts = [passage(words, rng, length) for _ in range(per_document)]
+        (directory / f"doc-{number:05d}.txt").write_text("\n\n".join(texts))
+        corpus.append(texts)
+    return corpus
+
+
+def dir_size(directory: Path) -> int:
+    return sum(path.stat().st_size for path in directory.rglob("*") if path.is_file())
+
+
+def bench_queries(knowledge: KnowledgeBase, corpus: List[List[str]], queries: int, terms: int,
+                  common: set, rng: np.random.Generator) -> Dict:
+    latencies = []
+    hits = 0
+    for _ in range(queries):
+        texts = corpus[rng.integers(len(corpus))]
+        target = texts[rng.integers(len(texts))]
+        words = sorted(set(target.rstrip(".").split()) - common) or target.rstrip(".").split()
+        query = " ".join(rng.choice(words, min(terms, len(words)), replace=False))
+        start = time.perf_counter()
+        answer = knowledge.answer(query)
+        latencies.append(time.perf_counter() - start)
+        hits += answer == target
+    return {"latency": summarize(latencies), "top1_accuracy": round(hits / queries, 3)}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark local knowledge retrieval")
+    parser.add_argument("--passages", type=int, default=100000)
+    parser.add_argument("--documents", type=int, default=1000)
+    parser.add_argument("--passage-length", type=int, default=60, help="Words per passage")
+    parser.add_argument("--vocabulary", type=int, default=50000)
+    parser.add_argument("--queries", type=int, default=2000)
+    parser.add_argument("--query-terms", type=int, default=4, help="Words of the target passage per query")
+    parser.add_argument("--common", type=int, default=100,
+                        help="Most frequent words, which queries leave out like stopwords")
+    parser.add_argument("--changed", type=float, default=1.0, help="Percent of documents rewritten")
+    parser.add_argument("--seed", type=int, default=7)
+    parser.add_argument("--output", help="Write results as JSON to this file")
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(args.seed)
+    words = vocabulary(args.vocabulary, rng)
+    with tempfile.TemporaryDirectory() as root:
+        documents_dir = Path(root) / "docs"
+        index_dir = Path(root) / "index"
+        documents_dir.mkdir()
+        corpus = write_corpus(documents_dir, args.passages, args.documents, words, rng, args.passage_length)
+
+        knowledge = KnowledgeBase(str(documents_dir), str(index_dir), min_score=0.0, refresh_interval=0)
+        start = time.perf_counter()
+        knowledge.refresh()
+        build_s = time.perf_counter() - start
+
+        start = time.perf_counter()
+        worker = KnowledgeBase(str(documents_dir), str(index_dir), min_score=0.0, refresh_interval=0)
+        worker.refresh()
+        load_s = time.perf_counter() - start
+
+        queries = bench_queries(worker, corpus, args.queries, args.query_terms,
+                                set(words[:args.common]), rng)
+
+        changed = max(1, int(args.documents * args.changed / 100))
+        for number in rng.choice(args.documents, changed, replace=False):
+            texts = [passage(words, rng, args.passage_length) for _ in corpus[number]]
+            (documents_dir / f"doc-{number:05d}.txt").write_text("\n\n".join(texts))
+            corpus[number] = texts
+        start = time.perf_counter()
+        knowledge.refresh()
+        incremental_s = time.perf_counter() - start
+
+        report = {
+            "config": {
+                "passages": len(knowledge),
+                "documents": args.documents,
+                "passage_length": args.passage_length,
+                "queries": args.queries,
+                "query_terms": args.query_terms
+            },
+            "build": {
+                "elapsed_s": round(build_s, 2),
+                "terms": knowledge.stats()["terms"],
+                "index_mb": round(dir_size(index_dir) / 2 ** 20, 1)
+            },
+            "load_s": round(load_s, 4),
+            "query": queries,
+            "incremental": {
+                "changed_documents": changed,
+                "elapsed_s": round(incremental_s, 2),
+                "speedup_vs_full": round(build_s / incremental_s, 1)
+            }
+        }
+    print(json.dumps(report, indent=2))
+    if args.output:
+        Path(args.output).write_text(json.dumps(report, indent=2))
+
+
+if __name__ == "__main__":
+    main()
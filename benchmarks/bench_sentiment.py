@@ -0,0 +1,123 @@
+"""
+Benchmark the sentiment stage: latency added per message at a fixed arrival rate.
+
+Messages arrive open-loop at ``--rate`` messages per second (default 200)
+and go through ``SentimentStage`` exactly as they do in ``/ws``. The added
+latency is measured from arrival to result. A share of the messages repeat
+earlier ones, so the cache is exercised. The process is pinned to one core
+where the platform allows it. Also reports raw batch scoring throughput.
+
+Usage:
+    python -m benchmarks.bench_sentiment --rate 200 --seconds 10
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from src.ai.sentiment import DEFAULT_LEXICON_PATH, SentimentAnalyzer, SentimentStage
+
+FILLER = (
+    "i the a to and my it is was this that you for on with have can about "
+    "today order team meeting weather trip help please really so very just"
+).split()
+
+BUDGET_MS = 5.0
+
+
+def make_messages(count: int, repeat_ratio: float, seed: int):
+    """Random utterances mixing filler, lexicon words and negators."""
+    rng = random.Random(seed)
+    lexicon = json.loads(DEFAULT_LEXICON_PATH.read_text())
+    words = list(lexicon["words"]) + lexicon["negators"][:4]
+    messages = []
+    for _ in range(count):
+        if messages and rng.random() < repeat_ratio:
+            messages.append(rng.choice(messages))
+            continue
+        length = rng.randint(3, 25)
+        messages.append(" ".join(
+            rng.choice(words) if rng.random() < 0.2 else rng.choice(FILLER)
+            for _ in range(length)
+        ))
+    return messages
+
+
+def percentile(values, p):
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(p / 100 * len(ordered)))]
+
+
+async def run_stage(messages, rate: float, batch_size: int):
+    stage = SentimentStage(SentimentAnalyzer.from_file(), max_batch_size=batch_size)
+    latencies = []
+
+    async def one(text):
+        arrived = time.perf_counter()
+        await stage.analyze(text)
+        latencies.append(time.perf_counter() - arrived)
+
+    tasks = []
+    start = time.perf_counter()
+    for index, text in enumerate(messages):
+        # Open-loop arrivals: the schedule does not wait for earlier results
+        delay = start + index / rate - time.perf_counter()
+        if delay > 0:
+            await asyncio.sleep(delay)
+        tasks.append(asyncio.ensure_future(one(text)))
+    await asyncio.gather(*tasks)
+    stats = stage.stats()
+    await stage.close()
+    return latencies, stats
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the sentiment stage")
+    parser.add_argument("--rate", type=float, default=200.0, help="Messages per second")
+    parser.add_argument("--seconds", type=float, default=10.0, help="Duration of the run")
+    parser.add_argument("--repeat-ratio", type=float, default=0.3, help="Share of repeated messages")
+    parser.add_argument("--batch-size", type=int, default=64)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", help="Write results as JSON to this file")
+    args = parser.parse_args()
+
+    if hasattr(os, "sched_setaffinity"):
+        os.sched_setaffinity(0, {min(os.sched_getaffinity(0))})
+
+    messages = make_messages(int(args.rate * args.seconds), args.repeat_ratio, args.seed)
+    latencies, stats = asyncio.run(run_stage(messages, args.rate, args.batch_size))
+
+    analyzer = SentimentAnalyzer.from_file(cache_size=0)
+    unique = list(dict.fromkeys(messages))
+    start = time.perf_counter()
+    analyzer.analyze_batch(unique)
+    batch_seconds = time.perf_counter() - start
+
+    p99 = percentile(latencies, 99) * 1000
+    report = {
+        "messages": len(messages),
+        "rate_msg_s": args.rate,
+        "added_latency_ms": {
+            "p50": round(percentile(latencies, 50) * 1000, 3),
+            "p95": round(percentile(latencies, 95) * 1000, 3),
+            "p99": round(p99, 3),
+            "max": round(max(latencies) * 1000, 3)
+        },
+        "within_budget": p99 < BUDGET_MS,
+        "cache_hit_ratio": round(stats["hit_ratio"], 3),
+        "mean_batch_size": round(stats["mean_batch_size"], 2),
+        "batch_scoring_us_per_msg": round(batch_seconds / len(unique) * 1e6, 2)
+    }
+    print(json.dumps(report, indent=2))
+    if args.output:
+        Path(args.output).write_text(json.dumps(report, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,164 @@
+"""
+Benchmark server-side speech input: VAD throughput and end-of-speech latency.
+
+Two measurements:
+
+- vad:        how much faster than real time ``EnergyVAD`` segments a stream
+              of speech and pauses fed in 20 ms chunks
+- end_to_end: ``--clients`` WebSocket clients stream utterances as PCM, paced
+              like a live microphone (``--speed`` > 1 sends faster), to an
+              in-process server using the synthetic ``tones`` recognizer. For
+              each utterance it reports the time from the last frame of speech
+              sent to the final ``transcript`` and to the ``text`` reply. The
+              VAD hangover (``VAD_HANGOVER_MS``) is part of both, since the
+              end of an utterance is only known after that much silence.
+
+Usage:
+    python -m benchmarks.bench_speech_input --clients 4 --utterances 5
+    python -m benchmarks.bench_speech_input --clients 8 --hangover-ms 200 --output speech.json
+"""
+import argparse
+import asyncio
+import json
+import sys
+import time
+from pathlib import Path
+from typing import Dict, List
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+import websockets
+
+from benchmarks.load_test import start_server, summarize
+from src import config
+from src.ai.speech_input import EnergyVAD
+from src.ai.tts_backends import SineBackend
+
+SAMPLE_RATE = 16000
+CHUNK_BYTES = 2 * SAMPLE_RATE * 20 // 1000
+
+UTTERANCES = [
+    "hello there", "what is the weather", "thanks for the help",
+    "tell me about the mountains", "good morning", "see what i mean",
+]
+
+
+def render(text: str) -> bytes:
+    return b"".join(SineBackend(sample_rate=SAMPLE_RATE)._render(text))
+
+
+def chunks(pcm: bytes) -> List[bytes]:
+    return [pcm[start:start + CHUNK_BYTES] for start in range(0, len(pcm), CHUNK_BYTES)]
+
+
+def bench_vad(seconds: float, hangover_ms: float) -> Dict:
+    speech = b"".join(render(text) + bytes(SAMPLE_RATE) for text in UTTERANCES)
+    stream = chunks(speech * max(1, int(seconds / (len(speech) / 2 / SAMPLE_RATE))))
+    vad = EnergyVAD(sample_rate=SAMPLE_RATE, hangover_ms=hangover_ms)
+    start = time.perf_counter()
+    for chunk in stream:
+        vad.feed(chunk)
+    elapsed = time.perf_counter() - start
+    audio_seconds = sum(len(chunk) for chunk in stream) / 2 / SAMPLE_RATE
+    return {
+        "audio_s": round(audio_seconds, 1),
+        "elapsed_s": round(elapsed, 4),
+        "realtime_factor": round(audio_seconds / elapsed, 1),
+        "utterances": vad.utterances
+    }
+
+
+async def speaker(index: int, ws_url: str, utterances: int, speed: float, pause_s: float,
+                  latencies: Dict[str, List[float]], failures: List[str]):
+    async with websockets.connect(ws_url, max_size=None) as ws:
+        await ws.send(json.dumps({"type": "listen", "sample_rate": SAMPLE_RATE, "require_audio": False}))
+        ended: Dict[str, float] = {}
+        texts = [UTTERANCES[(index + n) % len(UTTERANCES)] for n in range(utterances)]
+
+        async def send():
+            interval = 0.02 / speed
+            for number, text in enumerate(texts, 1):
+                for chunk in chunks(render(text)):
+                    await ws.send(chunk)
+                    await asyncio.sleep(interval)
+                ended[f"utterance-{number}"] = time.perf_counter()
+                for chunk in chunks(bytes(int(2 * SAMPLE_RATE * pause_s))):
+                    await ws.send(chunk)
+                    await asyncio.sleep(interval)
+
+        sender = asyncio.create_task(send())
+        replies = 0
+        while replies < utterances:
+            message = json.loads(await ws.recv())
+            now = time.perf_counter()
+            kind = message.get("type")
+            if kind == "transcript":
+                latencies["transcript"].append(now - ended[message["id"]])
+                expected = texts[int(message["id"].split("-")[1]) - 1]
+                if message["text"] != expected:
+                    failures.append(f"{message['text']!r} != {expected!r}")
+            elif kind == "partial":
+                latencies["partials"].append(0.0)
+            elif kind == "text":
+                latencies["reply"].append(now - ended[message["id"]])
+                replies += 1
+            elif kind == "transcript_error":
+                failures.append(message["error"])
+                replies += 1
+        await sender
+
+
+async def bench_end_to_end(base_url: str, clients: int, utterances: int, speed: float,
+                           pause_s: float) -> Dict:
+    latencies: Dict[str, List[float]] = {"transcript": [], "reply": [], "partials": []}
+    failures: List[str] = []
+    start = time.perf_counter()
+    await asyncio.gather(*(
+        speaker(i, base_url.replace("http", "ws", 1) + "/ws", utterances, speed, pause_s, latencies, failures)
+        for i in range(clients)
+    ))
+    return {
+        "elapsed_s": round(time.perf_counter() - start, 2),
+        "partials": len(latencies.pop("partials")),
+        "mismatches": failures,
+        "latency": {stage: summarize(values) for stage, values in latencies.items()}
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark server-side speech input")
+    parser.add_argument("--clients", type=int, default=4, help="Concurrent speaking clients")
+    parser.add_argument("--utterances", type=int, default=5, help="Utterances per client")
+    parser.add_argument("--speed", type=float, default=1.0, help="Send audio this many times faster than real time")
+    parser.add_argument("--pause", type=float, default=0.8, help="Seconds of silence after each utterance")
+    parser.add_argument("--hangover-ms", type=float, default=config.VAD_HANGOVER_MS)
+    parser.add_argument("--stt-workers", type=int, default=config.STT_WORKERS)
+    parser.add_argument("--vad-seconds", type=float, default=600.0, help="Audio fed to the VAD throughput test")
+    parser.add_argument("--output", help="Write results as JSON to this file")
+    args = parser.parse_args()
+
+    config.STT_RECOGNIZER = "tones"
+    config.VAD_HANGOVER_MS = args.hangover_ms
+    config.STT_WORKERS = args.stt_workers
+    config.LOG_LEVEL = "WARNING"
+    base_url = start_server("sine", None, True, 0.0)
+    report = {
+        "config": {
+            "clients": args.clients,
+            "utterances": args.utterances,
+            "speed": args.speed,
+            "hangover_ms": args.hangover_ms,
+            "stt_workers": args.stt_workers
+        },
+        "vad": bench_vad(args.vad_seconds, args.hangover_ms),
+        "end_to_end": asyncio.run(bench_end_to_end(
+            base_url, args.clients, args.utterances, args.speed, args.pause
+        ))
+    }
+    print(json.dumps(report, indent=2))
+    if args.output:
+        Path(args.output).write_text(json.dumps(report, indent=2))
+
+
+if __name__ == "__main__":
+    main()
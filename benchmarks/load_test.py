@@ -0,0 +1,306 @@
+"""
+End-to-end load test for the /ws and /audio endpoints.
+
+Drives N concurrent simulated WebSocket clients through scripted
+conversations and reports throughput plus p50/p95/p99 latency for three
+stages of every exchange:
+
+- text:    message sent -> text reply received
+- audio:   message sent -> audio ready (``audio_ready`` or end of stream received)
+- fetched: message sent -> audio file downloaded from /audio
+
+By default the app is started in-process with the synthetic ``sine`` backend,
+so the benchmark runs offline; pass ``--backend pyttsx3`` for the real engine
+or ``--url`` to target a running server. ``--server-workers N`` serves with
+N worker processes, to measure how throughput scales with cores, and
+``--text-only`` sends ``require_audio: false`` to measure text replies
+alone. Results are written as JSON so runs
+can be compared across commits with ``--compare``.
+
+Usage:
+    python -m benchmarks.load_test --clients 20 --rounds 5 --output results.json
+    python -m benchmarks.load_test --backend pyttsx3 --compare results.json
+"""
+import argparse
+import asyncio
+import atexit
+import json
+import os
+import socket
+import subprocess
+import sys
+import threading
+import time
+from pathlib import Path
+from typing import Dict, List, Optional
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+import httpx
+import websockets
+
+DEFAULT_CONVERSATIONS = [
+    ["Hello!", "Who are you?", "Thanks for the help", "Goodbye"],
+    ["Hi there", "Can you tell me more about the weather today?", "Thank you"],
+    ["Hey", "I need help planning a trip to the mountains next week", "See you"],
+]
+
+STAGES = ("text", "audio", "fetched")
+
+
+def percentile(values: List[float], p: float) -> Optional[float]:
+    """Nearest-rank percentile of ``values`` (None when empty)."""
+    if not values:
+        return None
+    ordered = sorted(values)
+    rank = max(0, min(len(ordered) - 1, int(round(p / 100 * len(ordered) + 0.5)) - 1))
+    return ordered[rank]
+
+
+def summarize(values: List[float]) -> Dict:
+    return {
+        "count": len(values),
+        "p50_ms": _ms(percentile(values, 50)),
+        "p95_ms": _ms(percentile(values, 95)),
+        "p99_ms": _ms(percentile(values, 99)),
+        "max_ms": _ms(max(values) if values else None)
+    }
+
+
+def _ms(seconds: Optional[float]) -> Optional[float]:
+    return round(seconds * 1000, 2) if seconds is not None else None
+
+
+class Results:
+    def __init__(self):
+        self.latencies: Dict[str, List[float]] = {stage: [] for stage in STAGES}
+        self.messages = 0
+        self.errors = 0
+        self.busy = 0
+        self.audio_bytes = 0
+
+
+async def exchange(ws, http: httpx.AsyncClient, text: str, stream_audio: bool, results: Results,
+                   require_audio: bool = True):
+    """Send one message and wait for the complete reply."""
+    sent = time.perf_counter()
+    await ws.send(json.dumps({"text": text, "require_audio": require_audio, "stream_audio": stream_audio}))
+    audio_path = None
+    while True:
+        frame = await ws.recv()
+        now = time.perf_counter()
+        if isinstance(frame, bytes):
+            results.audio_bytes += len(frame)
+            continue
+        message = json.loads(frame)
+        kind = message.get("type")
+        if kind == "text":
+            results.latencies["text"].append(now - sent)
+            if message.get("error"):
+                results.errors += 1
+            if not message.get("audio_pending") and not message.get("audio_stream"):
+                break
+        elif kind == "audio_ready":
+            results.latencies["audio"].append(now - sent)
+            audio_path = message["audio_path"]
+            break
+        elif kind == "audio_end":
+            results.latencies["audio"].append(now - sent)
+            break
+        elif kind == "audio_error":
+            if message.get("busy"):
+                results.busy += 1
+            else:
+                results.errors += 1
+            break
+    results.messages += 1
+
+    if audio_path:
+        response = await http.get(f"/audio/{audio_path}")
+        if response.status_code == 200:
+            results.audio_bytes += len(response.content)
+            results.latencies["fetched"].append(time.perf_counter() - sent)
+        else:
+            results.errors += 1
+
+
+async def client(index: int, base_url: str, conversations, rounds: int, stream_audio: bool,
+                 results: Results, require_audio: bool = True):
+    ws_url = base_url.replace("http", "ws", 1) + "/ws"
+    async with httpx.AsyncClient(base_url=base_url, timeout=60) as http:
+        async with websockets.connect(ws_url, max_size=None) as ws:
+            for round_index in range(rounds):
+                conversation = conversations[(index + round_index) % len(conversations)]
+                for text in conversation:
+                    await exchange(ws, http, text, stream_audio, results, require_audio)
+
+
+async def run_load(base_url: str, clients: int, rounds: int, conversations, stream_audio: bool,
+                   require_audio: bool = True) -> Dict:
+    results = Results()
+    start = time.perf_counter()
+    await asyncio.gather(*(
+        client(i, base_url, conversations, rounds, stream_audio, results, require_audio)
+        for i in range(clients)
+    ))
+    elapsed = time.perf_counter() - start
+    return {
+        "elapsed_s": round(elapsed, 3),
+        "messages": results.messages,
+        "throughput_msg_s": round(results.messages / elapsed, 2) if elapsed else None,
+        "errors": results.errors,
+        "busy": results.busy,
+        "audio_bytes": results.audio_bytes,
+        "audio_bytes_per_message": round(results.audio_bytes / results.messages) if results.messages else None,
+        "latency": {stage: summarize(values) for stage, values in results.latencies.items()}
+    }
+
+
+def start_server(backend: str, workers: Optional[int], use_cache: bool, sine_delay: float,
+                 in_memory: bool = False, server_workers: int = 1, codec: str = "") -> str:
+    """Run the app in a background thread (or worker processes) and return its base URL."""
+    import uvicorn
+    from src import config
+
+    if server_workers > 1:
+        return start_workers(backend, workers, use_cache, sine_delay, in_memory, server_workers, codec)
+    config.TTS_BACKEND = backend
+    config.AUDIO_CODEC = codec
+    config.AUDIO_CACHE_ENABLED = use_cache
+    config.AUDIO_MEMORY_ENABLED = in_memory
+    config.SINE_SECONDS_PER_CHAR = sine_delay
+    if workers:
+        config.TTS_WORKERS = workers
+
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        port = sock.getsockname()[1]
+    server = uvicorn.Server(uvicorn.Config(
+        "src.main:app", host="127.0.0.1", port=port, log_level="warning"
+    ))
+    thread = threading.Thread(target=server.run, daemon=True)
+    thread.start()
+    deadline = time.time() + 30
+    while not server.started:
+        if time.time() > deadline or not thread.is_alive():
+            raise RuntimeError("Server failed to start")
+        time.sleep(0.05)
+    return f"http://127.0.0.1:{port}"
+
+
+def start_workers(backend: str, workers: Optional[int], use_cache: bool, sine_delay: float,
+                  in_memory: bool, server_workers: int, codec: str = "") -> str:
+    """Serve with ``server_workers`` processes; they read their settings from the environment."""
+    from src.serve import WorkerSupervisor
+
+    os.environ.update({
+        "TTS_BACKEND": backend,
+        "AUDIO_CACHE_ENABLED": str(use_cache).lower(),
+        "AUDIO_MEMORY_ENABLED": str(in_memory).lower(),
+        "SINE_SECONDS_PER_CHAR": str(sine_delay),
+        "AUDIO_CODEC": codec,
+        "LOG_LEVEL": "WARNING"
+    })
+    if workers:
+        os.environ["TTS_WORKERS"] = str(workers)
+    supervisor = WorkerSupervisor("127.0.0.1", 0, workers=server_workers, log_level="warning")
+    supervisor.start()
+    atexit.register(supervisor.stop)
+    base_url = f"http://127.0.0.1:{supervisor.port}"
+    deadline = time.time() + 60
+    while True:
+        try:
+            if httpx.get(f"{base_url}/health").status_code == 200:
+                return base_url
+        except httpx.TransportError:
+            pass
+        if time.time() > deadline:
+            supervisor.stop()
+            raise RuntimeError("Workers failed to start")
+        time.sleep(0.2)
+
+
+def git_commit() -> Optional[str]:
+    try:
+        return subprocess.check_output(
+            ["git", "rev-parse", "--short", "HEAD"], stderr=subprocess.DEVNULL, text=True
+        ).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def compare(previous: Dict, current: Dict):
+    """Print the change in throughput and latency against an earlier run."""
+    print(f"\nCompared with {previous.get('commit') or 'previous run'}:")
+    before, after = previous["results"], current["results"]
+    print(f"  throughput_msg_s: {before['throughput_msg_s']} -> {after['throughput_msg_s']}")
+    for stage in STAGES:
+        for key in ("p50_ms", "p95_ms", "p99_ms"):
+            old = before["latency"][stage][key]
+            new = after["latency"][stage][key]
+            if old is None or new is None:
+                continue
+            change = (new - old) / old * 100 if old else 0.0
+            print(f"  {stage:>7} {key}: {old} -> {new} ({change:+.1f}%)")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Load test the /ws and /audio endpoints")
+    parser.add_argument("--clients", type=int, default=10, help="Concurrent WebSocket clients")
+    parser.add_argument("--rounds", type=int, default=3, help="Conversations per client")
+    parser.add_argument("--backend", default="sine", help="TTS backend for the in-process server")
+    parser.add_argument("--tts-workers", type=int, default=None, help="Override TTS_WORKERS")
+    parser.add_argument("--no-cache", action="store_true", help="Disable the audio cache")
+    parser.add_argument("--memory", action="store_true", help="Keep rendered audio in memory")
+    parser.add_argument("--server-workers", type=int, default=1,
+                        help="Worker processes for the in-process server")
+    parser.add_argument("--sine-delay", type=float, default=0.0,
+                        help="Seconds of simulated engine time per character for the sine backend")
+    parser.add_argument("--url", help="Target a running server instead of starting one")
+    parser.add_argument("--script", help="JSON file with a list of conversations (lists of messages)")
+    parser.add_argument("--stream-audio", action="store_true", help="Use the streaming audio mode")
+    parser.add_argument("--codec", default="", help="AUDIO_CODEC for the in-process server (e.g. opus)")
+    parser.add_argument("--text-only", action="store_true", help="Ask for text replies only (no synthesis)")
+    parser.add_argument("--output", help="Write results as JSON to this file")
+    parser.add_argument("--compare", help="Earlier results JSON to compare against")
+    args = parser.parse_args()
+
+    conversations = DEFAULT_CONVERSATIONS
+    if args.script:
+        conversations = json.loads(Path(args.script).read_text())
+
+    base_url = args.url or start_server(
+        args.backend, args.tts_workers, not args.no_cache, args.sine_delay, args.memory,
+        args.server_workers, args.codec
+    )
+    results = asyncio.run(run_load(
+        base_url, args.clients, args.rounds, conversations,
+        args.stream_audio and not args.text_only, not args.text_only
+    ))
+    report = {
+        "commit": git_commit(),
+        "config": {
+            "clients": args.clients,
+            "rounds": args.rounds,
+            "backend": None if args.url else args.backend,
+            "url": args.url,
+            "stream_audio": args.stream_audio,
+            "text_only": args.text_only,
+            "codec": args.codec or None,
+            "audio_cache": not args.no_cache,
+            "audio_memory": args.memory,
+            "server_workers": args.server_workers,
+            "sine_delay": args.sine_delay,
+            "tts_workers": args.tts_workers or os.getenv("TTS_WORKERS")
+        },
+        "results": results
+    }
+    print(json.dumps(report, indent=2))
+    if args.output:
+        Path(args.output).write_text(json.dumps(report, indent=2))
+    if args.compare:
+        compare(json.loads(Path(args.compare).read_text()), report)
+
+
+if __name__ == "__main__":
+    main()
@@ -4,6 +4,7 @@ setup(
     name="conversational_agent",
     version="0.1.0",
     packages=find_packages(),
+    package_data={"src.ai": ["intents.json", "sentiment_lexicon.json"]},
     install_requires=[
         "fastapi>=0.68.0",
         "uvicorn>=0.15.0",
@@ -0,0 +1,55 @@
+"""
+Persistent, content-addressed cache for synthesized audio.
+"""
+import hashlib
+import logging
+from typing import Dict, Optional
+
+from .audio_store import AudioStore
+
+logger = logging.getLogger(__name__)
+
+CACHE_PREFIX = "tts_"
+
+
+class AudioCache(AudioStore):
+    """Audio store keyed by a hash of the text and engine settings.
+
+    Adds hit and miss accounting on top of ``AudioStore``. Entries are
+    evicted least-recently-used first once the cache grows past
+    ``max_bytes``, and once they are older than ``max_age`` seconds.
+    """
+
+    prefix = CACHE_PREFIX
+
+    def __init__(self, directory: str, max_bytes: int = 256 * 1024 * 1024,
+                 max_age: float = 7 * 24 * 3600):
+        super().__init__(directory, max_bytes=max_bytes, max_age=max_age)
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def make_key(text: str, backend: str, **settings) -> str:
+        """Hash the text, the backend and every engine setting that affects the rendered audio."""
+        parts = [backend] + [f"{name}={settings[name]}" for name in sorted(settings)] + [text]
+        return hashlib.sha256("\x1f".join(parts).encode("utf-8")).hexdigest()
+
+    def get(self, key: str) -> Optional[str]:
+        """Return the cached filename for ``key``, or None on a miss."""
+        filename = self.lookup(key)
+        if filename is None:
+            self.misses += 1
+        else:
+            self.hits += 1
+        return filename
+
+    def stats(self) -> Dict:
+        """Return cache size, hit and eviction statistics."""
+        lookups = self.hits + self.misses
+        return {
+            "entries": len(self),
+            **super().stats(),
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_ratio": self.hits / lookups if lookups else 0.0
+        }
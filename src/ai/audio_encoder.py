@@ -0,0 +1,202 @@
+"""
+Transcoding of synthesized speech into compact codecs, in a pool of worker processes.
+
+Engines render uncompressed WAV; before it is stored or served, the
+``AudioEncoder`` turns it into Ogg/Opus or FLAC with soundfile. Encoding is
+CPU-bound, so it runs in separate processes instead of on the TTS threads.
+"""
+import concurrent.futures
+import io
+import logging
+import multiprocessing
+import threading
+import time
+import wave
+from typing import Any, Dict, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+# codec name -> (soundfile format, subtype, container reported by probe_audio)
+CODECS = {
+    "opus": ("OGG", "OPUS", "ogg"),
+    "vorbis": ("OGG", "VORBIS", "ogg"),
+    "flac": ("FLAC", "PCM_16", "flac"),
+}
+
+# Sample rates the Opus encoder accepts; other input is resampled to the next one up
+OPUS_SAMPLE_RATES = (8000, 12000, 16000, 24000, 48000)
+
+# libsndfile maps its compression level linearly onto these Opus bitrates (per channel)
+_OPUS_MIN_BITRATE = 6000
+_OPUS_MAX_BITRATE = 256000
+
+
+def compression_level(codec: str, bitrate: int, channels: int = 1) -> float:
+    """The soundfile ``compression_level`` (0.0-1.0) that gives roughly ``bitrate`` bits/s.
+
+    Only Opus takes a target bitrate; FLAC is lossless and Vorbis is left at
+    its default quality, so both use the fastest setting that still compresses.
+    """
+    if codec != "opus":
+        return 0.5 if codec == "flac" else 0.4
+    top = _OPUS_MAX_BITRATE * channels
+    level = 1.0 - (bitrate - _OPUS_MIN_BITRATE) / (top - _OPUS_MIN_BITRATE)
+    return min(1.0, max(0.0, level))
+
+
+def resample(samples, sample_rate: int, target_rate: int):
+    """Linear-interpolation resampling of an ``(frames, channels)`` int16 array."""
+    import numpy as np
+
+    if sample_rate == target_rate:
+        return samples
+    frames = samples.shape[0]
+    target_frames = int(round(frames * target_rate / sample_rate))
+    source_times = np.arange(frames) / sample_rate
+    target_times = np.arange(target_frames) / target_rate
+    columns = [
+        np.interp(target_times, source_times, samples[:, channel])
+        for channel in range(samples.shape[1])
+    ]
+    return np.stack(columns, axis=1).astype(np.int16)
+
+
+def encode_pcm(pcm: bytes, sample_rate: int, channels: int, codec: str, bitrate: int) -> Tuple[bytes, int]:
+    """Encode 16-bit little-endian PCM; returns the encoded bytes and their sample rate.
+
+    Module-level so it can run in a worker process.
+    """
+    import numpy as np
+    import soundfile as sf
+
+    container, subtype, _ = CODECS[codec]
+    samples = np.frombuffer(pcm, dtype="<i2").reshape(-1, channels)
+    if codec == "opus" and sample_rate not in OPUS_SAMPLE_RATES:
+        target = next((rate for rate in OPUS_SAMPLE_RATES if rate >= sample_rate), OPUS_SAMPLE_RATES[-1])
+        samples = resample(samples, sample_rate, target)
+        sample_rate = target
+    buffer = io.BytesIO()
+    sf.write(buffer, samples, sample_rate, format=container, subtype=subtype,
+             compression_level=compression_level(codec, bitrate, channels))
+    return buffer.getvalue(), sample_rate
+
+
+def read_wav(data: bytes) -> Optional[Tuple[bytes, int, int]]:
+    """Return the PCM frames, sample rate and channels of a 16-bit PCM WAV file, else None."""
+    try:
+        with wave.open(io.BytesIO(data)) as wav:
+            if wav.getsampwidth() != 2 or wav.getcomptype() != "NONE":
+                return None
+            return wav.readframes(wav.getnframes()), wav.getframerate(), wav.getnchannels()
+    except (wave.Error, EOFError):
+        return None
+
+
+class AudioEncoder:
+    def __init__(self, codec: str = "opus", bitrate: int = 24000, workers: int = 1,
+                 timeout: float = 30.0, latency: Any = None):
+        """Transcode rendered WAV audio in a process pool.
+
+        Args:
+            codec: ``opus`` (Ogg/Opus), ``vorbis`` (Ogg/Vorbis) or ``flac``
+            bitrate: Target Opus bitrate in bits per second
+            workers: Encoder processes
+            timeout: Seconds to wait for an encoding before serving the original audio
+            latency: Optional histogram (anything with ``observe(seconds, stage=...)``)
+                recording each encoding under the ``encode`` stage
+
+        Raises:
+            ValueError: If ``codec`` is unknown
+        """
+        if codec not in CODECS:
+            raise ValueError(f"Unknown audio codec '{codec}', expected one of {sorted(CODECS)}")
+        if workers < 1:
+            raise ValueError("workers must be at least 1")
+        self.codec = codec
+        self.bitrate = bitrate
+        self.workers = workers
+        self.timeout = timeout
+        self.latency = latency
+        self.container = CODECS[codec][2]
+        self._executor: Optional[concurrent.futures.ProcessPoolExecutor] = None
+        self._lock = threading.Lock()
+        self.encoded = 0
+        self.failed = 0
+        self.passed_through = 0
+        self.input_bytes = 0
+        self.output_bytes = 0
+        self.speech_seconds = 0.0
+        self.encode_seconds = 0.0
+
+    def settings(self) -> Dict:
+        """Encoder settings that change the output, used in audio cache keys."""
+        return {"codec": self.codec, "bitrate": self.bitrate}
+
+    def start(self):
+        """Start the worker processes (spawned, so they never inherit the server's threads)."""
+        if self._executor is None:
+            self._executor = concurrent.futures.ProcessPoolExecutor(
+                max_workers=self.workers, mp_context=multiprocessing.get_context("spawn")
+            )
+            # Spawn the processes now rather than on the first reply
+            for _ in range(self.workers):
+                self._executor.submit(int)
+            logger.info(f"Started {self.workers} audio encoder processes ({self.codec} at {self.bitrate} bit/s)")
+
+    def shutdown(self):
+        if self._executor is not None:
+            self._executor.shutdown(wait=True, cancel_futures=True)
+            self._executor = None
+
+    def encode(self, data: bytes) -> Tuple[bytes, Optional[int]]:
+        """Encode a WAV payload, blocking until a worker process is done.
+
+        Called from TTS worker threads, never from the event loop. Audio that
+        is not 16-bit PCM WAV (already compressed) is returned unchanged, as
+        is the input when encoding fails, so a broken encoder never costs a
+        reply its audio.
+
+        Returns:
+            The audio and its sample rate (None when returned unchanged)
+        """
+        wav = read_wav(data)
+        if wav is None or self._executor is None:
+            with self._lock:
+                self.passed_through += 1
+            return data, None
+        pcm, sample_rate, channels = wav
+        started = time.perf_counter()
+        try:
+            future = self._executor.submit(encode_pcm, pcm, sample_rate, channels, self.codec, self.bitrate)
+            encoded, encoded_rate = future.result(timeout=self.timeout)
+        except Exception as e:
+            logger.error(f"Failed to encode audio as {self.codec}: {e}")
+            with self._lock:
+                self.failed += 1
+            return data, None
+        elapsed = time.perf_counter() - started
+        if self.latency is not None:
+            self.latency.observe(elapsed, stage="encode")
+        with self._lock:
+            self.encoded += 1
+            self.input_bytes += len(data)
+            self.output_bytes += len(encoded)
+            self.speech_seconds += len(pcm) / (2 * channels * sample_rate)
+            self.encode_seconds += elapsed
+        return encoded, encoded_rate
+
+    def bytes_per_second(self) -> Optional[float]:
+        """Encoded bytes per second of speech so far (None before the first encoding)."""
+        return self.output_bytes / self.speech_seconds if self.speech_seconds else None
+
+    def stats(self) -> Dict:
+        return {
+            "codec": self.codec,
+            "bitrate": self.bitrate,
+            "encoded": self.encoded,
+            "failed": self.failed,
+            "passed_through": self.passed_through,
+            "speech_seconds": round(self.speech_seconds, 3),
+            "bytes_per_second": round(self.bytes_per_second() or 0.0, 1),
+            "compression_ratio": round(self.input_bytes / self.output_bytes, 2) if self.output_bytes else None
+        }
@@ -0,0 +1,107 @@
+"""
+Helpers for identifying the container and codec of rendered audio.
+"""
+import io
+import wave
+from typing import Dict, Optional
+
+# Content types for the containers our TTS engines produce
+MEDIA_TYPES = {
+    "wav": "audio/wav",
+    "aiff": "audio/aiff",
+    "mpeg": "audio/mpeg",
+    "ogg": "audio/ogg",
+    "flac": "audio/flac",
+    "pcm_s16le": "audio/L16",
+}
+
+# File extensions for the same containers
+EXTENSIONS = {
+    "wav": ".wav",
+    "aiff": ".aiff",
+    "mpeg": ".mp3",
+    "ogg": ".ogg",
+    "flac": ".flac",
+}
+
+
+def detect_container(data: bytes) -> Optional[str]:
+    """Identify the audio container from the first bytes of a file."""
+    if data[:4] == b"RIFF" and data[8:12] == b"WAVE":
+        return "wav"
+    if data[:4] == b"FORM" and data[8:12] in (b"AIFF", b"AIFC"):
+        return "aiff"
+    if data[:4] == b"OggS":
+        return "ogg"
+    if data[:4] == b"fLaC":
+        return "flac"
+    if data[:3] == b"ID3" or (len(data) > 1 and data[0] == 0xFF and data[1] & 0xE0 == 0xE0):
+        return "mpeg"
+    return None
+
+
+def media_type_for(data: bytes, default: str = "application/octet-stream") -> str:
+    """Return the HTTP content type for an audio payload."""
+    return MEDIA_TYPES.get(detect_container(data), default)
+
+
+def media_type_for_extension(extension: str, default: str = "application/octet-stream") -> str:
+    """Return the HTTP content type for a file extension such as ``.wav``."""
+    for container, container_extension in EXTENSIONS.items():
+        if container_extension == extension.lower():
+            return MEDIA_TYPES[container]
+    return default
+
+
+def pcm_to_wav(pcm: bytes, sample_rate: int, channels: int = 1) -> bytes:
+    """Wrap 16-bit little-endian PCM frames in a WAV container."""
+    buffer = io.BytesIO()
+    with wave.open(buffer, "wb") as wav:
+        wav.setnchannels(channels)
+        wav.setsampwidth(2)
+        wav.setframerate(sample_rate)
+        wav.writeframes(pcm)
+    return buffer.getvalue()
+
+
+def probe_audio(data: bytes) -> Dict:
+    """Return the container, sample rate and channel count of an audio file.
+
+    Sample rate and channels are only known for WAV; they are None otherwise.
+    """
+    container = detect_container(data)
+    sample_rate = channels = None
+    if container == "wav":
+        try:
+            with wave.open(io.BytesIO(data)) as wav:
+                sample_rate = wav.getframerate()
+                channels = wav.getnchannels()
+        except (wave.Error, EOFError):
+            pass
+    return {"codec": container or "unknown", "sample_rate": sample_rate, "channels": channels}
+
+
+def describe_audio(data: bytes) -> Dict:
+    """Describe an audio payload for streaming to a client.
+
+    16-bit PCM WAV files are unwrapped to raw ``pcm_s16le`` frames, which a
+    browser can schedule for playback as they arrive. Anything else is passed
+    through as its container format.
+
+    Returns:
+        Dict with ``codec``, ``sample_rate``, ``channels`` and ``payload`` keys
+    """
+    container = detect_container(data)
+    if container == "wav":
+        try:
+            with wave.open(io.BytesIO(data)) as wav:
+                if wav.getsampwidth() == 2 and wav.getcomptype() == "NONE":
+                    return {
+                        "codec": "pcm_s16le",
+                        "sample_rate": wav.getframerate(),
+                        "channels": wav.getnchannels(),
+                        "payload": wav.readframes(wav.getnframes())
+                    }
+        except (wave.Error, EOFError):
+            pass
+    return {**probe_audio(data), "payload": data}
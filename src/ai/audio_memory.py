@@ -0,0 +1,162 @@
+"""
+Size-bounded in-memory pool of rendered audio, with an optional disk spill tier.
+"""
+import logging
+import threading
+from collections import OrderedDict
+from typing import Dict, List, Optional, Tuple
+
+from .audio_store import AudioStore
+
+logger = logging.getLogger(__name__)
+
+
+class AudioBufferPool:
+    """LRU of rendered audio buffers served straight from memory.
+
+    Buffers are keyed like the audio cache (a hash of the text and engine
+    settings) and named ``<prefix><key><extension>`` so the same URL works
+    whether the audio is in memory or has been spilled to disk. Buffers
+    evicted to stay under ``max_bytes`` are written to ``spill`` when one is
+    configured and dropped otherwise. With ``write_through``, every buffer is
+    written to ``spill`` as it is added, so other processes can serve it.
+    """
+
+    def __init__(self, max_bytes: int = 64 * 1024 * 1024, max_item_bytes: int = 1024 * 1024,
+                 spill: Optional[AudioStore] = None, prefix: str = "tts_", write_through: bool = False):
+        """Create an empty pool.
+
+        Args:
+            max_bytes: Total size budget for buffers held in memory
+            max_item_bytes: Largest buffer admitted; longer audio goes to disk
+            spill: Store receiving evicted buffers, or None to drop them
+            prefix: Filename prefix, matching the spill store's naming
+            write_through: Also write every buffer to ``spill`` when it is added
+
+        Raises:
+            ValueError: If ``write_through`` is set without a ``spill`` store
+        """
+        if write_through and spill is None:
+            raise ValueError("write_through needs a spill store")
+        self.max_bytes = max_bytes
+        self.max_item_bytes = max_item_bytes
+        self.spill = spill
+        self.write_through = write_through
+        self.prefix = spill.prefix if spill is not None else prefix
+        self.hits = 0
+        self.misses = 0
+        self.spilled = 0
+        self.dropped = 0
+        self._lock = threading.Lock()
+        # key -> (filename, audio), least recently used first
+        self._buffers: "OrderedDict[str, Tuple[str, bytes]]" = OrderedDict()
+        # Evicted buffers still being written to the spill tier
+        self._spilling: Dict[str, Tuple[str, bytes]] = {}
+        self._total_bytes = 0
+
+    @property
+    def total_bytes(self) -> int:
+        return self._total_bytes
+
+    def __len__(self) -> int:
+        return len(self._buffers)
+
+    def admits(self, size: int) -> bool:
+        """Whether audio of ``size`` bytes is held in memory rather than written to disk."""
+        return size <= min(self.max_item_bytes, self.max_bytes)
+
+    def key_for(self, filename: str) -> Optional[str]:
+        if not filename.startswith(self.prefix):
+            return None
+        return filename[len(self.prefix):].split(".", 1)[0] or None
+
+    def get(self, key: str) -> Optional[str]:
+        """Return the filename for ``key`` from memory or the spill tier, or None."""
+        with self._lock:
+            entry = self._buffers.get(key)
+            if entry is not None:
+                self._buffers.move_to_end(key)
+            else:
+                entry = self._spilling.get(key)
+            if entry is not None:
+                self.hits += 1
+                return entry[0]
+        filename = self.spill.lookup(key) if self.spill is not None else None
+        with self._lock:
+            if filename is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+        return filename
+
+    def put(self, key: str, audio: bytes, extension: str) -> str:
+        """Hold ``audio`` in memory and return its filename."""
+        filename = f"{self.prefix}{key}{extension}"
+        if self.write_through:
+            # Written before it is visible in memory, so the disk copy is never missing
+            self.spill.put_bytes(key, audio, extension)
+        with self._lock:
+            previous = self._buffers.pop(key, None)
+            if previous is not None:
+                self._total_bytes -= len(previous[1])
+            self._buffers[key] = (filename, audio)
+            self._total_bytes += len(audio)
+            evicted = self._evict()
+        self._spill(evicted)
+        return filename
+
+    def buffer(self, filename: str) -> Optional[memoryview]:
+        """Return a zero-copy view of a buffer held in memory, or None."""
+        key = self.key_for(filename)
+        with self._lock:
+            entry = self._buffers.get(key)
+            if entry is not None:
+                self._buffers.move_to_end(key)
+            else:
+                entry = self._spilling.get(key)
+            if entry is None or entry[0] != filename:
+                return None
+            return memoryview(entry[1])
+
+    def stats(self) -> Dict:
+        lookups = self.hits + self.misses
+        return {
+            "entries": len(self._buffers),
+            "bytes": self._total_bytes,
+            "max_bytes": self.max_bytes,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_ratio": self.hits / lookups if lookups else 0.0,
+            "spilled": self.spilled,
+            "dropped": self.dropped
+        }
+
+    def _evict(self) -> List[Tuple[str, str, bytes]]:
+        """Pop least recently used buffers until under budget."""
+        evicted = []
+        while self._buffers and self._total_bytes > self.max_bytes:
+            key, (filename, audio) = self._buffers.popitem(last=False)
+            self._total_bytes -= len(audio)
+            evicted.append((key, filename, audio))
+            if self.spill is not None and not self.write_through:
+                self._spilling[key] = (filename, audio)
+        return evicted
+
+    def _spill(self, evicted: List[Tuple[str, str, bytes]]):
+        """Write evicted buffers to the spill tier (outside the pool lock)."""
+        for key, filename, audio in evicted:
+            if self.write_through:
+                # Already on disk
+                continue
+            if self.spill is None:
+                self.dropped += 1
+                continue
+            try:
+                self.spill.put_bytes(key, audio, filename[len(self.prefix) + len(key):])
+                self.spilled += 1
+            except OSError as e:
+                self.dropped += 1
+                logger.error(f"Failed to spill audio buffer {filename}: {e}")
+            finally:
+                with self._lock:
+                    self._spilling.pop(key, None)
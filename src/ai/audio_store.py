@@ -0,0 +1,350 @@
+"""
+Lifecycle management for rendered audio files: index, quota, TTL and a background janitor.
+"""
+import asyncio
+import logging
+import os
+import threading
+import time
+from collections import OrderedDict
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+
+logger = logging.getLogger(__name__)
+
+# Append-only record of the store's contents, kept inside the store directory
+JOURNAL_NAME = ".index"
+
+
+class AudioStore:
+    """Directory of rendered audio files tracked by an in-memory index.
+
+    The index records every file's size, creation and last access time, so
+    enforcing the byte quota and the TTL never requires listing the
+    directory. The index is persisted as an append-only journal that is
+    replayed at startup and compacted by ``sweep()``.
+
+    Files are named ``<prefix><key><extension>``.
+    """
+
+    prefix = "speech_"
+
+    def __init__(self, directory: str, max_bytes: int = 256 * 1024 * 1024,
+                 max_age: float = 24 * 3600):
+        """Open (or create) a store in ``directory``.
+
+        The byte quota is enforced as files are added, least recently used
+        first; expired files are removed by ``sweep()``, which is run
+        periodically by ``AudioJanitor``.
+
+        Args:
+            directory: Directory dedicated to this store
+            max_bytes: Total size budget for stored files
+            max_age: Maximum age of a file in seconds
+        """
+        self.directory = Path(directory)
+        self.directory.mkdir(parents=True, exist_ok=True)
+        self.max_bytes = max_bytes
+        self.max_age = max_age
+        self.evicted_files = 0
+        self.evicted_bytes = 0
+        self.expired_files = 0
+        self.sweeps = 0
+        self._lock = threading.Lock()
+        # key -> (filename, size, created, last_access), oldest access first
+        self._index: "OrderedDict[str, Tuple[str, int, float, float]]" = OrderedDict()
+        self._total_bytes = 0
+        # Keys read since the last sweep; their access times are journaled in bulk
+        self._touched: Set[str] = set()
+        # Files dropped from the index, deleted once the lock is released
+        self._removed: List[str] = []
+        self._journal_path = self.directory / JOURNAL_NAME
+        self._journal_lines = 0
+        self._journal = None
+        self._load_index()
+
+    def filename_for(self, key: str, extension: str = ".mp3") -> str:
+        """Return the filename for ``key``."""
+        return f"{self.prefix}{key}{extension}"
+
+    def key_for(self, filename: str) -> Optional[str]:
+        """Extract the key from a ``<prefix><key>.<ext>`` filename."""
+        if not filename.startswith(self.prefix):
+            return None
+        return filename[len(self.prefix):].split(".", 1)[0] or None
+
+    @property
+    def total_bytes(self) -> int:
+        return self._total_bytes
+
+    def __len__(self) -> int:
+        return len(self._index)
+
+    def lookup(self, key: str) -> Optional[str]:
+        """Return the filename stored under ``key`` and mark it used, or None."""
+        now = time.time()
+        with self._lock:
+            entry = self._index.get(key)
+            if entry is None:
+                return None
+            filename, size, created, _ = entry
+            expired = now - created > self.max_age
+            if expired:
+                self._remove(key, expired=True)
+            else:
+                self._index[key] = (filename, size, created, now)
+                self._index.move_to_end(key)
+                self._touched.add(key)
+        if expired:
+            self._unlink_removed()
+            return None
+        return filename
+
+    def put(self, key: str, source_path: str, extension: Optional[str] = None) -> str:
+        """Move a freshly rendered file into the store and return its filename."""
+        if extension is None:
+            extension = os.path.splitext(source_path)[1]
+        filename = self.filename_for(key, extension)
+        target = self.directory / filename
+        os.replace(source_path, target)
+        self._add(key, filename, target.stat().st_size)
+        return filename
+
+    def put_bytes(self, key: str, data: bytes, extension: str) -> str:
+        """Store rendered audio bytes and return the filename."""
+        filename = self.filename_for(key, extension)
+        target = self.directory / filename
+        # Write under a temporary name so readers never see a partial file
+        partial = target.with_name(f".{filename}.{threading.get_ident()}.partial")
+        partial.write_bytes(data)
+        os.replace(partial, target)
+        self._add(key, filename, len(data))
+        return filename
+
+    def path_for(self, filename: str) -> Optional[Path]:
+        """Return the path of a stored file by name, or None if it is not stored."""
+        key = self.key_for(filename)
+        if key is None:
+            return None
+        with self._lock:
+            entry = self._index.get(key)
+            if entry is None or entry[0] != filename:
+                return None
+            self._index[key] = entry[:3] + (time.time(),)
+            self._index.move_to_end(key)
+            self._touched.add(key)
+        return self.directory / filename
+
+    def sweep(self) -> int:
+        """Remove expired files, enforce the quota and compact the journal.
+
+        Returns:
+            Number of files removed
+        """
+        now = time.time()
+        with self._lock:
+            before = self.evicted_files
+            expired = [key for key, (_, _, created, _) in self._index.items()
+                       if now - created > self.max_age]
+            for key in expired:
+                self._remove(key, expired=True)
+            self._enforce_quota()
+            touched = [(key, self._index[key][3]) for key in self._touched if key in self._index]
+            self._touched.clear()
+            for key, last_access in touched:
+                self._append(f"~\t{key}\t{last_access:.3f}")
+            if self._journal_lines > 2 * len(self._index) + 1024:
+                self._compact()
+            self.sweeps += 1
+            removed = self.evicted_files - before
+        # Deleting files can be slow; lookups only wait for the index update
+        self._unlink_removed()
+        if removed:
+            logger.info(f"Swept {removed} audio files from {self.directory}")
+        return removed
+
+    def stats(self) -> Dict:
+        """Return size and eviction metrics."""
+        return {
+            "files": len(self._index),
+            "bytes": self._total_bytes,
+            "max_bytes": self.max_bytes,
+            "evicted_files": self.evicted_files,
+            "evicted_bytes": self.evicted_bytes,
+            "expired_files": self.expired_files,
+            "sweeps": self.sweeps
+        }
+
+    def close(self):
+        """Flush pending access times and close the journal."""
+        with self._lock:
+            for key in self._touched:
+                if key in self._index:
+                    self._append(f"~\t{key}\t{self._index[key][3]:.3f}")
+            self._touched.clear()
+            if self._journal is not None:
+                self._journal.close()
+                self._journal = None
+
+    # -- Index and journal -------------------------------------------------
+
+    def _add(self, key: str, filename: str, size: int):
+        now = time.time()
+        with self._lock:
+            previous = self._index.get(key)
+            if previous is not None:
+                self._total_bytes -= previous[1]
+                if previous[0] != filename:
+                    self._removed.append(previous[0])
+            self._index[key] = (filename, size, now, now)
+            self._index.move_to_end(key)
+            self._total_bytes += size
+            self._append(f"+\t{key}\t{filename}\t{size}\t{now:.3f}")
+            self._enforce_quota()
+        self._unlink_removed()
+
+    def _enforce_quota(self):
+        while self._index and self._total_bytes > self.max_bytes:
+            self._remove(next(iter(self._index)))
+
+    def _remove(self, key: str, expired: bool = False):
+        filename, size, _, _ = self._index.pop(key)
+        self._total_bytes -= size
+        self._touched.discard(key)
+        self.evicted_files += 1
+        self.evicted_bytes += size
+        if expired:
+            self.expired_files += 1
+        self._append(f"-\t{key}")
+        self._removed.append(filename)
+
+    def _unlink_removed(self):
+        """Delete the files dropped from the index, outside the lock."""
+        with self._lock:
+            removed, self._removed = self._removed, []
+        for filename in removed:
+            self._unlink(filename)
+
+    def _unlink(self, filename: str):
+        try:
+            os.remove(self.directory / filename)
+        except FileNotFoundError:
+            pass
+        except OSError as e:
+            logger.error(f"Failed to remove audio file {filename}: {e}")
+
+    def _append(self, line: str):
+        if self._journal is None:
+            self._journal = open(self._journal_path, "a", encoding="utf-8", buffering=1)
+        self._journal.write(line + "\n")
+        self._journal_lines += 1
+
+    def _compact(self):
+        """Rewrite the journal with one record per live file."""
+        if self._journal is not None:
+            self._journal.close()
+            self._journal = None
+        partial = self._journal_path.with_name(f"{JOURNAL_NAME}.partial")
+        with open(partial, "w", encoding="utf-8") as f:
+            for key, (filename, size, created, last_access) in self._index.items():
+                f.write(f"+\t{key}\t{filename}\t{size}\t{created:.3f}\n")
+                if last_access != created:
+                    f.write(f"~\t{key}\t{last_access:.3f}\n")
+        os.replace(partial, self._journal_path)
+        self._journal_lines = len(self._index)
+
+    def _load_index(self):
+        """Rebuild the index by replaying the journal."""
+        if self._journal_path.exists():
+            entries = self._replay()
+        else:
+            entries = self._scan_legacy()
+        for key, entry in sorted(entries.items(), key=lambda item: item[1][3]):
+            self._index[key] = entry
+            self._total_bytes += entry[1]
+        with self._lock:
+            self._enforce_quota()
+            self._compact()
+        self._unlink_removed()
+        if self._index:
+            logger.info(f"Loaded {len(self._index)} audio files ({self._total_bytes} bytes) from {self.directory}")
+
+    def _replay(self) -> Dict[str, Tuple[str, int, float, float]]:
+        entries: Dict[str, Tuple[str, int, float, float]] = {}
+        with open(self._journal_path, encoding="utf-8") as f:
+            for line in f:
+                fields = line.rstrip("\n").split("\t")
+                try:
+                    if fields[0] == "+":
+                        key, filename, size, created = fields[1], fields[2], int(fields[3]), float(fields[4])
+                        entries[key] = (filename, size, created, created)
+                    elif fields[0] == "-":
+                        entries.pop(fields[1], None)
+                    elif fields[0] == "~" and fields[1] in entries:
+                        entries[fields[1]] = entries[fields[1]][:3] + (float(fields[2]),)
+                except (IndexError, ValueError):
+                    # A torn final line after a crash
+                    continue
+        # Drop records whose file has gone missing
+        return {key: entry for key, entry in entries.items()
+                if (self.directory / entry[0]).exists()}
+
+    def _scan_legacy(self) -> Dict[str, Tuple[str, int, float, float]]:
+        """Index files left by a version without a journal (runs once per directory)."""
+        entries = {}
+        with os.scandir(self.directory) as scan:
+            for item in scan:
+                key = self.key_for(item.name)
+                if key is None or not item.is_file():
+                    continue
+                stat = item.stat()
+                entries[key] = (item.name, stat.st_size, stat.st_mtime, stat.st_atime)
+        return entries
+
+
+class AudioJanitor:
+    def __init__(self, stores: Iterable[AudioStore], interval: float = 60.0):
+        """Periodically sweep ``stores`` in the background.
+
+        Args:
+            stores: Audio stores to keep within their TTL and quota
+            interval: Seconds between sweeps
+        """
+        self.stores: List[AudioStore] = list(stores)
+        self.interval = interval
+        self._task: Optional[asyncio.Task] = None
+
+    def start(self):
+        """Start sweeping on the running event loop."""
+        if self._task is None or self._task.done():
+            self._task = asyncio.get_running_loop().create_task(self._run())
+
+    async def stop(self):
+        """Stop sweeping and flush every store's journal."""
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        for store in self.stores:
+            store.close()
+
+    async def sweep(self) -> int:
+        """Sweep every store once off the event loop."""
+        removed = 0
+        for store in self.stores:
+            try:
+                removed += await asyncio.to_thread(store.sweep)
+            except Exception as e:
+                logger.error(f"Failed to sweep audio store {store.directory}: {e}")
+        return removed
+
+    def stats(self) -> Dict:
+        return {str(store.directory): store.stats() for store in self.stores}
+
+    async def _run(self):
+        while True:
+            await asyncio.sleep(self.interval)
+            await self.sweep()
@@ -0,0 +1,170 @@
+"""
+Micro-batching scheduler that groups concurrent inference requests into one call.
+"""
+import asyncio
+import logging
+import threading
+import time
+from collections import Counter, deque
+from concurrent.futures import Executor, ThreadPoolExecutor
+from typing import Any, Callable, Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+
+class MicroBatcher:
+    def __init__(self, batch_fn: Callable[[List[Any]], List[Any]], max_batch_size: int = 8,
+                 max_wait_ms: float = 20.0, executor: Optional[Executor] = None,
+                 stats_window: int = 1000):
+        """Create a batcher around a function that processes a list of items.
+
+        Requests are collected until ``max_batch_size`` items are waiting or the
+        first waiting item has been queued for ``max_wait_ms``, whichever comes
+        first. Batches run one at a time on ``executor``; requests arriving
+        while a batch runs are collected into the next one.
+
+        Args:
+            batch_fn: Blocking function mapping a list of items to a list of results
+            max_batch_size: Largest batch passed to ``batch_fn``
+            max_wait_ms: Longest time the first item of a batch waits for company
+            executor: Executor running ``batch_fn`` (defaults to a single thread)
+            stats_window: Number of recent requests used for queue wait statistics
+        """
+        if max_batch_size < 1:
+            raise ValueError("max_batch_size must be at least 1")
+        self.batch_fn = batch_fn
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait_ms / 1000
+        self._executor = executor or ThreadPoolExecutor(max_workers=1, thread_name_prefix="batcher")
+        self._queue: Optional[asyncio.Queue] = None
+        self._task: Optional[asyncio.Task] = None
+        self._batch_sizes: Counter = Counter()
+        self._waits = deque(maxlen=stats_window)
+        self._items = 0
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._loop_thread: Optional[threading.Thread] = None
+        self._loop_lock = threading.Lock()
+
+    def start_loop(self):
+        """Run the scheduler on an event loop thread owned by the batcher.
+
+        Needed when requests come from several threads (``submit_threadsafe``)
+        or several event loops: they all meet in the same batches. Must be
+        called before the first ``submit``.
+        """
+        with self._loop_lock:
+            if self._loop is not None:
+                return
+            if self._task is not None:
+                raise RuntimeError("The batcher is already running on another event loop")
+            loop = asyncio.new_event_loop()
+            thread = threading.Thread(target=loop.run_forever, name="batcher-loop", daemon=True)
+            thread.start()
+            self._loop, self._loop_thread = loop, thread
+
+    def submit_threadsafe(self, item: Any, timeout: Optional[float] = None) -> Any:
+        """Blocking ``submit`` for threads outside any event loop, such as synthesis workers."""
+        self.start_loop()
+        return asyncio.run_coroutine_threadsafe(self.submit(item), self._loop).result(timeout)
+
+    async def submit(self, item: Any) -> Any:
+        """Queue ``item`` for the next batch and return its result."""
+        if self._loop is not None and asyncio.get_running_loop() is not self._loop:
+            return await asyncio.wrap_future(asyncio.run_coroutine_threadsafe(self.submit(item), self._loop))
+        self._ensure_started()
+        future = asyncio.get_running_loop().create_future()
+        await self._queue.put((item, future, time.perf_counter()))
+        return await future
+
+    def stats(self) -> Dict:
+        """Return batch-size and queue-wait statistics."""
+        batches = sum(self._batch_sizes.values())
+        waits = sorted(self._waits)
+
+        def percentile(p):
+            if not waits:
+                return 0.0
+            return waits[min(len(waits) - 1, int(p / 100 * len(waits)))] * 1000
+
+        return {
+            "batches": batches,
+            "items": self._items,
+            "mean_batch_size": self._items / batches if batches else 0.0,
+            "batch_size_histogram": dict(sorted(self._batch_sizes.items())),
+            "queue_wait_ms": {
+                "p50": percentile(50),
+                "p95": percentile(95),
+                "max": waits[-1] * 1000 if waits else 0.0
+            },
+            "pending": self._queue.qsize() if self._queue else 0
+        }
+
+    async def close(self):
+        """Stop the scheduler task."""
+        if self._loop is not None and asyncio.get_running_loop() is not self._loop:
+            await asyncio.wrap_future(asyncio.run_coroutine_threadsafe(self.close(), self._loop))
+            return
+        if self._task:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    def shutdown(self, timeout: float = 5.0):
+        """Stop the scheduler and the batcher's own loop thread, from any thread."""
+        if self._loop is not None:
+            asyncio.run_coroutine_threadsafe(self.close(), self._loop).result(timeout)
+            self._loop.call_soon_threadsafe(self._loop.stop)
+            self._loop_thread.join(timeout)
+            self._loop.close()
+            self._loop = self._loop_thread = None
+        self._executor.shutdown(wait=False)
+
+    def _ensure_started(self):
+        if self._task is None or self._task.done():
+            self._queue = self._queue or asyncio.Queue()
+            self._task = asyncio.get_running_loop().create_task(self._run())
+
+    async def _run(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            batch = [await self._queue.get()]
+            deadline = batch[0][2] + self.max_wait
+            while len(batch) < self.max_batch_size:
+                remaining = deadline - time.perf_counter()
+                if remaining <= 0:
+                    break
+                try:
+                    batch.append(await asyncio.wait_for(self._queue.get(), remaining))
+                except asyncio.TimeoutError:
+                    break
+            # Skip requests whose callers have gone away
+            batch = [entry for entry in batch if not entry[1].cancelled()]
+            if not batch:
+                continue
+
+            started = time.perf_counter()
+            for _, _, enqueued in batch:
+                self._waits.append(started - enqueued)
+            self._batch_sizes[len(batch)] += 1
+            self._items += len(batch)
+
+            try:
+                results = await loop.run_in_executor(
+                    self._executor, self.batch_fn, [item for item, _, _ in batch]
+                )
+                if len(results) != len(batch):
+                    raise RuntimeError(
+                        f"Batch function returned {len(results)} results for {len(batch)} items"
+                    )
+            except Exception as e:
+                logger.error(f"Batch of {len(batch)} failed: {e}")
+                for _, future, _ in batch:
+                    if not future.done():
+                        future.set_exception(e)
+                continue
+            for (_, future, _), result in zip(batch, results):
+                if not future.done():
+                    future.set_result(result)
@@ -3,33 +3,64 @@ DiaAgent implementation using the Dia framework for text-to-speech.
 """
 import tempfile
 import os
+import uuid
 from pathlib import Path
 import logging
-from typing import Optional
-from dia.model import Dia
+from typing import Dict, Iterator, List, Optional, Union
+import numpy as np
 import shutil
+from .speech_pipeline import SentencePipeline
+from .batching import MicroBatcher
+from .model_manager import ModelManager, get_model_manager
+from .inference import InferenceOptions
+from .audio_format import pcm_to_wav
+
+# Dia generates 44.1 kHz mono audio
+SAMPLE_RATE = 44100
 
 logger = logging.getLogger(__name__)
 
+def to_pcm16(audio: np.ndarray) -> bytes:
+    """Convert float audio in [-1, 1] to 16-bit little-endian PCM."""
+    return (np.clip(audio, -1.0, 1.0) * 32767).astype("<i2").tobytes()
+
+
 class DiaAgent:
-    def __init__(self, compute_dtype: str = "float16"):
+    def __init__(self, compute_dtype: Optional[str] = None, max_batch_size: int = 8,
+                 batch_window_ms: float = 20.0, model_manager: Optional[ModelManager] = None,
+                 inference: Optional[InferenceOptions] = None):
         """Initialize the Dia agent for text-to-speech generation.
         
         Args:
-            compute_dtype: Computation data type ("float16", "float32", or "bfloat16")
+            compute_dtype: Inference mode ("float32", "bfloat16", "float16" or "int8");
+                defaults to ``DIA_INFERENCE_MODE``, then float16 on CUDA and float32 on CPU
+            max_batch_size: Largest number of requests run in one batched generate call
+            batch_window_ms: How long a request waits for others to batch with
+            model_manager: Source of the model weights; defaults to the process-wide
+                manager for the inference options so every agent shares one copy
+            inference: Full inference options, overriding ``compute_dtype``
         """
         self.model = None
-        self.compute_dtype = compute_dtype
+        if inference is None:
+            inference = model_manager.options if model_manager else InferenceOptions.from_env(mode=compute_dtype)
+        self.inference = inference
+        self.compute_dtype = self.inference.compute_dtype
+        self.model_manager = model_manager or get_model_manager(self.inference)
         self.temp_files = set()
+        self.batcher = MicroBatcher(
+            self.generate_batch,
+            max_batch_size=max_batch_size,
+            max_wait_ms=batch_window_ms
+        )
+        # Synthesis worker threads and event-loop callers meet in the same
+        # batches; the batcher's single executor thread is the only caller of the model
+        self.batcher.start_loop()
         self.initialize_model()
         
     def initialize_model(self):
         """Initialize the Dia model."""
         try:
-            self.model = Dia.from_pretrained(
-                "nari-labs/Dia-1.6B",
-                compute_dtype=self.compute_dtype
-            )
+            self.model = self.model_manager.get_model()
             logger.info("Dia model initialized successfully")
         except Exception as e:
             logger.error(f"Failed to initialize Dia model: {e}")
@@ -49,24 +80,17 @@ class DiaAgent:
             if not text.strip():
                 raise ValueError("Input text cannot be empty")
                 
-            # Format text for dialogue generation
-            formatted_text = f"[S1] {text}"
-            
-            # Generate audio (disabled torch compilation for Metal compatibility)
-            audio_data = self.model.generate(
-                formatted_text,
-                use_torch_compile=False,  # Disabled for Metal compatibility
-                verbose=True
-            )
+            # Generate audio through the batcher, like every other model call
+            audio_data = self.generate_audio_blocking(text)
             
             # Save to temporary file if no output path specified
             if output_path is None:
                 temp_dir = tempfile.gettempdir()
-                output_path = os.path.join(temp_dir, f"dia_output_{hash(text)}.mp3")
+                output_path = os.path.join(temp_dir, f"speech_{uuid.uuid4()}.wav")
                 self.temp_files.add(output_path)
             
-            # Save audio
-            self.model.save_audio(output_path, audio_data)
+            # Save audio as a WAV file, matching the pyttsx3 agent's naming
+            Path(output_path).write_bytes(pcm_to_wav(to_pcm16(audio_data), SAMPLE_RATE))
             logger.info(f"Generated speech saved to {output_path}")
             
             return output_path
@@ -75,6 +99,90 @@ class DiaAgent:
             logger.error(f"Failed to generate speech: {e}")
             raise
     
+    def create_engine(self):
+        """Return the engine used by a synthesis worker: none.
+        
+        Workers hand their text to the batcher instead of calling the shared
+        model, so concurrent requests are batched and the model is never run
+        from two threads at once.
+        """
+        return None
+    
+    def generate_batch(self, texts: List[str]) -> List[Optional[np.ndarray]]:
+        """Generate audio for several texts in one batched forward pass.
+        
+        Args:
+            texts: Input texts to convert to speech
+            
+        Returns:
+            One mono float32 audio array per input text, in order
+        """
+        prompts = [f"[S1] {text}" for text in texts]
+        # Torch compilation is opt-in; it breaks on Metal
+        outputs = self.model.generate(
+            prompts if len(prompts) > 1 else prompts[0],
+            use_torch_compile=self.inference.use_torch_compile,
+            verbose=False
+        )
+        if len(prompts) == 1:
+            outputs = [outputs]
+        return list(outputs)
+    
+    async def generate_audio(self, text: str) -> Optional[np.ndarray]:
+        """Generate audio for ``text``, batched with other concurrent requests.
+        
+        Args:
+            text: Input text to convert to speech
+            
+        Returns:
+            Mono float32 audio array at ``SAMPLE_RATE``
+        """
+        if not text.strip():
+            raise ValueError("Input text cannot be empty")
+        return await self.batcher.submit(text)
+    
+    def generate_audio_blocking(self, text: str) -> Optional[np.ndarray]:
+        """Generate audio for ``text`` from a worker thread, batched with other concurrent requests."""
+        if not text.strip():
+            raise ValueError("Input text cannot be empty")
+        return self.batcher.submit_threadsafe(text)
+    
+    def batch_stats(self) -> Dict:
+        """Return batch-size and queue-wait metrics for tuning the batch window."""
+        return self.batcher.stats()
+    
+    def _generate_chunk(self, text: str) -> Optional[np.ndarray]:
+        """Generate audio for a single sentence or clause."""
+        return self.batcher.submit_threadsafe(text)
+    
+    def generate_speech_stream(self, text: str, crossfade_ms: float = 20.0) -> Iterator[np.ndarray]:
+        """Generate speech sentence by sentence, yielding audio as soon as it is ready.
+        
+        Each sentence (or clause of a long sentence) is generated separately,
+        the next one on a background thread while the current one is being
+        consumed, so time-to-first-audio is roughly the cost of the first
+        sentence. Boundaries are crossfaded to hide the seams.
+        
+        Args:
+            text: Input text to convert to speech
+            crossfade_ms: Crossfade length at chunk boundaries
+            
+        Returns:
+            Iterator of mono float32 audio segments at ``SAMPLE_RATE``
+        """
+        if not text.strip():
+            raise ValueError("Input text cannot be empty")
+        pipeline = SentencePipeline(self._generate_chunk, SAMPLE_RATE, crossfade_ms=crossfade_ms)
+        return pipeline.run(text)
+    
+    def iter_speech(self, text: str, engine=None, chunk_size: int = 32 * 1024) -> Iterator[Union[Dict, bytes]]:
+        """Yield a stream header followed by 16-bit PCM chunks of the pipelined speech."""
+        yield {"codec": "pcm_s16le", "sample_rate": SAMPLE_RATE, "channels": 1}
+        for segment in self.generate_speech_stream(text):
+            pcm = to_pcm16(segment)
+            for start in range(0, len(pcm), chunk_size - chunk_size % 2):
+                yield pcm[start:start + chunk_size - chunk_size % 2]
+    
     def process_message(self, message: str) -> str:
         """Process a message and return a response.
         
@@ -96,6 +204,11 @@ class DiaAgent:
             logger.error(f"Error processing message: {e}")
             return "Sorry, I encountered an error processing your message."
     
+    def close(self):
+        """Stop the batcher and remove temporary files."""
+        self.batcher.shutdown()
+        self.cleanup()
+    
     def cleanup(self):
         """Clean up temporary files."""
         for file_path in self.temp_files:
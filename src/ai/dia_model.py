@@ -1,5 +1,5 @@
 import os
-from typing import Optional, List, Dict
+from typing import Optional, List, Set
 import tempfile
 import pyttsx3
 import io
@@ -7,35 +7,38 @@ import logging
 import time
 import uuid
 import random
+from .intents import IntentMatcher
+from .sessions import Session
 
-# Setup logging
-logging.basicConfig(
-    level=logging.INFO,
-    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
-)
 logger = logging.getLogger(__name__)
 
 class DiaAgent:
-    def __init__(self, model_path: Optional[str] = None):
-        """Initialize the voice agent."""
+    def __init__(self, model_path: Optional[str] = None, intents: Optional[IntentMatcher] = None,
+                 retriever=None, driver_name: Optional[str] = None):
+        """Initialize the voice agent.
+        
+        ``intents`` defaults to the intents file named by ``INTENTS_PATH``, or
+        the bundled ``intents.json``. ``retriever`` (a ``KnowledgeBase``)
+        answers general questions from local documents when it has a good
+        enough passage. ``driver_name`` picks the pyttsx3 driver (``PYTTSX3_DRIVER``,
+        or the platform's default).
+        """
         logger.info("Initializing Voice Agent with pyttsx3")
         self.model_path = model_path or os.getenv("DIA_MODEL_PATH")
-        self.conversation_history: List[Dict] = []
+        # Rendered files not yet claimed by a caller, removed on cleanup
+        self.temp_files: Set[str] = set()
+        self.intents = intents or IntentMatcher.from_file(os.getenv("INTENTS_PATH"))
+        self.retriever = retriever
         
-        # Initialize text-to-speech engine
-        self.engine = pyttsx3.init()
+        # Speech settings shared by every engine this agent creates
+        self.driver_name = driver_name or os.getenv("PYTTSX3_DRIVER") or None
+        self.voice_id = None
+        self.rate = 175  # Speed of speech
+        self.volume = 1.0  # Volume level
         
-        # Configure the voice
-        voices = self.engine.getProperty('voices')
-        # Try to set a female voice if available
-        for voice in voices:
-            if "female" in voice.name.lower():
-                self.engine.setProperty('voice', voice.id)
-                break
-        
-        # Set speech rate and volume
-        self.engine.setProperty('rate', 175)  # Speed of speech
-        self.engine.setProperty('volume', 1.0)  # Volume level
+        # The default text-to-speech engine is created on first use, so
+        # text-only deployments never need a working speech driver
+        self._engine = None
         
         # Personality traits
         self.name = "Dia"
@@ -70,62 +73,140 @@ class DiaAgent:
             "I'd like to understand better what you need.",
         ]
         
-        logger.info("Voice Agent initialized successfully")
-    
-    def process_message(self, text: str) -> str:
-        """Process an incoming message and return a response."""
-        logger.info(f"Processing message: {text[:50]}...")
+        # Tone-specific templates picked by the sentiment of the message;
+        # neutral messages use the templates above
+        self.positive_acknowledgments = [
+            "That's great to hear!",
+            "Wonderful!",
+            "Love that!",
+            "Sounds good!",
+        ]
         
-        # Add message to conversation history
-        self.conversation_history.append({"role": "user", "content": text})
+        self.empathetic_acknowledgments = [
+            "I'm sorry to hear that.",
+            "That sounds frustrating.",
+            "I understand how you feel.",
+            "That must be difficult.",
+        ]
         
-        # Generate response based on context
-        text_lower = text.lower()
+        self.supportive_follow_ups = [
+            "How can I help make things better?",
+            "Would you like to tell me more about what happened?",
+            "Let's see what we can do about it together.",
+            "What would help you most right now?",
+        ]
         
-        # Handle greetings
-        if any(word in text_lower for word in ['hello', 'hi', 'hey', 'greetings']):
-            response = random.choice(self.greetings)
+        self.tones = {
+            "neutral": (self.acknowledgments, self.follow_ups, self.clarifications),
+            "positive": (self.positive_acknowledgments, self.follow_ups, self.clarifications),
+            "negative": (self.empathetic_acknowledgments, self.supportive_follow_ups, self.supportive_follow_ups),
+        }
         
-        # Handle questions about the agent
-        elif any(word in text_lower for word in ['who are you', 'what are you', 'your name']):
-            response = f"I'm {self.name}, an AI voice assistant. I'm here to help you with whatever you need."
+        self.who_reply = f"I'm {self.name}, an AI voice assistant. I'm here to help you with whatever you need."
+        self.goodbye_reply = "Goodbye! Feel free to talk to me anytime you need assistance."
+        self.thanks_reply = "You're welcome! Is there anything else I can help you with?"
         
-        # Handle goodbyes
-        elif any(word in text_lower for word in ['bye', 'goodbye', 'see you', 'farewell']):
-            response = f"Goodbye! Feel free to talk to me anytime you need assistance."
+        logger.info("Voice Agent initialized successfully")
+    
+    @property
+    def engine(self):
+        """Default pyttsx3 engine, created on first use."""
+        if self._engine is None:
+            self._engine = self.create_engine()
+        return self._engine
+    
+    def create_engine(self):
+        """Create and configure a new pyttsx3 engine.
         
-        # Handle thank you
-        elif any(word in text_lower for word in ['thank', 'thanks']):
-            response = "You're welcome! Is there anything else I can help you with?"
+        pyttsx3 engines are not thread-safe, so every thread that synthesizes
+        speech needs its own engine. ``pyttsx3.init()`` hands out one cached
+        engine per driver, so the engine is constructed directly.
+        """
+        engine = pyttsx3.Engine(self.driver_name)
         
-        # Handle general queries
-        else:
-            # Combine acknowledgment with follow-up or clarification
-            response = f"{random.choice(self.acknowledgments)} {random.choice(self.follow_ups if len(text.split()) > 5 else self.clarifications)}"
+        # Configure the voice
+        voices = engine.getProperty('voices')
+        # Try to set a female voice if available
+        for voice in voices:
+            if "female" in voice.name.lower():
+                engine.setProperty('voice', voice.id)
+                self.voice_id = voice.id
+                break
+        
+        # Set speech rate and volume
+        engine.setProperty('rate', self.rate)
+        engine.setProperty('volume', self.volume)
+        return engine
+    
+    def process_message(self, text: str, session: Optional[Session] = None,
+                        sentiment: Optional[str] = None) -> str:
+        """Process an incoming message and return a response.
+        
+        The exchange is recorded in ``session`` when one is given; the agent
+        itself keeps no per-user state, so one agent can serve every connection.
+        ``sentiment`` ("positive", "neutral" or "negative") selects the tone of
+        general replies.
+        """
+        logger.debug(f"Processing message: {text[:50]}...", extra={"payload": True})
         
-        # Add response to conversation history
-        self.conversation_history.append({"role": "assistant", "content": response})
+        response = self.respond(text, self.intents.classify(text), sentiment)
         
-        logger.info(f"Generated response: {response[:50]}...")
+        if session is not None:
+            session.add_exchange(text, response)
+        
+        logger.debug(f"Generated response: {response[:50]}...", extra={"payload": True})
         return response
     
-    def generate_speech(self, text: str) -> str:
-        """Generate speech from text using pyttsx3 and save to a file."""
+    def respond(self, text: str, intent: Optional[str], sentiment: Optional[str] = None) -> str:
+        """Pick a reply for a message classified as ``intent``."""
+        if intent == "greeting":
+            return random.choice(self.greetings)
+        if intent == "identity":
+            return self.who_reply
+        if intent == "goodbye":
+            return self.goodbye_reply
+        if intent == "thanks":
+            return self.thanks_reply
+        if self.retriever is not None:
+            passage = self.retriever.answer(text)
+            if passage is not None:
+                return passage
+        # General queries: combine acknowledgment with follow-up or clarification
+        acknowledgments, follow_ups, clarifications = self.tones.get(sentiment, self.tones["neutral"])
+        return f"{random.choice(acknowledgments)} {random.choice(follow_ups if len(text.split()) > 5 else clarifications)}"
+    
+    def response_templates(self) -> List[str]:
+        """Return every response string ``process_message`` can produce."""
+        templates = list(self.greetings)
+        templates += [self.who_reply, self.goodbye_reply, self.thanks_reply]
+        for acknowledgments, follow_ups, clarifications in self.tones.values():
+            for acknowledgment in acknowledgments:
+                for follow_up in follow_ups + clarifications:
+                    templates.append(f"{acknowledgment} {follow_up}")
+        # Preserve order while dropping duplicates
+        return list(dict.fromkeys(templates))
+    
+    def generate_speech(self, text: str, engine=None) -> str:
+        """Generate speech from text using pyttsx3 and save to a file.
+        
+        Pass ``engine`` to render with an engine owned by the calling thread
+        instead of the agent's default engine.
+        """
+        engine = engine or self.engine
         try:
-            logger.info(f"Starting speech generation for text: {text[:50]}...")
+            logger.debug(f"Starting speech generation for text: {text[:50]}...", extra={"payload": True})
             start_time = time.time()
             
-            # Create a unique filename
-            filename = f"speech_{uuid.uuid4()}.mp3"
+            # Create a unique filename; pyttsx3 writes uncompressed audio (WAV
+            # with espeak) whatever the extension says
+            filename = f"speech_{uuid.uuid4()}.wav"
             temp_dir = tempfile.gettempdir()
             filepath = os.path.join(temp_dir, filename)
             
-            logger.info(f"Will save audio to: {filepath}")
-            
             # Generate speech using pyttsx3
-            logger.info("Generating speech...")
-            self.engine.save_to_file(text, filepath)
-            self.engine.runAndWait()
+            self.temp_files.add(filepath)
+            engine.save_to_file(text, filepath)
+            engine.runAndWait()
             
             # Verify file exists and has content
             if not os.path.exists(filepath):
@@ -135,7 +216,7 @@ class DiaAgent:
                 raise RuntimeError("Audio file is empty")
             
             end_time = time.time()
-            logger.info(f"Speech generation completed in {end_time - start_time:.2f} seconds")
+            logger.debug(f"Speech generation completed in {end_time - start_time:.2f} seconds")
             
             return filename
             
@@ -149,19 +230,19 @@ class DiaAgent:
         logger.info("Cleaning up Voice Agent resources")
         try:
             # Stop the TTS engine
-            self.engine.stop()
+            if self._engine is not None:
+                self._engine.stop()
         except:
             pass
             
-        # Clean up any temporary audio files
-        temp_dir = tempfile.gettempdir()
-        for file in os.listdir(temp_dir):
-            if file.startswith("speech_") and file.endswith(".mp3"):
-                try:
-                    filepath = os.path.join(temp_dir, file)
-                    if os.path.exists(filepath):
-                        os.remove(filepath)
-                        logger.info(f"Removed temporary file: {filepath}")
-                except Exception as e:
-                    logger.error(f"Failed to remove temporary file {file}: {e}")
+        # Clean up the temporary audio files this agent rendered and nobody claimed
+        for filepath in list(self.temp_files):
+            try:
+                os.remove(filepath)
+                logger.info(f"Removed temporary file: {filepath}")
+            except FileNotFoundError:
+                pass
+            except Exception as e:
+                logger.error(f"Failed to remove temporary file {filepath}: {e}")
+        self.temp_files.clear()
         logger.info("Cleanup completed") 
\ No newline at end of file
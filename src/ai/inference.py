@@ -0,0 +1,110 @@
+"""
+Inference precision, quantization and threading options for the Dia backend.
+"""
+import logging
+import os
+from typing import Optional
+
+logger = logging.getLogger(__name__)
+
+# Inference mode -> dtype the model computes in
+INFERENCE_MODES = {
+    "float32": "float32",
+    "bfloat16": "bfloat16",
+    "float16": "float16",
+    # Linear layers are quantized to int8; everything else stays float32
+    "int8": "float32",
+}
+
+
+def _optional_int(value: Optional[str]) -> Optional[int]:
+    try:
+        return int(value) if value else None
+    except ValueError:
+        return None
+
+
+class InferenceOptions:
+    def __init__(self, mode: str = "float32", num_threads: Optional[int] = None,
+                 interop_threads: Optional[int] = None, use_torch_compile: bool = False):
+        """Describe how the model should run.
+
+        Args:
+            mode: One of ``INFERENCE_MODES``; ``int8`` applies dynamic quantization
+                to the linear layers
+            num_threads: Intra-op threads per worker (``torch.set_num_threads``)
+            interop_threads: Inter-op threads per worker (``torch.set_num_interop_threads``)
+            use_torch_compile: Compile the model with ``torch.compile`` on first generate
+        """
+        if mode not in INFERENCE_MODES:
+            raise ValueError(f"Unknown inference mode '{mode}', expected one of {sorted(INFERENCE_MODES)}")
+        self.mode = mode
+        self.num_threads = num_threads
+        self.interop_threads = interop_threads
+        self.use_torch_compile = use_torch_compile
+
+    @classmethod
+    def from_env(cls, mode: Optional[str] = None) -> "InferenceOptions":
+        """Build options from ``DIA_INFERENCE_MODE``, ``DIA_NUM_THREADS``,
+        ``DIA_INTEROP_THREADS`` and ``DIA_TORCH_COMPILE``.
+
+        Without an explicit mode, float16 is used on CUDA machines and float32
+        everywhere else.
+        """
+        mode = mode or os.getenv("DIA_INFERENCE_MODE") or default_mode()
+        return cls(
+            mode=mode,
+            num_threads=_optional_int(os.getenv("DIA_NUM_THREADS")),
+            interop_threads=_optional_int(os.getenv("DIA_INTEROP_THREADS")),
+            use_torch_compile=os.getenv("DIA_TORCH_COMPILE", "").lower() in ("1", "true", "yes", "on")
+        )
+
+    @property
+    def compute_dtype(self) -> str:
+        return INFERENCE_MODES[self.mode]
+
+    @property
+    def key(self):
+        """Options that change the loaded weights, used to share model managers."""
+        return (self.mode,)
+
+    def apply_threads(self):
+        """Pin torch thread pools for this process."""
+        if not self.num_threads and not self.interop_threads:
+            return
+        import torch
+
+        if self.num_threads:
+            torch.set_num_threads(self.num_threads)
+        if self.interop_threads:
+            try:
+                torch.set_num_interop_threads(self.interop_threads)
+            except RuntimeError as e:
+                # Can only be set once, before any inter-op parallel work starts
+                logger.warning(f"Could not set inter-op threads: {e}")
+
+    def prepare(self, model):
+        """Apply post-load transformations such as int8 quantization to a Dia model."""
+        if self.mode == "int8":
+            import torch
+
+            model.model = torch.ao.quantization.quantize_dynamic(
+                model.model, {torch.nn.Linear}, dtype=torch.qint8
+            )
+            logger.info("Applied int8 dynamic quantization to linear layers")
+        return model
+
+    def __repr__(self) -> str:
+        return (f"InferenceOptions(mode={self.mode!r}, num_threads={self.num_threads}, "
+                f"interop_threads={self.interop_threads}, use_torch_compile={self.use_torch_compile})")
+
+
+def default_mode() -> str:
+    """Return float16 when CUDA is available and float32 otherwise."""
+    try:
+        import torch
+        if torch.cuda.is_available():
+            return "float16"
+    except ImportError:
+        pass
+    return "float32"
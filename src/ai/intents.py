@@ -0,0 +1,117 @@
+"""
+Data-driven intent classification for incoming messages.
+"""
+import json
+import logging
+import re
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_INTENTS_PATH = Path(__file__).parent / "intents.json"
+
+# Words are runs of letters, digits and apostrophes ("what's", "you're")
+_TOKEN_RE = re.compile(r"[a-z0-9']+")
+
+
+def tokenize(text: str) -> List[str]:
+    """Lowercase ``text`` and split it into words."""
+    return _TOKEN_RE.findall(text.lower())
+
+
+@dataclass(frozen=True)
+class Intent:
+    name: str
+    priority: int
+    keywords: Tuple[str, ...]
+
+
+class IntentMatcher:
+    def __init__(self, intents: Iterable[Intent]):
+        """Compile ``intents`` into a word index.
+
+        Keywords are tokenized the same way as messages and indexed by their
+        first word. Classifying a message tokenizes it once and intersects its
+        words with the index, so the cost depends on the message length and
+        not on how many keywords are configured. Keywords only match whole
+        words: "hi" matches "hi there" but not "this".
+
+        When a message matches several intents, the one with the highest
+        priority wins; ties go to the intent listed first.
+        """
+        self.intents: List[Intent] = list(intents)
+        # Lower rank wins: sorted by priority (descending), then config order
+        order = sorted(range(len(self.intents)), key=lambda i: -self.intents[i].priority)
+        self._names = [self.intents[index].name for index in order]
+        # first word -> (rank of the best one-word keyword, [(" phrase ", rank)])
+        self._index: Dict[str, Tuple[Optional[int], List[Tuple[str, int]]]] = {}
+        for rank, index in enumerate(order):
+            intent = self.intents[index]
+            for keyword in intent.keywords:
+                words = tokenize(keyword)
+                if not words:
+                    logger.warning(f"Ignoring empty keyword in intent '{intent.name}'")
+                    continue
+                single, phrases = self._index.get(words[0], (None, []))
+                if len(words) == 1:
+                    single = rank if single is None else min(single, rank)
+                else:
+                    phrases.append((f" {' '.join(words)} ", rank))
+                self._index[words[0]] = (single, phrases)
+        self._first_words = frozenset(self._index)
+
+    @classmethod
+    def from_dict(cls, data: Dict) -> "IntentMatcher":
+        """Build a matcher from ``{"intents": [{"name", "priority", "keywords"}]}``."""
+        return cls(
+            Intent(
+                name=item["name"],
+                priority=int(item.get("priority", 0)),
+                keywords=tuple(item.get("keywords", ()))
+            )
+            for item in data["intents"]
+        )
+
+    @classmethod
+    def from_file(cls, path: Optional[str] = None) -> "IntentMatcher":
+        """Load intents from a JSON file (the bundled ``intents.json`` by default)."""
+        path = Path(path) if path else DEFAULT_INTENTS_PATH
+        with open(path, encoding="utf-8") as f:
+            matcher = cls.from_dict(json.load(f))
+        logger.info(f"Loaded {len(matcher.intents)} intents from {path}")
+        return matcher
+
+    def classify(self, text: str) -> Optional[str]:
+        """Return the name of the best matching intent, or None."""
+        return self._classify_words(tokenize(text))
+
+    def classify_batch(self, texts: Iterable[str]) -> List[Optional[str]]:
+        """Classify many messages, reusing the result for repeated messages."""
+        seen: Dict[str, Optional[str]] = {}
+        results = []
+        for text in texts:
+            key = text.lower()
+            if key not in seen:
+                seen[key] = self._classify_words(_TOKEN_RE.findall(key))
+            results.append(seen[key])
+        return results
+
+    def _classify_words(self, words: List[str]) -> Optional[str]:
+        hits = self._first_words.intersection(words)
+        if not hits:
+            return None
+        best = len(self._names)
+        joined = None
+        for word in hits:
+            single, phrases = self._index[word]
+            if single is not None and single < best:
+                best = single
+            for phrase, rank in phrases:
+                if rank < best:
+                    if joined is None:
+                        joined = f" {' '.join(words)} "
+                    if phrase in joined:
+                        best = rank
+        return self._names[best] if best < len(self._names) else None
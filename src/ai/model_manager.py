@@ -0,0 +1,187 @@
+"""
+Process-wide loader for Dia model weights.
+"""
+import logging
+import os
+import resource
+import threading
+import time
+from typing import Dict, Optional, Tuple
+
+from .inference import InferenceOptions
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_REPO_ID = "nari-labs/Dia-1.6B"
+
+
+def resident_memory() -> int:
+    """Return the resident set size of this process in bytes."""
+    try:
+        with open("/proc/self/statm") as statm:
+            return int(statm.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, IndexError):
+        # Peak RSS is the best we can do off Linux (bytes on macOS, KiB elsewhere)
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return peak if os.uname().sysname == "Darwin" else peak * 1024
+
+
+def mapped_file_memory(path: str) -> Optional[Dict[str, int]]:
+    """Resident, shared and private bytes of this process's mappings of ``path``.
+
+    Worker processes are spawned, not forked, so they never share memory
+    copy-on-write; a memory-mapped checkpoint is shared only through the page
+    cache behind the file. ``shared_bytes`` counts the pages of the file that
+    other processes map too. Returns None where ``/proc/self/smaps`` is
+    unavailable or the file is not mapped.
+    """
+    path = os.path.realpath(path)
+    totals = {"rss_bytes": 0, "shared_bytes": 0, "private_bytes": 0}
+    mapped = False
+    current = False
+    fields = {"Rss:": "rss_bytes", "Shared_Clean:": "shared_bytes", "Shared_Dirty:": "shared_bytes",
+              "Private_Clean:": "private_bytes", "Private_Dirty:": "private_bytes"}
+    try:
+        with open("/proc/self/smaps") as smaps:
+            for line in smaps:
+                parts = line.split()
+                if not parts:
+                    continue
+                if not parts[0].endswith(":"):
+                    # Mapping header: address perms offset dev inode [path]
+                    current = len(parts) >= 6 and parts[5] == path
+                    mapped = mapped or current
+                elif current and parts[0] in fields:
+                    totals[fields[parts[0]]] += int(parts[1]) * 1024
+    except OSError:
+        return None
+    return totals if mapped else None
+
+
+class ModelManager:
+    def __init__(self, options: Optional[InferenceOptions] = None, repo_id: str = DEFAULT_REPO_ID,
+                 checkpoint_path: Optional[str] = None, config_path: Optional[str] = None):
+        """Describe where model weights come from; nothing is loaded until first use.
+
+        Args:
+            options: Precision, quantization and threading options
+            repo_id: Hugging Face repository used when no local checkpoint is given
+            checkpoint_path: Local ``.safetensors`` or ``.pth`` checkpoint
+            config_path: Model config matching ``checkpoint_path``
+        """
+        self.options = options or InferenceOptions()
+        self.repo_id = repo_id
+        self.checkpoint_path = checkpoint_path
+        self.config_path = config_path
+        self.model = None
+        self.load_seconds: Optional[float] = None
+        self.rss_before: Optional[int] = None
+        self.rss_after: Optional[int] = None
+        self._lock = threading.Lock()
+
+    @property
+    def compute_dtype(self) -> str:
+        return self.options.compute_dtype
+
+    @property
+    def loaded(self) -> bool:
+        return self.model is not None
+
+    def get_model(self):
+        """Return the model, loading it on first use."""
+        if self.model is None:
+            with self._lock:
+                if self.model is None:
+                    self.rss_before = resident_memory()
+                    start_time = time.perf_counter()
+                    self.model = self._load()
+                    self.load_seconds = time.perf_counter() - start_time
+                    self.rss_after = resident_memory()
+                    logger.info(
+                        f"Dia model loaded from {self.source} in {self.load_seconds:.2f} seconds "
+                        f"(RSS {self.rss_after / 2**20:.0f} MiB, "
+                        f"+{(self.rss_after - self.rss_before) / 2**20:.0f} MiB)"
+                    )
+        return self.model
+
+    @property
+    def source(self) -> str:
+        return self.checkpoint_path or self.repo_id
+
+    def stats(self) -> Dict:
+        """Return load time and memory figures."""
+        return {
+            "loaded": self.loaded,
+            "source": self.source,
+            "inference_mode": self.options.mode,
+            "compute_dtype": self.compute_dtype,
+            "load_seconds": self.load_seconds,
+            "rss_bytes": resident_memory(),
+            "load_rss_delta_bytes": (
+                self.rss_after - self.rss_before if self.rss_after is not None else None
+            ),
+            # How much of the checkpoint is still backed by (and shared through) the file
+            "checkpoint_mapping": (
+                mapped_file_memory(self.checkpoint_path) if self.checkpoint_path else None
+            )
+        }
+
+    def _load(self):
+        self.options.apply_threads()
+        return self.options.prepare(self._load_weights())
+
+    def _load_weights(self):
+        from dia.model import Dia
+
+        if not self.checkpoint_path:
+            return Dia.from_pretrained(self.repo_id, compute_dtype=self.compute_dtype)
+
+        import torch
+        from dia.config import DiaConfig
+
+        if not self.config_path:
+            raise ValueError("A config path is required with a local checkpoint")
+        model = Dia(DiaConfig.load(self.config_path), compute_dtype=self.compute_dtype)
+        if self.checkpoint_path.endswith(".safetensors"):
+            from safetensors.torch import load_file
+            state_dict = load_file(self.checkpoint_path)
+        else:
+            state_dict = torch.load(
+                self.checkpoint_path, map_location="cpu", mmap=True, weights_only=True
+            )
+        # assign=True keeps the mapped tensors instead of copying into fresh ones.
+        # Workers each map the file, so they share its page cache as long as the
+        # tensors stay file-backed (no dtype conversion or quantization);
+        # stats()["checkpoint_mapping"] shows how much actually is
+        model.model.load_state_dict(state_dict, assign=True)
+        model.model.eval()
+        # Mirrors Dia.from_local, which loads the audio codec after the weights
+        model._load_dac_model()
+        return model
+
+
+_managers: Dict[Tuple, ModelManager] = {}
+_managers_lock = threading.Lock()
+
+
+def get_model_manager(options: Optional[InferenceOptions] = None,
+                      checkpoint_path: Optional[str] = None,
+                      config_path: Optional[str] = None) -> ModelManager:
+    """Return the shared manager for a model configuration.
+
+    Options default to ``InferenceOptions.from_env()``. A local checkpoint can
+    be given with the ``DIA_CHECKPOINT_PATH`` and ``DIA_CONFIG_PATH``
+    environment variables.
+    """
+    options = options or InferenceOptions.from_env()
+    checkpoint_path = checkpoint_path or os.getenv("DIA_CHECKPOINT_PATH")
+    config_path = config_path or os.getenv("DIA_CONFIG_PATH")
+    key = (options.key, checkpoint_path, config_path)
+    with _managers_lock:
+        if key not in _managers:
+            _managers[key] = ModelManager(
+                options=options,
+                checkpoint_path=checkpoint_path,
+                config_path=config_path
+            )
+        return _managers[key]
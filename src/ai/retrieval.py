@@ -0,0 +1,443 @@
+"""
+Local knowledge retrieval: BM25 over a folder of documents, in memory-mapped NumPy arrays.
+
+Documents (``.txt``, ``.md``, ``.rst``) are split into passages of at most
+``passage_words`` words. Terms are identified by a 64-bit hash, so the index
+needs no vocabulary dictionary and loads in constant time: every array is a
+``.npy`` file opened with ``mmap_mode="r"``, and worker processes on a host
+share the same pages.
+
+Index directory layout::
+
+    CURRENT              name of the live generation
+    .lock                serializes rebuilds between processes
+    gen-<n>/manifest.json
+    gen-<n>/<array>.npy  see ``_ARRAYS``
+
+A rebuild writes a new generation and then switches ``CURRENT``, so readers
+never see a half-written index. Documents whose size and mtime are unchanged
+keep their tokenized passages; only the BM25 weights, which depend on
+corpus-wide statistics, are recomputed for everything.
+"""
+import asyncio
+import hashlib
+import json
+import logging
+import os
+import re
+import shutil
+import threading
+import time
+from contextlib import contextmanager
+from dataclasses import dataclass
+from functools import lru_cache
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+import numpy as np
+
+from .intents import tokenize
+
+try:
+    import fcntl
+except ImportError:  # Windows: rebuilds are only serialized within a process
+    fcntl = None
+
+logger = logging.getLogger(__name__)
+
+DOCUMENT_SUFFIXES = (".txt", ".md", ".rst")
+
+# Words too common to tell passages apart; skipped in documents and queries
+STOPWORDS = frozenset("""
+a about an and are as at be but by can could did do does for from had has have how i i'm
+if in is it it's me my of on or our so that the their them there these they this to
+was we were what when where which who why will with would you your
+""".split())
+
+# Arrays of a generation: passage texts, the forward index (terms of each
+# passage, kept for incremental rebuilds) and the inverted index used to score
+_ARRAYS = (
+    "text_bytes", "text_offsets", "passage_lengths",
+    "forward_offsets", "forward_terms", "forward_tf",
+    "term_hashes", "term_offsets", "posting_passages", "posting_weights",
+)
+
+_SENTENCE_RE = re.compile(r"(?<=[.!?])\s+")
+
+
+@lru_cache(maxsize=1 << 16)
+def term_hash(term: str) -> int:
+    """Stable 64-bit id of a term (the same in every process)."""
+    return int.from_bytes(hashlib.blake2b(term.encode("utf-8"), digest_size=8).digest(), "little")
+
+
+def terms(text: str) -> List[str]:
+    """Index terms of ``text``: lowercase words without stopwords."""
+    return [word for word in tokenize(text) if word not in STOPWORDS]
+
+
+def split_passages(text: str, max_words: int = 120) -> List[str]:
+    """Split a document into paragraphs, packing long paragraphs sentence by sentence."""
+    passages = []
+    for paragraph in re.split(r"\n\s*\n", text):
+        paragraph = " ".join(paragraph.split())
+        if not paragraph:
+            continue
+        current: List[str] = []
+        for sentence in _SENTENCE_RE.split(paragraph):
+            words = sentence.split()
+            if current and len(current) + len(words) > max_words:
+                passages.append(" ".join(current))
+                current = []
+            # A single overlong sentence is cut into windows
+            while len(words) > max_words:
+                passages.append(" ".join(words[:max_words]))
+                words = words[max_words:]
+            current.extend(words)
+        if current:
+            passages.append(" ".join(current))
+    return passages
+
+
+@dataclass(frozen=True)
+class Passage:
+    text: str
+    document: str
+    score: float
+
+
+class RetrievalIndex:
+    """One generation of the index, memory-mapped and read-only."""
+
+    def __init__(self, directory: Path):
+        self.directory = Path(directory)
+        self.generation = self.directory.name
+        self.manifest = json.loads((self.directory / "manifest.json").read_text(encoding="utf-8"))
+        for name in _ARRAYS:
+            setattr(self, name, np.load(self.directory / f"{name}.npy", mmap_mode="r"))
+        # passage -> document, expanded from the per-document passage ranges
+        self.documents = [document["path"] for document in self.manifest["documents"]]
+        counts = [document["passages"] for document in self.manifest["documents"]]
+        self.passage_documents = np.repeat(np.arange(len(counts), dtype=np.int32), counts)
+
+    def __len__(self) -> int:
+        return len(self.passage_lengths)
+
+    def text(self, passage: int) -> str:
+        start, end = self.text_offsets[passage], self.text_offsets[passage + 1]
+        return bytes(self.text_bytes[start:end]).decode("utf-8")
+
+    def scores(self, query: str) -> Optional[np.ndarray]:
+        """BM25 score of every passage for ``query`` (None when no query term is indexed)."""
+        hashes = np.unique(np.fromiter(
+            (term_hash(term) for term in terms(query)), dtype=np.uint64
+        ))
+        if not len(hashes) or not len(self.term_hashes):
+            return None
+        positions = np.searchsorted(self.term_hashes, hashes)
+        inside = positions < len(self.term_hashes)
+        positions, hashes = positions[inside], hashes[inside]
+        positions = positions[self.term_hashes[positions] == hashes]
+        if not len(positions):
+            return None
+        slices = [slice(self.term_offsets[p], self.term_offsets[p + 1]) for p in positions]
+        passages = np.concatenate([self.posting_passages[s] for s in slices])
+        weights = np.concatenate([self.posting_weights[s] for s in slices])
+        # Sparse postings summed into a dense score vector in one pass
+        return np.bincount(passages, weights=weights, minlength=len(self))
+
+    def search(self, query: str, k: int = 3) -> List[Passage]:
+        """The ``k`` best passages for ``query``, best first."""
+        scores = self.scores(query)
+        if scores is None:
+            return []
+        k = min(k, len(scores))
+        top = np.argpartition(-scores, k - 1)[:k]
+        top = top[np.argsort(-scores[top])]
+        return [
+            Passage(self.text(int(p)), self.documents[self.passage_documents[p]], float(scores[p]))
+            for p in top if scores[p] > 0
+        ]
+
+
+def _scan(documents_dir: Path) -> Dict[str, Dict]:
+    """Size and mtime of every document under ``documents_dir``, by relative path."""
+    found = {}
+    for path in sorted(documents_dir.rglob("*")):
+        if path.suffix.lower() in DOCUMENT_SUFFIXES and path.is_file():
+            stat = path.stat()
+            found[path.relative_to(documents_dir).as_posix()] = {
+                "size": stat.st_size, "mtime_ns": stat.st_mtime_ns
+            }
+    return found
+
+
+def _tokenize_passage(text: str) -> Tuple[np.ndarray, np.ndarray]:
+    """Distinct term hashes of a passage and their counts."""
+    hashes = np.fromiter((term_hash(term) for term in terms(text)), dtype=np.uint64)
+    return np.unique(hashes, return_counts=True)
+
+
+def build_index(documents_dir: Path, generation_dir: Path, previous: Optional[RetrievalIndex] = None,
+                passage_words: int = 120, k1: float = 1.5, b: float = 0.75) -> Dict:
+    """Index the documents in ``documents_dir`` into ``generation_dir``.
+
+    Passages of documents unchanged since ``previous`` are reused without
+    reading or tokenizing them again.
+
+    Returns:
+        The generation's manifest
+    """
+    started = time.perf_counter()
+    documents_dir = Path(documents_dir)
+    old = {}
+    if previous is not None and previous.manifest.get("passage_words") == passage_words:
+        old = {document["path"]: document for document in previous.manifest["documents"]}
+
+    documents = []
+    texts: List[bytes] = []
+    text_lengths: List[np.ndarray] = []
+    forward_terms: List[np.ndarray] = []
+    forward_tf: List[np.ndarray] = []
+    forward_counts: List[np.ndarray] = []
+    reused = 0
+    for path, stat in _scan(documents_dir).items():
+        before = old.get(path)
+        if before is not None and before["size"] == stat["size"] and before["mtime_ns"] == stat["mtime_ns"]:
+            first, count = before["first_passage"], before["passages"]
+            text_start, text_end = previous.text_offsets[first], previous.text_offsets[first + count]
+            forward_start = previous.forward_offsets[first]
+            forward_end = previous.forward_offsets[first + count]
+            texts.append(bytes(previous.text_bytes[text_start:text_end]))
+            text_lengths.append(np.diff(previous.text_offsets[first:first + count + 1]))
+            forward_terms.append(np.asarray(previous.forward_terms[forward_start:forward_end]))
+            forward_tf.append(np.asarray(previous.forward_tf[forward_start:forward_end]))
+            forward_counts.append(np.diff(previous.forward_offsets[first:first + count + 1]))
+            reused += 1
+        else:
+            try:
+                content = (documents_dir / path).read_text(encoding="utf-8", errors="replace")
+            except OSError as e:
+                logger.error(f"Failed to read document {path}: {e}")
+                continue
+            passages = split_passages(content, passage_words)
+            encoded = [passage.encode("utf-8") for passage in passages]
+            texts.append(b"".join(encoded))
+            text_lengths.append(np.array([len(passage) for passage in encoded], dtype=np.int64))
+            for passage in passages:
+                hashes, counts = _tokenize_passage(passage)
+                forward_terms.append(hashes)
+                forward_tf.append(counts.astype(np.int32))
+                forward_counts.append(np.array([len(hashes)], dtype=np.int64))
+            count = len(passages)
+        documents.append({**stat, "path": path, "passages": count})
+
+    first = 0
+    for document in documents:
+        document["first_passage"] = first
+        first += document["passages"]
+
+    def joined(parts: List[np.ndarray], dtype) -> np.ndarray:
+        return np.concatenate(parts).astype(dtype, copy=False) if parts else np.zeros(0, dtype=dtype)
+
+    text_bytes = np.frombuffer(b"".join(texts), dtype=np.uint8)
+    text_offsets = np.concatenate([[0], np.cumsum(joined(text_lengths, np.int64))]).astype(np.int64)
+    fwd_terms = joined(forward_terms, np.uint64)
+    fwd_tf = joined(forward_tf, np.int32)
+    fwd_offsets = np.concatenate([[0], np.cumsum(joined(forward_counts, np.int64))]).astype(np.int64)
+    passage_count = len(fwd_offsets) - 1
+    passage_of = np.repeat(np.arange(passage_count, dtype=np.int32), np.diff(fwd_offsets))
+    lengths = np.bincount(passage_of, weights=fwd_tf, minlength=passage_count).astype(np.float32)
+
+    # Inverted index: postings sorted by term, then passage
+    order = np.lexsort((passage_of, fwd_terms))
+    sorted_terms = fwd_terms[order]
+    posting_passages = passage_of[order]
+    posting_tf = fwd_tf[order].astype(np.float32)
+    starts = np.flatnonzero(np.r_[True, sorted_terms[1:] != sorted_terms[:-1]]) if len(order) else np.zeros(0, dtype=np.int64)
+    term_hashes = sorted_terms[starts]
+    term_offsets = np.r_[starts, len(order)].astype(np.int64)
+    df = np.diff(term_offsets).astype(np.float64)
+    idf = np.log1p((passage_count - df + 0.5) / (df + 0.5))
+    average_length = float(lengths.mean()) if passage_count else 0.0
+    norm = k1 * (1 - b + b * lengths[posting_passages] / max(average_length, 1e-9))
+    posting_weights = (np.repeat(idf, df.astype(np.int64)) * posting_tf * (k1 + 1) / (posting_tf + norm)).astype(np.float32)
+
+    generation_dir.mkdir(parents=True)
+    arrays = {
+        "text_bytes": text_bytes, "text_offsets": text_offsets, "passage_lengths": lengths,
+        "forward_offsets": fwd_offsets, "forward_terms": fwd_terms, "forward_tf": fwd_tf,
+        "term_hashes": term_hashes, "term_offsets": term_offsets,
+        "posting_passages": posting_passages, "posting_weights": posting_weights,
+    }
+    for name in _ARRAYS:
+        np.save(generation_dir / f"{name}.npy", arrays[name])
+    manifest = {
+        "documents": documents,
+        "passages": passage_count,
+        "terms": len(term_hashes),
+        "passage_words": passage_words,
+        "k1": k1,
+        "b": b,
+        "reused_documents": reused,
+        "build_seconds": round(time.perf_counter() - started, 3)
+    }
+    (generation_dir / "manifest.json").write_text(json.dumps(manifest), encoding="utf-8")
+    return manifest
+
+
+class KnowledgeBase:
+    def __init__(self, documents_dir: str, index_dir: str, passage_words: int = 120,
+                 min_score: float = 4.0, k1: float = 1.5, b: float = 0.75,
+                 refresh_interval: float = 60.0, latency: Any = None):
+        """Answer questions from the documents in ``documents_dir``.
+
+        The index lives in ``index_dir`` and is shared by every process
+        pointing at it; ``refresh()`` brings it up to date with the documents.
+
+        Args:
+            documents_dir: Folder of ``.txt``/``.md``/``.rst`` documents (searched recursively)
+            index_dir: Where index generations are written
+            passage_words: Longest passage, in words
+            min_score: BM25 score below which ``answer`` finds nothing
+            k1: BM25 term frequency saturation
+            b: BM25 length normalization
+            refresh_interval: Seconds between background checks for changed documents
+            latency: Optional histogram (anything with ``observe(seconds, stage=...)``)
+                recording each search under the ``retrieval`` stage
+        """
+        self.documents_dir = Path(documents_dir)
+        self.index_dir = Path(index_dir)
+        self.passage_words = passage_words
+        self.min_score = min_score
+        self.k1 = k1
+        self.b = b
+        self.refresh_interval = refresh_interval
+        self.latency = latency
+        self.index: Optional[RetrievalIndex] = None
+        self.rebuilds = 0
+        self.queries = 0
+        self.answered = 0
+        self._refresh_lock = threading.Lock()
+        self._task: Optional[asyncio.Task] = None
+
+    def __len__(self) -> int:
+        return len(self.index) if self.index is not None else 0
+
+    @contextmanager
+    def _exclusive(self) -> Iterator[None]:
+        """Hold the index directory's lock (across processes where supported)."""
+        self.index_dir.mkdir(parents=True, exist_ok=True)
+        with self._refresh_lock, open(self.index_dir / ".lock", "a") as lock:
+            if fcntl is not None:
+                fcntl.flock(lock, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                if fcntl is not None:
+                    fcntl.flock(lock, fcntl.LOCK_UN)
+
+    def _current(self) -> Optional[str]:
+        try:
+            return (self.index_dir / "CURRENT").read_text(encoding="utf-8").strip() or None
+        except FileNotFoundError:
+            return None
+
+    def refresh(self) -> bool:
+        """Rebuild the index if the documents changed, and load the live generation.
+
+        Blocking; run it off the event loop. Returns True when a new index
+        was built.
+        """
+        with self._exclusive():
+            current = self._current()
+            if current is not None and (self.index is None or self.index.generation != current):
+                try:
+                    self.index = RetrievalIndex(self.index_dir / current)
+                except (OSError, ValueError) as e:
+                    logger.error(f"Failed to load knowledge index {current}: {e}")
+                    self.index = None
+            if self.index is not None and not self._changed(self.index):
+                return False
+            generation = f"gen-{time.time_ns()}"
+            manifest = build_index(
+                self.documents_dir, self.index_dir / generation, previous=self.index,
+                passage_words=self.passage_words, k1=self.k1, b=self.b
+            )
+            partial = self.index_dir / "CURRENT.partial"
+            partial.write_text(generation, encoding="utf-8")
+            os.replace(partial, self.index_dir / "CURRENT")
+            self.index = RetrievalIndex(self.index_dir / generation)
+            self.rebuilds += 1
+            self._remove_old_generations(keep=(generation, current))
+        logger.info(
+            f"Indexed {manifest['passages']} passages from {len(manifest['documents'])} documents "
+            f"({manifest['reused_documents']} unchanged) in {manifest['build_seconds']}s"
+        )
+        return True
+
+    def start(self):
+        """Check for changed documents every ``refresh_interval`` seconds on the running event loop."""
+        if self.refresh_interval > 0 and (self._task is None or self._task.done()):
+            self._task = asyncio.get_running_loop().create_task(self._run())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    async def _run(self):
+        while True:
+            await asyncio.sleep(self.refresh_interval)
+            try:
+                await asyncio.to_thread(self.refresh)
+            except Exception as e:
+                logger.error(f"Failed to refresh knowledge index: {e}")
+
+    def _changed(self, index: RetrievalIndex) -> bool:
+        indexed = {
+            document["path"]: (document["size"], document["mtime_ns"])
+            for document in index.manifest["documents"]
+        }
+        found = {path: (stat["size"], stat["mtime_ns"]) for path, stat in _scan(self.documents_dir).items()}
+        return found != indexed or index.manifest.get("passage_words") != self.passage_words
+
+    def _remove_old_generations(self, keep: Tuple[Optional[str], ...]):
+        # Processes still mapping an older generation keep their open files
+        for path in self.index_dir.glob("gen-*"):
+            if path.name not in keep:
+                shutil.rmtree(path, ignore_errors=True)
+
+    def search(self, query: str, k: int = 3) -> List[Passage]:
+        if self.index is None:
+            return []
+        started = time.perf_counter()
+        passages = self.index.search(query, k)
+        if self.latency is not None:
+            self.latency.observe(time.perf_counter() - started, stage="retrieval")
+        return passages
+
+    def answer(self, query: str) -> Optional[str]:
+        """The best passage for ``query`` if it scores at least ``min_score``."""
+        self.queries += 1
+        passages = self.search(query, k=1)
+        if not passages or passages[0].score < self.min_score:
+            return None
+        self.answered += 1
+        return passages[0].text
+
+    def stats(self) -> Dict:
+        manifest = self.index.manifest if self.index is not None else {}
+        return {
+            "generation": self.index.generation if self.index is not None else None,
+            "documents": len(manifest.get("documents", [])),
+            "passages": manifest.get("passages", 0),
+            "terms": manifest.get("terms", 0),
+            "rebuilds": self.rebuilds,
+            "queries": self.queries,
+            "answered": self.answered
+        }
@@ -0,0 +1,217 @@
+"""
+Per-connection conversation state with bounded history.
+"""
+import logging
+import sys
+import threading
+import time
+import uuid
+from collections import OrderedDict, deque
+from typing import Deque, Dict, List, Optional, Tuple
+
+from .state_store import StateStore
+
+logger = logging.getLogger(__name__)
+
+# Fixed cost of a session object, its deque and the index slot it occupies
+_SESSION_OVERHEAD = 512
+
+
+class Session:
+    """Conversation state for one client.
+
+    History is a ring buffer of ``(user_text, response)`` pairs: once it holds
+    ``max_exchanges`` exchanges the oldest one is dropped, so a session never
+    grows past a fixed number of entries however long the client stays connected.
+    """
+
+    __slots__ = ("session_id", "created", "last_active", "_history", "_history_bytes")
+
+    def __init__(self, session_id: str, max_exchanges: int = 10):
+        self.session_id = session_id
+        self.created = time.time()
+        self.last_active = self.created
+        self._history: Deque[Tuple[str, str]] = deque(maxlen=max_exchanges)
+        self._history_bytes = 0
+
+    @property
+    def max_exchanges(self) -> int:
+        return self._history.maxlen
+
+    def __len__(self) -> int:
+        return len(self._history)
+
+    def add_exchange(self, user_text: str, response: str):
+        """Record one message and the reply it got."""
+        if len(self._history) == self._history.maxlen:
+            self._history_bytes -= _exchange_size(self._history[0])
+        # Canned replies are shared across sessions instead of copied per exchange
+        exchange = (user_text, sys.intern(response))
+        self._history.append(exchange)
+        self._history_bytes += _exchange_size(exchange)
+        self.last_active = time.time()
+
+    def history(self) -> List[Dict]:
+        """Return the history as role/content messages, oldest first."""
+        messages = []
+        for user_text, response in self._history:
+            messages.append({"role": "user", "content": user_text})
+            messages.append({"role": "assistant", "content": response})
+        return messages
+
+    def memory_usage(self) -> int:
+        """Approximate bytes held by this session."""
+        return _SESSION_OVERHEAD + self._history_bytes
+
+    def to_dict(self) -> Dict:
+        """Serialize the session for a shared ``StateStore``."""
+        return {
+            "session_id": self.session_id,
+            "created": self.created,
+            "exchanges": [list(exchange) for exchange in self._history]
+        }
+
+    @classmethod
+    def from_dict(cls, data: Dict, max_exchanges: int = 10) -> "Session":
+        session = cls(data["session_id"], max_exchanges)
+        session.created = data.get("created", session.created)
+        for user_text, response in data.get("exchanges", []):
+            session.add_exchange(user_text, response)
+        session.last_active = time.time()
+        return session
+
+
+def _exchange_size(exchange: Tuple[str, str]) -> int:
+    return sys.getsizeof(exchange) + sys.getsizeof(exchange[0]) + sys.getsizeof(exchange[1])
+
+
+class SessionStore:
+    def __init__(self, max_exchanges: int = 10, idle_timeout: float = 1800,
+                 max_sessions: int = 10000, shared: Optional[StateStore] = None):
+        """Create an in-memory store of conversation sessions.
+
+        Sessions idle for more than ``idle_timeout`` seconds are evicted on the
+        next access to the store, and the least recently active session is
+        evicted when ``max_sessions`` would be exceeded.
+
+        Args:
+            max_exchanges: History length kept per session
+            idle_timeout: Seconds of inactivity before a session is dropped
+            max_sessions: Maximum number of live sessions
+            shared: Store that ``save()`` writes sessions to and that unknown
+                ids are looked up in, so a client reconnecting to another
+                worker process keeps its history
+        """
+        if max_exchanges < 1:
+            raise ValueError("max_exchanges must be at least 1")
+        if max_sessions < 1:
+            raise ValueError("max_sessions must be at least 1")
+        self.max_exchanges = max_exchanges
+        self.idle_timeout = idle_timeout
+        self.max_sessions = max_sessions
+        self.shared = shared
+        self.evicted = 0
+        self.loaded = 0
+        self._lock = threading.Lock()
+        # session id -> session, least recently active first
+        self._sessions: "OrderedDict[str, Session]" = OrderedDict()
+
+    def __len__(self) -> int:
+        return len(self._sessions)
+
+    def __contains__(self, session_id: str) -> bool:
+        return session_id in self._sessions
+
+    def get_or_create(self, session_id: Optional[str] = None) -> Session:
+        """Return the session for ``session_id``, creating it if needed.
+
+        A new random id is assigned when ``session_id`` is not given.
+        """
+        now = time.time()
+        with self._lock:
+            self._evict_idle(now)
+            if session_id is None:
+                session_id = uuid.uuid4().hex
+            session = self._sessions.get(session_id)
+            if session is None:
+                session = self._load(session_id) or Session(session_id, self.max_exchanges)
+                self._sessions[session_id] = session
+                while len(self._sessions) > self.max_sessions:
+                    self._sessions.popitem(last=False)
+                    self.evicted += 1
+            session.last_active = now
+            self._sessions.move_to_end(session_id)
+            return session
+
+    def get(self, session_id: str) -> Optional[Session]:
+        """Return the session for ``session_id`` without creating it."""
+        with self._lock:
+            self._evict_idle(time.time())
+            session = self._sessions.get(session_id)
+            return session if session is not None else self._load(session_id)
+
+    def save(self, session: Session):
+        """Write ``session`` to the shared store, if there is one."""
+        if self.shared is None:
+            return
+        try:
+            self.shared.set(session.session_id, session.to_dict())
+        except OSError as e:
+            logger.error(f"Failed to save session {session.session_id}: {e}")
+
+    def remove(self, session_id: str) -> bool:
+        """Drop a session (from the shared store too); returns False if it did not exist here."""
+        if self.shared is not None:
+            self.shared.delete(session_id)
+        with self._lock:
+            return self._sessions.pop(session_id, None) is not None
+
+    def evict_idle(self) -> int:
+        """Drop every idle session now and return how many were dropped."""
+        with self._lock:
+            return self._evict_idle(time.time())
+
+    def memory_usage(self, session_id: Optional[str] = None) -> Dict:
+        """Return approximate memory held per session, or for a single session."""
+        with self._lock:
+            if session_id is not None:
+                session = self._sessions.get(session_id)
+                return {session_id: session.memory_usage()} if session is not None else {}
+            return {sid: session.memory_usage() for sid, session in self._sessions.items()}
+
+    def stats(self) -> Dict:
+        """Return session counts and total approximate memory."""
+        with self._lock:
+            total = sum(session.memory_usage() for session in self._sessions.values())
+            return {
+                "sessions": len(self._sessions),
+                "bytes": total,
+                "evicted": self.evicted,
+                "max_exchanges": self.max_exchanges,
+                "shared": self.shared.name if self.shared is not None else None,
+                "loaded": self.loaded
+            }
+
+    def _load(self, session_id: str) -> Optional[Session]:
+        """Rebuild a session saved by this or another worker."""
+        if self.shared is None:
+            return None
+        data = self.shared.get(session_id)
+        if data is None:
+            return None
+        self.loaded += 1
+        return Session.from_dict(data, self.max_exchanges)
+
+    def _evict_idle(self, now: float) -> int:
+        """Pop sessions from the least recently active end while they are idle."""
+        dropped = 0
+        while self._sessions:
+            session = next(iter(self._sessions.values()))
+            if now - session.last_active <= self.idle_timeout:
+                break
+            self._sessions.popitem(last=False)
+            dropped += 1
+        if dropped:
+            self.evicted += dropped
+            logger.info(f"Evicted {dropped} idle sessions")
+        return dropped
@@ -0,0 +1,265 @@
+"""
+Server-side speech input: voice-activity detection and pluggable offline recognizers.
+
+Clients stream raw 16-bit mono PCM; ``EnergyVAD`` cuts it into utterances
+and a ``Recognizer`` (run on a worker pool) turns each utterance into text.
+"""
+import importlib.util
+import logging
+import math
+from typing import Callable, Dict, List, Optional, Tuple
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+
+class EnergyVAD:
+    def __init__(self, sample_rate: int = 16000, frame_ms: float = 20.0, threshold_db: float = -45.0,
+                 hangover_ms: float = 300.0, min_speech_ms: float = 100.0,
+                 max_utterance_s: float = 15.0, pre_roll_ms: float = 100.0):
+        """Segment a PCM stream into utterances by frame energy.
+
+        A frame is voiced when its RMS level is above ``threshold_db`` (dBFS).
+        An utterance starts at the first voiced frame and ends once
+        ``hangover_ms`` of unvoiced frames follow it, so the endpointing delay
+        is bounded by the hangover. Levels are computed for every frame of a
+        chunk at once.
+
+        Args:
+            sample_rate: Sample rate of the incoming PCM (16-bit mono)
+            frame_ms: Analysis frame length
+            threshold_db: Level above which a frame counts as speech
+            hangover_ms: Silence that ends an utterance
+            min_speech_ms: Utterances with less voiced audio are dropped as noise
+            max_utterance_s: Longer utterances are cut, bounding recognition time
+            pre_roll_ms: Audio kept from before the first voiced frame
+        """
+        self.sample_rate = sample_rate
+        self.frame_samples = max(1, int(sample_rate * frame_ms / 1000))
+        self.threshold_db = threshold_db
+        self.hangover_frames = max(1, math.ceil(hangover_ms / frame_ms))
+        self.min_speech_frames = max(1, math.ceil(min_speech_ms / frame_ms))
+        self.max_utterance_frames = max(1, int(max_utterance_s * 1000 / frame_ms))
+        self.pre_roll_frames = int(pre_roll_ms / frame_ms)
+        self.utterances = 0
+        self.discarded = 0
+        self._pending = b""
+        self._frames: List[np.ndarray] = []
+        self._voiced = 0
+        self._silent_run = 0
+        self._in_speech = False
+
+    @property
+    def in_speech(self) -> bool:
+        return self._in_speech
+
+    @property
+    def speech_samples(self) -> int:
+        """Samples in the utterance collected so far."""
+        return len(self._frames) * self.frame_samples if self._in_speech else 0
+
+    def current(self) -> Optional[np.ndarray]:
+        """The utterance collected so far (for partial transcripts), or None."""
+        if not self._in_speech:
+            return None
+        return np.concatenate(self._frames)
+
+    def levels(self, frames: np.ndarray) -> np.ndarray:
+        """RMS level in dBFS of each row of an ``(n, frame_samples)`` int16 array."""
+        power = np.mean(np.square(frames, dtype=np.float64), axis=1)
+        return 10 * np.log10(power / (32768.0 ** 2) + 1e-12)
+
+    def feed(self, pcm: bytes) -> List[np.ndarray]:
+        """Add PCM bytes and return the utterances completed by them."""
+        data = self._pending + pcm
+        usable = len(data) - len(data) % (2 * self.frame_samples)
+        self._pending = data[usable:]
+        if not usable:
+            return []
+        frames = np.frombuffer(data[:usable], dtype="<i2").reshape(-1, self.frame_samples)
+        voiced = self.levels(frames) > self.threshold_db
+
+        completed = []
+        for frame, is_voiced in zip(frames, voiced):
+            if not self._in_speech:
+                self._frames.append(frame)
+                if not is_voiced:
+                    del self._frames[:-self.pre_roll_frames or len(self._frames)]
+                    continue
+                self._in_speech = True
+                self._voiced = 1
+                self._silent_run = 0
+                continue
+            self._frames.append(frame)
+            if is_voiced:
+                self._voiced += 1
+                self._silent_run = 0
+            else:
+                self._silent_run += 1
+            if self._silent_run >= self.hangover_frames or len(self._frames) >= self.max_utterance_frames:
+                utterance = self._close()
+                if utterance is not None:
+                    completed.append(utterance)
+        return completed
+
+    def flush(self) -> Optional[np.ndarray]:
+        """End the stream: return the utterance in progress, if any."""
+        self._pending = b""
+        if not self._in_speech:
+            self._frames = []
+            return None
+        return self._close()
+
+    def _close(self) -> Optional[np.ndarray]:
+        # Trailing silence (the hangover) carries no speech
+        frames = self._frames[:len(self._frames) - self._silent_run]
+        voiced = self._voiced
+        self._frames = []
+        self._in_speech = False
+        self._voiced = 0
+        self._silent_run = 0
+        if voiced < self.min_speech_frames:
+            self.discarded += 1
+            return None
+        self.utterances += 1
+        return np.concatenate(frames)
+
+    def stats(self) -> Dict:
+        return {"utterances": self.utterances, "discarded": self.discarded}
+
+
+class Recognizer:
+    """Interface for offline speech recognizers.
+
+    ``transcribe`` is called on a worker thread with an engine created by
+    that thread's ``create_engine()``, as with the TTS backends.
+    """
+
+    name = "base"
+    # Modules the recognizer imports at run time
+    requires: Tuple[str, ...] = ()
+
+    def create_engine(self):
+        """Create a per-thread engine (None when the recognizer needs none)."""
+        return None
+
+    def missing_modules(self) -> List[str]:
+        """The modules in ``requires`` that are not installed."""
+        return [module for module in self.requires if importlib.util.find_spec(module) is None]
+
+    def settings(self) -> Dict:
+        return {}
+
+    def transcribe(self, samples: np.ndarray, sample_rate: int, engine=None) -> str:
+        """Return the text spoken in ``samples`` (16-bit mono), or "" if nothing was recognized."""
+        raise NotImplementedError
+
+
+# -- Registry ----------------------------------------------------------------
+
+_RECOGNIZERS: Dict[str, Callable[..., Recognizer]] = {}
+
+
+def register_recognizer(name: str):
+    """Class or factory decorator registering a recognizer under ``name``."""
+    def decorator(factory):
+        _RECOGNIZERS[name] = factory
+        return factory
+    return decorator
+
+
+def available_recognizers() -> List[str]:
+    return sorted(_RECOGNIZERS)
+
+
+def create_recognizer(name: str, **options) -> Recognizer:
+    """Instantiate the recognizer registered as ``name``."""
+    try:
+        factory = _RECOGNIZERS[name]
+    except KeyError:
+        raise ValueError(f"Unknown speech recognizer '{name}', expected one of {available_recognizers()}")
+    return factory(**options)
+
+
+# -- Recognizers -------------------------------------------------------------
+
+@register_recognizer("sphinx")
+class SphinxRecognizer(Recognizer):
+    """CMU PocketSphinx through the SpeechRecognition package; runs fully offline."""
+
+    name = "sphinx"
+    requires = ("speech_recognition", "pocketsphinx")
+
+    def __init__(self, language: str = "en-US"):
+        self.language = language
+
+    def create_engine(self):
+        import speech_recognition as sr
+
+        return sr.Recognizer()
+
+    def settings(self) -> Dict:
+        return {"language": self.language}
+
+    def transcribe(self, samples: np.ndarray, sample_rate: int, engine=None) -> str:
+        import speech_recognition as sr
+
+        engine = engine if engine is not None else self.create_engine()
+        audio = sr.AudioData(samples.astype("<i2").tobytes(), sample_rate, 2)
+        try:
+            return engine.recognize_sphinx(audio, language=self.language)
+        except sr.UnknownValueError:
+            return ""
+
+
+@register_recognizer("tones")
+class ToneRecognizer(Recognizer):
+    """Deterministic recognizer for tests and load testing: decodes the ``sine`` TTS backend.
+
+    Each tone is matched against the 24 pitches the sine backend uses, so
+    audio rendered from lowercase text decodes back to that text (``y`` and
+    ``z`` share their pitch with ``a`` and ``b``).
+    """
+
+    name = "tones"
+
+    def __init__(self, tone_ms: float = 40.0, silence_db: float = -45.0):
+        self.tone_ms = tone_ms
+        self.silence_db = silence_db
+        # Pitch index (ord(char) % 24) -> first lowercase letter with that pitch
+        self._letters: Dict[int, str] = {}
+        for letter in "abcdefghijklmnopqrstuvwxyz":
+            self._letters.setdefault(ord(letter) % 24, letter)
+        self._bases: Dict[int, np.ndarray] = {}
+
+    def settings(self) -> Dict:
+        return {"tone_ms": self.tone_ms}
+
+    def _basis(self, sample_rate: int) -> np.ndarray:
+        basis = self._bases.get(sample_rate)
+        if basis is None:
+            tone_samples = int(sample_rate * self.tone_ms / 1000)
+            t = np.arange(tone_samples) / sample_rate
+            frequencies = 220.0 * np.power(2.0, np.arange(24) / 12)
+            basis = self._bases[sample_rate] = np.exp(-2j * np.pi * np.outer(t, frequencies))
+        return basis
+
+    def transcribe(self, samples: np.ndarray, sample_rate: int, engine=None) -> str:
+        basis = self._basis(sample_rate)
+        tone_samples = basis.shape[0]
+        signal = samples.astype(np.float64) / 32768.0
+        loud = np.flatnonzero(np.abs(signal) > 0.01)
+        if not len(loud):
+            return ""
+        # Every tone starts at phase zero, one sample before the first loud one
+        start = max(0, loud[0] - 1)
+        count = (len(signal) - start) // tone_samples
+        tones = signal[start:start + count * tone_samples].reshape(count, tone_samples)
+        levels = 10 * np.log10(np.mean(np.square(tones), axis=1) + 1e-12)
+        pitches = np.argmax(np.abs(tones @ basis), axis=1)
+        text = "".join(
+            self._letters.get(int(pitch), "?") if level > self.silence_db else " "
+            for pitch, level in zip(pitches, levels)
+        )
+        return " ".join(text.split())
@@ -0,0 +1,140 @@
+"""
+Sentence-level synthesis pipeline: generate audio chunk by chunk and emit each
+chunk as soon as it is ready while the next one is being generated.
+"""
+import logging
+import queue
+import re
+import threading
+from typing import Callable, Iterator, List, Optional
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+_SENTENCE_END = re.compile(r"(?<=[.!?])\s+")
+_CLAUSE_END = re.compile(r"(?<=[,;:])\s+")
+
+# Sentinel marking the end of generation
+_DONE = object()
+
+
+def split_sentences(text: str, max_chars: int = 200) -> List[str]:
+    """Split text into sentences, breaking overly long sentences at clause boundaries.
+
+    Args:
+        text: Text to split
+        max_chars: Sentences longer than this are split on ``,``/``;``/``:``
+
+    Returns:
+        Non-empty chunks in their original order
+    """
+    chunks = []
+    for sentence in _SENTENCE_END.split(text.strip()):
+        sentence = sentence.strip()
+        if not sentence:
+            continue
+        if len(sentence) <= max_chars:
+            chunks.append(sentence)
+            continue
+        # Merge clauses back together up to the size limit
+        current = ""
+        for clause in _CLAUSE_END.split(sentence):
+            if current and len(current) + len(clause) + 1 > max_chars:
+                chunks.append(current)
+                current = clause
+            else:
+                current = f"{current} {clause}" if current else clause
+        if current:
+            chunks.append(current)
+    return chunks
+
+
+def crossfade(tail: np.ndarray, head: np.ndarray) -> np.ndarray:
+    """Overlap-add the end of one chunk with the start of the next using linear ramps."""
+    length = min(len(tail), len(head))
+    if length == 0:
+        return np.zeros(0, dtype=np.float32)
+    fade_in = np.linspace(0.0, 1.0, length, dtype=np.float32)
+    return tail[-length:] * (1.0 - fade_in) + head[:length] * fade_in
+
+
+class SentencePipeline:
+    def __init__(self, generate_fn: Callable[[str], Optional[np.ndarray]],
+                 sample_rate: int, crossfade_ms: float = 20.0, lookahead: int = 1):
+        """Create a pipeline around a per-chunk generation function.
+
+        Args:
+            generate_fn: Generates mono float audio for one text chunk
+            sample_rate: Sample rate of the generated audio
+            crossfade_ms: Length of the crossfade applied at chunk boundaries
+            lookahead: Number of generated chunks allowed to wait for the consumer
+        """
+        self.generate_fn = generate_fn
+        self.sample_rate = sample_rate
+        self.fade_samples = int(sample_rate * crossfade_ms / 1000)
+        self.lookahead = max(1, lookahead)
+
+    def run(self, text: str, max_chars: int = 200) -> Iterator[np.ndarray]:
+        """Yield audio segments for ``text`` in order.
+
+        The first segment is yielded as soon as the first chunk is generated;
+        generation of the following chunk proceeds on a background thread
+        meanwhile. Chunk boundaries are crossfaded, so each yielded segment
+        holds back its last ``fade_samples`` samples until the next chunk is
+        available.
+        """
+        chunks = split_sentences(text, max_chars=max_chars)
+        if not chunks:
+            return
+        ready: queue.Queue = queue.Queue(maxsize=self.lookahead)
+        stop = threading.Event()
+
+        def produce():
+            try:
+                for chunk in chunks:
+                    if stop.is_set():
+                        return
+                    audio = self.generate_fn(chunk)
+                    if audio is None:
+                        logger.warning(f"No audio generated for chunk: {chunk[:50]}")
+                        continue
+                    _put(ready, np.asarray(audio, dtype=np.float32).reshape(-1), stop)
+            except Exception as e:
+                _put(ready, e, stop)
+            finally:
+                _put(ready, _DONE, stop)
+
+        producer = threading.Thread(target=produce, name="speech-pipeline", daemon=True)
+        producer.start()
+        held = np.zeros(0, dtype=np.float32)
+        try:
+            while True:
+                item = ready.get()
+                if item is _DONE:
+                    break
+                if isinstance(item, Exception):
+                    raise item
+                if len(held):
+                    blended = crossfade(held, item)
+                    item = np.concatenate([blended, item[len(blended):]])
+                # Hold back the tail so it can be blended with the next chunk
+                split = max(0, len(item) - self.fade_samples)
+                if split:
+                    yield item[:split]
+                held = item[split:]
+            if len(held):
+                yield held
+        finally:
+            # Lets the producer exit early if the consumer stops iterating
+            stop.set()
+
+
+def _put(ready: queue.Queue, item, stop: threading.Event):
+    """Queue an item for the consumer unless it has gone away."""
+    while not stop.is_set():
+        try:
+            ready.put(item, timeout=0.1)
+            return
+        except queue.Full:
+            continue
@@ -0,0 +1,182 @@
+"""
+Key-value stores for state that must outlive a worker process or be shared between workers.
+"""
+import hashlib
+import json
+import logging
+import os
+import threading
+import time
+from pathlib import Path
+from typing import Dict, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+
+class StateStore:
+    """Interface for JSON-serializable state keyed by string.
+
+    Entries not written for ``ttl`` seconds are treated as gone.
+    """
+
+    name = "base"
+
+    def __init__(self, ttl: float = 1800):
+        self.ttl = ttl
+
+    def get(self, key: str) -> Optional[Dict]:
+        """Return the value stored under ``key``, or None."""
+        raise NotImplementedError
+
+    def set(self, key: str, value: Dict):
+        """Store ``value`` under ``key``, replacing any earlier value."""
+        raise NotImplementedError
+
+    def delete(self, key: str):
+        """Remove ``key`` if present."""
+        raise NotImplementedError
+
+    def close(self):
+        """Release resources held by the store."""
+
+
+class LocalStateStore(StateStore):
+    """In-process store: state is private to one worker (and a stand-in for tests)."""
+
+    name = "local"
+
+    def __init__(self, ttl: float = 1800):
+        super().__init__(ttl)
+        self._lock = threading.Lock()
+        self._values: Dict[str, Tuple[float, Dict]] = {}
+
+    def get(self, key: str) -> Optional[Dict]:
+        with self._lock:
+            entry = self._values.get(key)
+            if entry is None:
+                return None
+            if time.time() - entry[0] > self.ttl:
+                del self._values[key]
+                return None
+            return entry[1]
+
+    def set(self, key: str, value: Dict):
+        with self._lock:
+            self._values[key] = (time.time(), value)
+
+    def delete(self, key: str):
+        with self._lock:
+            self._values.pop(key, None)
+
+
+class FileStateStore(StateStore):
+    """Store shared by every worker on a host: one JSON file per key in ``directory``.
+
+    Writes are atomic (written under a temporary name, then renamed), so a
+    reader in another process sees either the old or the new value. File
+    names are hashes of the key, so keys chosen by clients cannot escape
+    the directory. Entries of clients that never come back are removed by
+    ``sweep()``, which ``set`` starts in the background every
+    ``sweep_interval`` seconds.
+    """
+
+    name = "file"
+
+    def __init__(self, directory: str, ttl: float = 1800, sweep_interval: float = 60.0):
+        super().__init__(ttl)
+        self.directory = Path(directory)
+        self.directory.mkdir(parents=True, exist_ok=True)
+        self.sweep_interval = sweep_interval
+        self.swept = 0
+        # The first write sweeps what earlier runs left behind
+        self._next_sweep = 0.0
+        self._sweep_lock = threading.Lock()
+
+    def path_for(self, key: str) -> Path:
+        return self.directory / f"{hashlib.sha256(key.encode('utf-8')).hexdigest()[:32]}.json"
+
+    def get(self, key: str) -> Optional[Dict]:
+        path = self.path_for(key)
+        try:
+            if time.time() - path.stat().st_mtime > self.ttl:
+                self._unlink(path)
+                return None
+            return json.loads(path.read_text(encoding="utf-8"))
+        except FileNotFoundError:
+            return None
+        except (OSError, ValueError) as e:
+            logger.error(f"Failed to read state {path.name}: {e}")
+            return None
+
+    def set(self, key: str, value: Dict):
+        path = self.path_for(key)
+        partial = path.with_name(f".{path.name}.{os.getpid()}.{threading.get_ident()}.partial")
+        partial.write_text(json.dumps(value), encoding="utf-8")
+        os.replace(partial, path)
+        self._schedule_sweep()
+
+    def delete(self, key: str):
+        self._unlink(self.path_for(key))
+
+    def sweep(self) -> int:
+        """Remove expired entries, and partial files left by crashed writers.
+
+        Blocking. Returns:
+            Number of files removed
+        """
+        now = time.time()
+        removed = 0
+        with os.scandir(self.directory) as scan:
+            for item in scan:
+                if not item.name.endswith((".json", ".partial")):
+                    continue
+                try:
+                    if now - item.stat().st_mtime <= self.ttl:
+                        continue
+                    os.remove(item.path)
+                except FileNotFoundError:
+                    # Removed by a reader or another worker's sweep
+                    continue
+                removed += 1
+        self.swept += removed
+        if removed:
+            logger.info(f"Removed {removed} expired state files from {self.directory}")
+        return removed
+
+    def _schedule_sweep(self):
+        if self.sweep_interval <= 0:
+            return
+        now = time.monotonic()
+        with self._sweep_lock:
+            if now < self._next_sweep:
+                return
+            self._next_sweep = now + self.sweep_interval
+        # Listing the directory can be slow, so callers on the event loop never wait for it
+        threading.Thread(target=self._sweep_in_background, name="state-sweep", daemon=True).start()
+
+    def _sweep_in_background(self):
+        try:
+            self.sweep()
+        except OSError as e:
+            logger.error(f"Failed to sweep state in {self.directory}: {e}")
+
+    def _unlink(self, path: Path):
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            pass
+
+
+def create_state_store(name: str, directory: Optional[str] = None, ttl: float = 1800) -> StateStore:
+    """Build the state store selected by ``STATE_BACKEND``.
+
+    Raises:
+        ValueError: If ``name`` is unknown or a file store has no directory
+    """
+    if name == "local":
+        return LocalStateStore(ttl=ttl)
+    if name == "file":
+        if not directory:
+            raise ValueError("The file state store needs a directory")
+        return FileStateStore(directory, ttl=ttl)
+    raise ValueError(f"Unknown state backend '{name}', expected one of ['file', 'local']")
@@ -0,0 +1,446 @@
+"""
+Pluggable text-to-speech backends behind a single interface.
+
+Every backend returns audio buffers plus metadata (``SpeechResult``) and offers
+sync (``synthesize``), async (``asynthesize``) and streaming (``stream``)
+variants. The shared base class adds the file-based API used by the worker
+pool and the ``/audio`` endpoint, including the content-addressed audio cache.
+"""
+import asyncio
+import hashlib
+import logging
+import math
+import os
+import sys
+import tempfile
+import threading
+import time
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Callable, Dict, Iterator, List, Optional, Union
+
+from .audio_cache import AudioCache
+from .audio_encoder import AudioEncoder
+from .audio_memory import AudioBufferPool
+from .audio_store import AudioStore
+from .audio_format import EXTENSIONS, describe_audio, pcm_to_wav, probe_audio
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class SpeechResult:
+    """Synthesized audio and what is needed to play or store it."""
+    audio: bytes
+    codec: str
+    sample_rate: Optional[int]
+    channels: Optional[int]
+    backend: str
+
+    @classmethod
+    def from_bytes(cls, audio: bytes, backend: str) -> "SpeechResult":
+        """Build a result by probing the container of ``audio``."""
+        return cls(audio=audio, backend=backend, **probe_audio(audio))
+
+    @property
+    def extension(self) -> str:
+        return EXTENSIONS.get(self.codec, ".bin")
+
+
+class TTSBackend:
+    """Base class for speech backends."""
+
+    name = "base"
+    # Worker threads the backend's engines can run on in one process (None: any number)
+    max_workers: Optional[int] = None
+    # True when ``stream`` yields audio while the rest is still being rendered
+    incremental_stream = False
+
+    def __init__(self, audio_cache: Optional[AudioCache] = None, audio_store: Optional[AudioStore] = None,
+                 audio_memory: Optional[AudioBufferPool] = None, encoder: Optional[AudioEncoder] = None):
+        self.audio_cache = audio_cache
+        # Where rendered audio goes when it is not cached
+        self.audio_store = audio_store
+        # Short utterances are kept in memory instead of on disk when set
+        self.audio_memory = audio_memory
+        # Transcodes rendered audio to a compact codec before it is stored
+        self.encoder = encoder
+        self._default_engine = None
+        self._default_engine_lock = threading.Lock()
+
+    # -- Backend interface -------------------------------------------------
+
+    def create_engine(self):
+        """Create the per-thread engine passed back to ``synthesize``/``stream``."""
+        return None
+
+    def settings(self) -> Dict:
+        """Engine settings that change the rendered audio, used in cache keys."""
+        return {}
+
+    def synthesize(self, text: str, engine=None) -> SpeechResult:
+        """Render ``text`` and return the complete audio."""
+        raise NotImplementedError
+
+    def stream(self, text: str, engine=None, chunk_size: int = 32 * 1024) -> Iterator[Union[Dict, bytes]]:
+        """Yield a header dict (codec, sample_rate, channels) followed by audio chunks.
+
+        The default implementation renders the whole text first; backends that
+        can produce audio incrementally override it.
+        """
+        audio = describe_audio(self.synthesize(text, engine=engine).audio)
+        yield from _chunked(audio, chunk_size)
+
+    async def asynthesize(self, text: str) -> SpeechResult:
+        """Render ``text`` without blocking the event loop."""
+        return await asyncio.to_thread(self._synthesize_default, text)
+
+    def batch_stats(self) -> Optional[Dict]:
+        """Batch-size and queue-wait figures for backends that batch requests, else None."""
+        return None
+
+    @property
+    def prefers_streaming(self) -> bool:
+        """Whether streaming starts playback sooner than fetching the rendered file.
+
+        Encoded audio is only streamed once complete, so this needs raw PCM.
+        """
+        return self.incremental_stream and self.encoder is None
+
+    def close(self):
+        """Release engines and other resources."""
+
+    # -- File API used by the worker pool and /audio -----------------------
+
+    def cache_key(self, text: str) -> str:
+        settings = self.settings()
+        if self.encoder is not None:
+            settings.update(self.encoder.settings())
+        return AudioCache.make_key(text, self.name, **settings)
+
+    def cached_speech(self, text: str) -> Optional[str]:
+        """Return the filename of already rendered audio for ``text``, if any."""
+        key = self.cache_key(text)
+        if self.audio_memory is not None:
+            filename = self.audio_memory.get(key)
+            # The pool has already looked in its spill tier
+            if filename is not None or self.audio_memory.spill is self.audio_cache:
+                return filename
+        if self.audio_cache is None:
+            return None
+        return self.audio_cache.get(key)
+
+    def generate_speech(self, text: str, engine=None) -> str:
+        """Render ``text`` (or reuse the cached rendering) and return the audio filename."""
+        cached = self.cached_speech(text)
+        if cached:
+            logger.debug(f"Serving cached speech: {cached}")
+            return cached
+        start_time = time.time()
+        result = self.synthesize(text, engine=engine)
+        if not result.audio:
+            raise RuntimeError("Audio file is empty")
+        result = self.encode(result)
+        if self.audio_memory is not None and self.audio_memory.admits(len(result.audio)):
+            filename = self.audio_memory.put(self.cache_key(text), result.audio, result.extension)
+        elif self.audio_cache is not None:
+            filename = self.audio_cache.put_bytes(self.cache_key(text), result.audio, result.extension)
+        else:
+            filename = self._store(result)
+        logger.debug(f"Speech generation completed in {time.time() - start_time:.2f} seconds")
+        return filename
+
+    def encode(self, result: SpeechResult) -> SpeechResult:
+        """Transcode ``result`` with the configured encoder (unchanged without one)."""
+        if self.encoder is None:
+            return result
+        audio, sample_rate = self.encoder.encode(result.audio)
+        if sample_rate is None:
+            return result
+        return SpeechResult(
+            audio=audio,
+            codec=self.encoder.container,
+            sample_rate=sample_rate,
+            channels=result.channels,
+            backend=result.backend
+        )
+
+    def iter_speech(self, text: str, engine=None, chunk_size: int = 32 * 1024) -> Iterator[Union[Dict, bytes]]:
+        """Stream speech for ``text``, replaying the cached rendering when there is one.
+
+        With an encoder the encoded container is streamed instead of raw PCM,
+        so it is rendered (and cached) whole first, as ``generate_speech`` does.
+        """
+        cached = self.cached_speech(text)
+        if not cached and self.encoder is not None:
+            cached = self.generate_speech(text, engine=engine)
+        if cached:
+            data = self.audio_buffer(cached)
+            if data is None:
+                data = self.audio_path(cached).read_bytes()
+            yield from _chunked(describe_audio(data), chunk_size)
+            return
+        yield from self.stream(text, engine=engine, chunk_size=chunk_size)
+
+    def audio_buffer(self, filename: str) -> Optional[memoryview]:
+        """Return audio returned by ``generate_speech`` if it is held in memory."""
+        if self.audio_memory is None:
+            return None
+        return self.audio_memory.buffer(filename)
+
+    @property
+    def audio_dir(self) -> Path:
+        """Directory holding uncached audio."""
+        if self.audio_store is not None:
+            return self.audio_store.directory
+        return Path(tempfile.gettempdir())
+
+    def audio_path(self, filename: str) -> Path:
+        """Return the on-disk location of audio returned by ``generate_speech``."""
+        if self.audio_cache is not None:
+            cached_path = self.audio_cache.path_for(filename)
+            if cached_path is not None:
+                return cached_path
+        if self.audio_store is not None:
+            stored_path = self.audio_store.path_for(filename)
+            if stored_path is not None:
+                return stored_path
+        return self.audio_dir / filename
+
+    def _store(self, result: SpeechResult) -> str:
+        """Write uncached audio under a name derived from its content."""
+        digest = hashlib.sha256(result.audio).hexdigest()[:32]
+        if self.audio_store is not None:
+            return self.audio_store.lookup(digest) or self.audio_store.put_bytes(
+                digest, result.audio, result.extension
+            )
+        filename = f"speech_{digest}{result.extension}"
+        target = self.audio_dir / filename
+        if not target.exists():
+            # Write under a temporary name so readers never see a partial file
+            partial = target.with_name(f".{filename}.{threading.get_ident()}.partial")
+            partial.write_bytes(result.audio)
+            os.replace(partial, target)
+        return filename
+
+    def _synthesize_default(self, text: str) -> SpeechResult:
+        """Synthesize with a lazily created engine shared under a lock."""
+        with self._default_engine_lock:
+            if self._default_engine is None:
+                self._default_engine = self.create_engine()
+            return self.synthesize(text, engine=self._default_engine)
+
+
+def _chunked(audio: Dict, chunk_size: int) -> Iterator[Union[Dict, bytes]]:
+    """Yield the header of a ``describe_audio`` result and then its payload in chunks."""
+    payload = memoryview(audio.pop("payload"))
+    yield audio
+    # Keep chunks aligned to whole 16-bit stereo frames
+    chunk_size -= chunk_size % 4
+    for start in range(0, len(payload), chunk_size):
+        yield bytes(payload[start:start + chunk_size])
+
+
+# -- Registry ----------------------------------------------------------------
+
+_BACKENDS: Dict[str, Callable[..., TTSBackend]] = {}
+
+
+def register_backend(name: str):
+    """Class or factory decorator registering a backend under ``name``."""
+    def decorator(factory):
+        _BACKENDS[name] = factory
+        return factory
+    return decorator
+
+
+def available_backends() -> List[str]:
+    return sorted(_BACKENDS)
+
+
+def create_backend(name: str, **options) -> TTSBackend:
+    """Instantiate the backend registered as ``name``."""
+    try:
+        factory = _BACKENDS[name]
+    except KeyError:
+        raise ValueError(f"Unknown TTS backend '{name}', expected one of {available_backends()}")
+    return factory(**options)
+
+
+# -- Backends ----------------------------------------------------------------
+
+# pyttsx3 drivers whose engines share process-wide state: espeak registers a
+# single synthesis callback with the library, and the macOS drivers run on
+# the main run loop. Only one thread can speak through them.
+SHARED_PYTTSX3_DRIVERS = ("espeak", "nsss", "avspeech")
+
+
+def default_pyttsx3_driver() -> str:
+    """The driver ``pyttsx3.Engine`` picks when none is named."""
+    if sys.platform == "win32":
+        return "sapi5"
+    if sys.platform == "darwin":
+        return "nsss"
+    return "espeak"
+
+
+@register_backend("pyttsx3")
+class Pyttsx3Backend(TTSBackend):
+    """System speech engine (espeak, SAPI5 or NSSpeechSynthesizer) via pyttsx3."""
+
+    name = "pyttsx3"
+
+    def __init__(self, agent=None, audio_cache: Optional[AudioCache] = None,
+                 audio_store: Optional[AudioStore] = None, audio_memory: Optional[AudioBufferPool] = None,
+                 encoder: Optional[AudioEncoder] = None):
+        super().__init__(audio_cache, audio_store, audio_memory, encoder)
+        self._owns_agent = agent is None
+        if agent is None:
+            from .dia_model import DiaAgent
+            agent = DiaAgent()
+        self.agent = agent
+        self.driver_name = agent.driver_name or default_pyttsx3_driver()
+        if self.driver_name in SHARED_PYTTSX3_DRIVERS:
+            self.max_workers = 1
+        # Creating the first engine resolves the voice used in cache keys
+        self.agent.engine
+
+    def create_engine(self):
+        return self.agent.create_engine()
+
+    def settings(self) -> Dict:
+        return {"voice": self.agent.voice_id, "rate": self.agent.rate, "volume": self.agent.volume}
+
+    def synthesize(self, text: str, engine=None) -> SpeechResult:
+        # pyttsx3 can only render to a file; read it back and remove it
+        filename = self.agent.generate_speech(text, engine=engine)
+        path = Path(tempfile.gettempdir()) / filename
+        self.agent.temp_files.discard(str(path))
+        try:
+            audio = path.read_bytes()
+        finally:
+            try:
+                os.remove(path)
+            except OSError as e:
+                logger.error(f"Failed to remove temporary file {path}: {e}")
+        return SpeechResult.from_bytes(audio, self.name)
+
+    def close(self):
+        if self._owns_agent:
+            self.agent.cleanup()
+
+
+@register_backend("dia")
+class DiaBackend(TTSBackend):
+    """Dia-1.6B neural speech model."""
+
+    name = "dia"
+    incremental_stream = True
+
+    def __init__(self, agent=None, audio_cache: Optional[AudioCache] = None,
+                 audio_store: Optional[AudioStore] = None, audio_memory: Optional[AudioBufferPool] = None,
+                 encoder: Optional[AudioEncoder] = None, **agent_options):
+        super().__init__(audio_cache, audio_store, audio_memory, encoder)
+        self._owns_agent = agent is None
+        if agent is None:
+            from .dia_agent import DiaAgent
+            agent = DiaAgent(**agent_options)
+        self.agent = agent
+
+    def create_engine(self):
+        return self.agent.create_engine()
+
+    def settings(self) -> Dict:
+        return {"speaker": "S1", "inference_mode": self.agent.inference.mode}
+
+    def synthesize(self, text: str, engine=None) -> SpeechResult:
+        # Called on pool threads; concurrent requests share batched forward passes
+        return self._to_result(self.agent.generate_audio_blocking(text))
+
+    def stream(self, text: str, engine=None, chunk_size: int = 32 * 1024) -> Iterator[Union[Dict, bytes]]:
+        # Sentence-level pipeline: audio starts before the full text is generated
+        return self.agent.iter_speech(text, chunk_size=chunk_size)
+
+    async def asynthesize(self, text: str) -> SpeechResult:
+        # Concurrent callers share batched forward passes
+        return self._to_result(await self.agent.generate_audio(text))
+
+    def batch_stats(self) -> Optional[Dict]:
+        return self.agent.batch_stats()
+
+    def close(self):
+        if self._owns_agent:
+            self.agent.close()
+
+    def _to_result(self, audio) -> SpeechResult:
+        from .dia_agent import SAMPLE_RATE, to_pcm16
+
+        if audio is None:
+            raise RuntimeError("Dia did not generate any audio")
+        return SpeechResult(
+            audio=pcm_to_wav(to_pcm16(audio), SAMPLE_RATE),
+            codec="wav",
+            sample_rate=SAMPLE_RATE,
+            channels=1,
+            backend=self.name
+        )
+
+
+@register_backend("sine")
+class SineBackend(TTSBackend):
+    """Deterministic in-process synthetic backend for tests and load testing.
+
+    Each character becomes a short sine tone whose pitch depends on the
+    character, so identical text always yields identical audio. An optional
+    per-character delay simulates the cost of a real engine.
+    """
+
+    name = "sine"
+    incremental_stream = True
+
+    def __init__(self, audio_cache: Optional[AudioCache] = None, audio_store: Optional[AudioStore] = None,
+                 audio_memory: Optional[AudioBufferPool] = None, sample_rate: int = 16000,
+                 tone_ms: float = 40.0, seconds_per_char: float = 0.0, encoder: Optional[AudioEncoder] = None):
+        super().__init__(audio_cache, audio_store, audio_memory, encoder)
+        self.sample_rate = sample_rate
+        self.tone_samples = int(sample_rate * tone_ms / 1000)
+        self.seconds_per_char = seconds_per_char
+
+    def settings(self) -> Dict:
+        return {"sample_rate": self.sample_rate, "tone_samples": self.tone_samples}
+
+    def synthesize(self, text: str, engine=None) -> SpeechResult:
+        return SpeechResult(
+            audio=pcm_to_wav(b"".join(self._render(text)), self.sample_rate),
+            codec="wav",
+            sample_rate=self.sample_rate,
+            channels=1,
+            backend=self.name
+        )
+
+    def stream(self, text: str, engine=None, chunk_size: int = 32 * 1024) -> Iterator[Union[Dict, bytes]]:
+        yield {"codec": "pcm_s16le", "sample_rate": self.sample_rate, "channels": 1}
+        chunk_size -= chunk_size % 2
+        pending = b""
+        for tone in self._render(text):
+            pending += tone
+            while len(pending) >= chunk_size:
+                yield pending[:chunk_size]
+                pending = pending[chunk_size:]
+        if pending:
+            yield pending
+
+    def _render(self, text: str) -> Iterator[bytes]:
+        """Yield one 16-bit PCM tone per character."""
+        import numpy as np
+
+        t = np.arange(self.tone_samples, dtype=np.float32) / self.sample_rate
+        for char in text:
+            if self.seconds_per_char:
+                time.sleep(self.seconds_per_char)
+            if char.isspace():
+                yield bytes(2 * self.tone_samples)
+                continue
+            frequency = 220.0 * math.pow(2, (ord(char) % 24) / 12)
+            tone = 0.3 * np.sin(2 * math.pi * frequency * t)
+            yield (tone * 32767).astype("<i2").tobytes()
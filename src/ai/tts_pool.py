@@ -0,0 +1,227 @@
+"""
+Bounded worker pool that runs speech synthesis off the event loop.
+"""
+import asyncio
+import contextvars
+import logging
+import queue
+import threading
+import time
+from typing import Any, AsyncIterator, Callable, List, Optional
+
+logger = logging.getLogger(__name__)
+
+# Sentinel used to tell worker threads to exit
+_STOP = object()
+
+# Sentinel marking the end of a streamed job
+_END = object()
+
+
+class TTSBusyError(RuntimeError):
+    """Raised when the synthesis queue is full and a job cannot be admitted."""
+
+
+class TTSWorkerPool:
+    def __init__(self, backend: Any, workers: int = 2, queue_size: int = 16, latency: Any = None,
+                 name: str = "tts", stage: str = "synthesis"):
+        """Create a pool of synthesis threads.
+
+        Each worker thread creates its own engine through ``backend.create_engine()``
+        because TTS engines such as pyttsx3 are not thread-safe. The pool also
+        runs speech recognizers, which follow the same one-engine-per-thread rule
+        and only use ``submit``.
+
+        Args:
+            backend: A ``TTSBackend`` (anything providing ``create_engine()``,
+                ``generate_speech(text, engine=...)`` and ``iter_speech(...)``)
+            workers: Number of worker threads (and engines)
+            queue_size: Maximum number of jobs waiting for a worker
+            latency: Optional histogram (anything with ``observe(seconds, stage=...)``)
+                recording each job's ``<stage>_queue_wait`` and ``<stage>`` time
+            name: Prefix of the worker thread names
+            stage: Stage label used for the latency histogram
+        """
+        if workers < 1:
+            raise ValueError("workers must be at least 1")
+        if queue_size < 1:
+            raise ValueError("queue_size must be at least 1")
+        self.backend = backend
+        self.workers = workers
+        self.queue_size = queue_size
+        self.latency = latency
+        self.name = name
+        self.stage = stage
+        self._jobs: queue.Queue = queue.Queue(maxsize=queue_size)
+        self._threads: List[threading.Thread] = []
+        self._busy = 0
+        self.cancelled = 0
+        self._lock = threading.Lock()
+
+    def start(self):
+        """Start the worker threads."""
+        if self._threads:
+            return
+        for index in range(self.workers):
+            thread = threading.Thread(
+                target=self._worker_loop,
+                name=f"{self.name}-worker-{index}",
+                daemon=True
+            )
+            thread.start()
+            self._threads.append(thread)
+        logger.info(f"Started {self.workers} {self.name} workers (queue size {self.queue_size})")
+
+    def shutdown(self, timeout: Optional[float] = 5.0):
+        """Stop the worker threads once they finish their current job."""
+        for _ in self._threads:
+            # Block rather than fail here: shutdown must always get through
+            self._jobs.put(_STOP)
+        for thread in self._threads:
+            thread.join(timeout)
+        self._threads.clear()
+
+    @property
+    def pending(self) -> int:
+        """Number of jobs waiting for a worker."""
+        return self._jobs.qsize()
+
+    @property
+    def busy(self) -> int:
+        """Number of workers currently running a job."""
+        return self._busy
+
+    def submit(self, job: Callable[[Any], Any]) -> "asyncio.Future":
+        """Queue ``job(engine)`` for a worker and return an awaitable future.
+
+        Must be called from the event loop thread.
+
+        Raises:
+            TTSBusyError: If the admission queue is full
+        """
+        if not self._threads:
+            raise RuntimeError("TTS worker pool is not running")
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        try:
+            # The job runs in the caller's context, so its log records keep the request ids
+            self._jobs.put_nowait((job, loop, future, time.perf_counter(), contextvars.copy_context()))
+        except queue.Full:
+            raise TTSBusyError(f"The {self.name} queue is full")
+        return future
+
+    async def synthesize(self, text: str) -> str:
+        """Generate speech for ``text`` on a worker and return the audio filename."""
+        return await self.submit(
+            lambda engine: self.backend.generate_speech(text, engine=engine)
+        )
+
+    async def stream(self, text: str, chunk_size: int = 32 * 1024) -> AsyncIterator:
+        """Generate speech on a worker and yield items as the worker produces them.
+
+        Yields whatever ``backend.iter_speech`` produces: a header dict followed by
+        audio byte chunks. Closing or cancelling the iterator stops the worker at
+        the next chunk, so it is free for the next job.
+
+        Raises:
+            TTSBusyError: If the admission queue is full
+        """
+        loop = asyncio.get_running_loop()
+        items: asyncio.Queue = asyncio.Queue()
+        stop = threading.Event()
+
+        def job(engine):
+            speech = self.backend.iter_speech(text, engine=engine, chunk_size=chunk_size)
+            try:
+                for item in speech:
+                    if stop.is_set():
+                        with self._lock:
+                            self.cancelled += 1
+                        break
+                    loop.call_soon_threadsafe(items.put_nowait, item)
+            finally:
+                close = getattr(speech, "close", None)
+                if close is not None:
+                    close()
+                loop.call_soon_threadsafe(items.put_nowait, _END)
+
+        future = self.submit(job)
+        try:
+            while True:
+                get_item = asyncio.ensure_future(items.get())
+                await asyncio.wait({get_item, future}, return_when=asyncio.FIRST_COMPLETED)
+                if get_item.done():
+                    item = get_item.result()
+                    if item is _END:
+                        break
+                    yield item
+                    continue
+                # The job is over (or was dropped before it started and never
+                # emitted _END): drain whatever it already produced
+                get_item.cancel()
+                while not items.empty():
+                    item = items.get_nowait()
+                    if item is _END:
+                        break
+                    yield item
+                break
+            # Surface any exception raised by the worker
+            await future
+        finally:
+            stop.set()
+            if not future.done():
+                future.cancel()
+
+    def _worker_loop(self):
+        """Run jobs from the queue with an engine owned by this thread."""
+        engine = None
+        engine_error = None
+        try:
+            engine = self.backend.create_engine()
+        except Exception as e:
+            logger.error(f"Failed to create {self.name} engine for worker: {e}")
+            engine_error = e
+
+        while True:
+            item = self._jobs.get()
+            if item is _STOP:
+                break
+            job, loop, future, queued, context = item
+            if future.cancelled():
+                with self._lock:
+                    self.cancelled += 1
+                continue
+            with self._lock:
+                self._busy += 1
+            started = time.perf_counter()
+            if self.latency is not None:
+                self.latency.observe(started - queued, stage=f"{self.stage}_queue_wait")
+            try:
+                if engine_error is not None:
+                    raise RuntimeError(f"The {self.name} engine is not available: {engine_error}")
+                result = context.run(job, engine)
+            except Exception as e:
+                loop.call_soon_threadsafe(_set_exception, future, e)
+            else:
+                loop.call_soon_threadsafe(_set_result, future, result)
+            finally:
+                if self.latency is not None:
+                    self.latency.observe(time.perf_counter() - started, stage=self.stage)
+                with self._lock:
+                    self._busy -= 1
+
+        if engine is not None:
+            try:
+                engine.stop()
+            except Exception:
+                pass
+
+
+def _set_result(future: "asyncio.Future", result: Any):
+    if not future.done():
+        future.set_result(result)
+
+
+def _set_exception(future: "asyncio.Future", exc: BaseException):
+    if not future.done():
+        future.set_exception(exc)
@@ -0,0 +1,69 @@
+"""
+Background pre-rendering of canned responses so they are served from the audio cache.
+"""
+import asyncio
+import logging
+import time
+from typing import Awaitable, Callable, Dict, List, Optional
+
+from .tts_pool import TTSBusyError
+
+logger = logging.getLogger(__name__)
+
+
+class TemplateWarmup:
+    def __init__(self, texts: List[str], retry_delay: float = 0.5):
+        """Track pre-rendering of ``texts``.
+
+        Args:
+            texts: Response strings to synthesize
+            retry_delay: Seconds to wait before retrying when the synthesis queue is full
+        """
+        self.texts = list(texts)
+        self.retry_delay = retry_delay
+        self.completed = 0
+        self.failed = 0
+        self.started_at: Optional[float] = None
+        self.finished_at: Optional[float] = None
+
+    @property
+    def total(self) -> int:
+        return len(self.texts)
+
+    @property
+    def done(self) -> bool:
+        return self.finished_at is not None
+
+    async def run(self, synthesize: Callable[[str], Awaitable[str]]):
+        """Synthesize every text one at a time, yielding to live traffic when busy."""
+        self.started_at = time.time()
+        logger.info(f"Warming up audio for {self.total} response templates")
+        for text in self.texts:
+            while True:
+                try:
+                    await synthesize(text)
+                    self.completed += 1
+                except TTSBusyError:
+                    # Live requests take priority over warmup
+                    await asyncio.sleep(self.retry_delay)
+                    continue
+                except Exception as e:
+                    logger.error(f"Failed to pre-render template '{text[:50]}': {e}")
+                    self.failed += 1
+                break
+        self.finished_at = time.time()
+        logger.info(
+            f"Warmup finished in {self.finished_at - self.started_at:.2f} seconds "
+            f"({self.completed} rendered, {self.failed} failed)"
+        )
+
+    def progress(self) -> Dict:
+        """Return warmup progress for the health endpoint."""
+        processed = self.completed + self.failed
+        return {
+            "status": "done" if self.done else ("running" if self.started_at else "pending"),
+            "total": self.total,
+            "completed": self.completed,
+            "failed": self.failed,
+            "progress": processed / self.total if self.total else 1.0
+        }
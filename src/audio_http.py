@@ -0,0 +1,142 @@
+"""
+HTTP helpers for serving immutable audio: validators, range requests and confinement.
+"""
+import re
+from pathlib import Path
+from typing import AsyncIterator, Callable, Dict, Optional, Tuple
+
+import anyio
+from fastapi import Request
+from fastapi.responses import Response, StreamingResponse
+
+# Generated audio is named after a content hash, so a URL never changes meaning
+IMMUTABLE_CACHE_CONTROL = "public, max-age=31536000, immutable"
+
+# Names produced by the TTS backends: tts_<hash>.<ext> and speech_<hash>.<ext>
+AUDIO_FILENAME_RE = re.compile(r"^[A-Za-z0-9_-]{1,128}\.[A-Za-z0-9]{1,8}$")
+
+FILE_CHUNK_SIZE = 64 * 1024
+
+Body = Callable[[int, int], AsyncIterator[bytes]]
+
+
+class RangeNotSatisfiable(ValueError):
+    """Raised when a Range header lies entirely outside the resource."""
+
+
+def confine(directory: Path, filename: str) -> Optional[Path]:
+    """Return ``directory / filename`` if it is a plain audio filename inside ``directory``."""
+    if not AUDIO_FILENAME_RE.match(filename):
+        return None
+    root = Path(directory).resolve()
+    path = (root / filename).resolve()
+    if path.parent != root:
+        return None
+    return path
+
+
+def etag_for(filename: str) -> str:
+    """Strong ETag for a content-addressed file: the hash in its name."""
+    return f'"{filename.rsplit(".", 1)[0]}"'
+
+
+def etag_matches(header: Optional[str], etag: str) -> bool:
+    """Evaluate an If-None-Match header (weak comparison, as RFC 9110 requires)."""
+    if not header:
+        return False
+    if header.strip() == "*":
+        return True
+    opaque = etag[2:] if etag.startswith("W/") else etag
+    for candidate in header.split(","):
+        candidate = candidate.strip()
+        if candidate.startswith("W/"):
+            candidate = candidate[2:]
+        if candidate == opaque:
+            return True
+    return False
+
+
+def parse_range(header: Optional[str], size: int) -> Optional[Tuple[int, int]]:
+    """Parse a single ``bytes=`` range into inclusive ``(start, end)`` offsets.
+
+    Returns None when the whole resource should be sent: no header, a
+    malformed one, or a multi-range request (which servers may ignore).
+
+    Raises:
+        RangeNotSatisfiable: If the range starts past the end of the resource
+    """
+    if not header or not header.startswith("bytes="):
+        return None
+    spec = header[len("bytes="):].strip()
+    if "," in spec or "-" not in spec:
+        return None
+    first, _, last = spec.partition("-")
+    try:
+        if first == "":
+            # Suffix range: the last N bytes
+            length = int(last)
+            if length <= 0:
+                raise RangeNotSatisfiable(header)
+            return max(0, size - length), size - 1
+        start = int(first)
+        end = int(last) if last else size - 1
+    except ValueError:
+        return None
+    if start >= size:
+        raise RangeNotSatisfiable(header)
+    if start > end:
+        return None
+    return start, min(end, size - 1)
+
+
+def file_body(path: Path, chunk_size: int = FILE_CHUNK_SIZE) -> Body:
+    """Read ``[start, end]`` of a file without blocking the event loop."""
+    async def body(start: int, end: int) -> AsyncIterator[bytes]:
+        remaining = end - start + 1
+        async with await anyio.open_file(path, "rb") as f:
+            await f.seek(start)
+            while remaining > 0:
+                chunk = await f.read(min(chunk_size, remaining))
+                if not chunk:
+                    break
+                remaining -= len(chunk)
+                yield chunk
+    return body
+
+
+def memory_body(buffer: memoryview, chunk_size: int = FILE_CHUNK_SIZE) -> Body:
+    """Stream ``[start, end]`` of an in-memory buffer as zero-copy slices."""
+    async def body(start: int, end: int) -> AsyncIterator[memoryview]:
+        for offset in range(start, end + 1, chunk_size):
+            yield buffer[offset:min(offset + chunk_size, end + 1)]
+    return body
+
+
+def audio_response(request: Request, size: int, etag: str, media_type: str, body: Body,
+                   cache_control: str = IMMUTABLE_CACHE_CONTROL) -> Response:
+    """Build a 200, 206, 304 or 416 response for an immutable audio resource."""
+    headers: Dict[str, str] = {
+        "ETag": etag,
+        "Cache-Control": cache_control,
+        "Accept-Ranges": "bytes",
+        "X-Content-Type-Options": "nosniff"
+    }
+    if etag_matches(request.headers.get("if-none-match"), etag):
+        return Response(status_code=304, headers=headers)
+
+    byte_range = None
+    if_range = request.headers.get("if-range")
+    if if_range is None or if_range.strip() == etag:
+        try:
+            byte_range = parse_range(request.headers.get("range"), size)
+        except RangeNotSatisfiable:
+            headers["Content-Range"] = f"bytes */{size}"
+            return Response(status_code=416, headers=headers)
+
+    if byte_range is None:
+        headers["Content-Length"] = str(size)
+        return StreamingResponse(body(0, size - 1), media_type=media_type, headers=headers)
+    start, end = byte_range
+    headers["Content-Range"] = f"bytes {start}-{end}/{size}"
+    headers["Content-Length"] = str(end - start + 1)
+    return StreamingResponse(body(start, end), status_code=206, media_type=media_type, headers=headers)
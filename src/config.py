@@ -0,0 +1,163 @@
+"""
+Runtime settings read from environment variables.
+"""
+import os
+import tempfile
+
+
+def _env_bool(name: str, default: bool) -> bool:
+    """Read a boolean setting such as ``1``/``true``/``yes``."""
+    value = os.getenv(name)
+    if value is None:
+        return default
+    return value.strip().lower() in ("1", "true", "yes", "on")
+
+
+def _env_int(name: str, default: int) -> int:
+    """Read an integer setting, falling back to ``default`` when unset or invalid."""
+    try:
+        return int(os.getenv(name, default))
+    except (TypeError, ValueError):
+        return default
+
+
+def _env_float(name: str, default: float) -> float:
+    """Read a float setting, falling back to ``default`` when unset or invalid."""
+    try:
+        return float(os.getenv(name, default))
+    except (TypeError, ValueError):
+        return default
+
+
+# Speech backend: "pyttsx3", "dia" or the synthetic "sine" backend
+TTS_BACKEND = os.getenv("TTS_BACKEND", "pyttsx3")
+
+# Simulated engine time per character for the sine backend (load testing)
+SINE_SECONDS_PER_CHAR = _env_float("SINE_SECONDS_PER_CHAR", 0.0)
+
+# Speech synthesis worker pool. pyttsx3 with a driver that shares
+# process-wide state (espeak, the default on Linux) is capped at one worker
+TTS_WORKERS = _env_int("TTS_WORKERS", 2)
+TTS_QUEUE_SIZE = _env_int("TTS_QUEUE_SIZE", 16)
+
+# Size of binary frames used when streaming audio over the WebSocket
+AUDIO_STREAM_CHUNK_SIZE = _env_int("AUDIO_STREAM_CHUNK_SIZE", 32 * 1024)
+
+# Pre-render every canned response into the audio cache at startup
+TTS_WARMUP = _env_bool("TTS_WARMUP", False)
+
+# Directory for rendered audio that is not kept in the cache
+AUDIO_DIR = os.getenv("AUDIO_DIR", os.path.join(tempfile.gettempdir(), "voice_agent_audio"))
+AUDIO_MAX_BYTES = _env_int("AUDIO_MAX_BYTES", 256 * 1024 * 1024)
+AUDIO_MAX_AGE = _env_int("AUDIO_MAX_AGE", 3600)
+
+# Keep short utterances in memory instead of writing them to disk; evicted
+# buffers spill to the cache (or AUDIO_DIR) unless AUDIO_MEMORY_SPILL is off
+AUDIO_MEMORY_ENABLED = _env_bool("AUDIO_MEMORY_ENABLED", False)
+AUDIO_MEMORY_MAX_BYTES = _env_int("AUDIO_MEMORY_MAX_BYTES", 64 * 1024 * 1024)
+AUDIO_MEMORY_MAX_ITEM_BYTES = _env_int("AUDIO_MEMORY_MAX_ITEM_BYTES", 1024 * 1024)
+AUDIO_MEMORY_SPILL = _env_bool("AUDIO_MEMORY_SPILL", True)
+
+# Seconds between background sweeps of the audio directories
+AUDIO_SWEEP_INTERVAL = _env_float("AUDIO_SWEEP_INTERVAL", 60.0)
+
+# Content-addressed cache of synthesized audio
+AUDIO_CACHE_ENABLED = _env_bool("AUDIO_CACHE_ENABLED", True)
+AUDIO_CACHE_DIR = os.getenv(
+    "AUDIO_CACHE_DIR", os.path.join(tempfile.gettempdir(), "voice_agent_audio_cache")
+)
+AUDIO_CACHE_MAX_BYTES = _env_int("AUDIO_CACHE_MAX_BYTES", 256 * 1024 * 1024)
+AUDIO_CACHE_MAX_AGE = _env_int("AUDIO_CACHE_MAX_AGE", 7 * 24 * 3600)
+
+# Dia micro-batching
+DIA_BATCH_MAX_SIZE = _env_int("DIA_BATCH_MAX_SIZE", 8)
+DIA_BATCH_WINDOW_MS = _env_int("DIA_BATCH_WINDOW_MS", 20)
+
+# Per-connection conversation sessions
+SESSION_MAX_EXCHANGES = _env_int("SESSION_MAX_EXCHANGES", 10)
+SESSION_IDLE_TIMEOUT = _env_int("SESSION_IDLE_TIMEOUT", 30 * 60)
+SESSION_MAX_SESSIONS = _env_int("SESSION_MAX_SESSIONS", 10000)
+
+# Sentiment stage between receiving a message and answering it
+SENTIMENT_ENABLED = _env_bool("SENTIMENT_ENABLED", True)
+SENTIMENT_LEXICON_PATH = os.getenv("SENTIMENT_LEXICON_PATH")
+SENTIMENT_BATCH_MAX_SIZE = _env_int("SENTIMENT_BATCH_MAX_SIZE", 64)
+SENTIMENT_CACHE_SIZE = _env_int("SENTIMENT_CACHE_SIZE", 4096)
+
+# Logging: records go through a bounded queue to a background writer.
+# LOG_SAMPLING and LOG_RATE_LIMIT take "logger=value" pairs, e.g.
+# "src.main=0.1,src.ai.tts_backends=0.5" (share kept) or "src.main=50" (records/s)
+LOG_LEVEL = os.getenv("LOG_LEVEL", "INFO")
+LOG_FORMAT = os.getenv("LOG_FORMAT", "json")
+LOG_PAYLOADS = _env_bool("LOG_PAYLOADS", False)
+LOG_SAMPLING = os.getenv("LOG_SAMPLING", "")
+LOG_RATE_LIMIT = os.getenv("LOG_RATE_LIMIT", "")
+LOG_QUEUE_SIZE = _env_int("LOG_QUEUE_SIZE", 10000)
+
+# Production serving (python -m src.main): worker processes, each with its own
+# engines, caches and sessions. WORKER_ID is set inside worker processes.
+SERVE_HOST = os.getenv("SERVE_HOST", "0.0.0.0")
+SERVE_PORT = _env_int("SERVE_PORT", 8000)
+SERVE_WORKERS = _env_int("SERVE_WORKERS", 1)
+WORKER_ID = None
+
+# Optional store that sessions are saved to so a client reconnecting to another
+# worker keeps its history: "" (per-worker only), "local" or "file" (STATE_DIR)
+STATE_BACKEND = os.getenv("STATE_BACKEND", "")
+STATE_DIR = os.getenv("STATE_DIR", os.path.join(tempfile.gettempdir(), "voice_agent_state"))
+
+# Messages answered concurrently per WebSocket connection; replies are still
+# sent in arrival order, and reading pauses while this many are in flight
+WS_MAX_PENDING = _env_int("WS_MAX_PENDING", 8)
+
+# Server-side speech input: 16-bit mono PCM sent as binary /ws frames is cut
+# into utterances by an energy VAD and transcribed by STT_RECOGNIZER
+# ("sphinx", offline via SpeechRecognition, or the synthetic "tones");
+# off unless set
+STT_RECOGNIZER = os.getenv("STT_RECOGNIZER", "")
+STT_WORKERS = _env_int("STT_WORKERS", 1)
+STT_QUEUE_SIZE = _env_int("STT_QUEUE_SIZE", 8)
+STT_SAMPLE_RATE = _env_int("STT_SAMPLE_RATE", 16000)
+# Audio between partial transcripts of an utterance in progress (0 disables them)
+STT_PARTIAL_INTERVAL_MS = _env_int("STT_PARTIAL_INTERVAL_MS", 700)
+VAD_THRESHOLD_DB = _env_float("VAD_THRESHOLD_DB", -45.0)
+VAD_FRAME_MS = _env_float("VAD_FRAME_MS", 20.0)
+# Silence that ends an utterance; the endpointing delay is bounded by this
+VAD_HANGOVER_MS = _env_float("VAD_HANGOVER_MS", 300.0)
+VAD_MIN_SPEECH_MS = _env_float("VAD_MIN_SPEECH_MS", 100.0)
+VAD_MAX_UTTERANCE_S = _env_float("VAD_MAX_UTTERANCE_S", 15.0)
+
+# Transcode rendered speech before it is stored and served: "opus" (Ogg/Opus
+# at AUDIO_BITRATE bits/s), "vorbis" or "flac"; empty keeps the engine's WAV.
+# Encoding runs in AUDIO_ENCODER_WORKERS processes; streamed audio stays PCM
+AUDIO_CODEC = os.getenv("AUDIO_CODEC", "")
+AUDIO_BITRATE = _env_int("AUDIO_BITRATE", 24000)
+AUDIO_ENCODER_WORKERS = _env_int("AUDIO_ENCODER_WORKERS", 1)
+
+# Answer general questions from the documents in KNOWLEDGE_DIR (empty disables).
+# The BM25 index is memory-mapped from KNOWLEDGE_INDEX_DIR, shared by every
+# worker, and rebuilt incrementally when documents change
+KNOWLEDGE_DIR = os.getenv("KNOWLEDGE_DIR", "")
+KNOWLEDGE_INDEX_DIR = os.getenv(
+    "KNOWLEDGE_INDEX_DIR", os.path.join(tempfile.gettempdir(), "voice_agent_knowledge")
+)
+KNOWLEDGE_PASSAGE_WORDS = _env_int("KNOWLEDGE_PASSAGE_WORDS", 120)
+# Best-passage BM25 score below which the agent falls back to its general replies
+KNOWLEDGE_MIN_SCORE = _env_float("KNOWLEDGE_MIN_SCORE", 4.0)
+# Seconds between checks for changed documents (0 only indexes at startup)
+KNOWLEDGE_REFRESH_INTERVAL = _env_float("KNOWLEDGE_REFRESH_INTERVAL", 60.0)
+
+# Append-only NDJSON log of every interaction, written in batches by a
+# background task; off (along with the dashboard) unless INTERACTION_LOG_DIR
+# is set. Message and reply text are only included with LOG_PAYLOADS
+INTERACTION_LOG_DIR = os.getenv("INTERACTION_LOG_DIR", "")
+INTERACTION_LOG_FLUSH_BYTES = _env_int("INTERACTION_LOG_FLUSH_BYTES", 64 * 1024)
+INTERACTION_LOG_FLUSH_INTERVAL = _env_float("INTERACTION_LOG_FLUSH_INTERVAL", 1.0)
+INTERACTION_LOG_SEGMENT_BYTES = _env_int("INTERACTION_LOG_SEGMENT_BYTES", 8 * 1024 * 1024)
+INTERACTION_LOG_MAX_PENDING = _env_int("INTERACTION_LOG_MAX_PENDING", 10000)
+# Closed segments are deleted after INTERACTION_LOG_MAX_AGE seconds, or oldest
+# first while the log exceeds INTERACTION_LOG_MAX_BYTES (0 disables either)
+INTERACTION_LOG_MAX_AGE = _env_float("INTERACTION_LOG_MAX_AGE", 7 * 24 * 3600)
+INTERACTION_LOG_MAX_BYTES = _env_int("INTERACTION_LOG_MAX_BYTES", 1024 * 1024 * 1024)
+# Width of the dashboard's time-series buckets
+DASHBOARD_BUCKET_SECONDS = _env_int("DASHBOARD_BUCKET_SECONDS", 60)
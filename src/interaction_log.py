@@ -0,0 +1,383 @@
+"""
+Append-only log of every interaction, and incremental conversation metrics built from it.
+
+``InteractionLog.record`` only serializes the event into an in-memory batch;
+a background task writes batches to NDJSON segment files once they reach
+``flush_bytes`` or ``flush_interval`` seconds have passed, so the request
+path never touches the disk. Segments are named
+``interactions-<start ns>-<pid>.ndjson`` and closed at ``segment_bytes``,
+so several workers can log into one directory. Closed segments older than
+``max_age`` or beyond ``max_bytes`` in total are deleted.
+
+``InteractionMetrics`` remembers how far it has read into each segment and
+only parses the lines appended since its last update, keeping per-minute
+aggregates instead of the events themselves. Closed segments it has read
+to the end are not looked at again.
+"""
+import asyncio
+import json
+import logging
+import os
+import threading
+import time
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+SEGMENT_GLOB = "interactions-*.ndjson"
+
+# Seconds between retention passes of each writer
+PRUNE_INTERVAL = 60.0
+
+SENTIMENTS = ("positive", "neutral", "negative")
+
+
+def segment_key(name: str) -> Optional[Tuple[int, int]]:
+    """``(pid, start ns)`` of a segment file name, or None if it is not one."""
+    parts = name[:-len(".ndjson")].split("-")
+    if len(parts) != 3 or not name.endswith(".ndjson"):
+        return None
+    try:
+        return int(parts[2]), int(parts[1])
+    except ValueError:
+        return None
+
+
+def closed_segments(paths: List[Path]) -> List[Path]:
+    """The segments that are not the newest of their process, so no longer written to."""
+    newest: Dict[int, int] = {}
+    keys = {}
+    for path in paths:
+        key = keys[path] = segment_key(path.name)
+        if key is not None:
+            newest[key[0]] = max(newest.get(key[0], key[1]), key[1])
+    return [path for path in paths if keys[path] is not None and keys[path][1] < newest[keys[path][0]]]
+
+
+class InteractionLog:
+    def __init__(self, directory: str, flush_bytes: int = 64 * 1024, flush_interval: float = 1.0,
+                 segment_bytes: int = 8 * 1024 * 1024, max_pending: int = 10000,
+                 max_age: float = 7 * 24 * 3600, max_bytes: int = 1024 * 1024 * 1024):
+        """Write interaction events to NDJSON segments from a background task.
+
+        Args:
+            directory: Where segments are written
+            flush_bytes: Buffered bytes that trigger a write before ``flush_interval``
+            flush_interval: Longest time an event waits in memory, in seconds
+            segment_bytes: Size at which a segment is closed and a new one started
+            max_pending: Events held in memory; further events are dropped (and
+                counted) while the disk falls behind
+            max_age: Seconds after its last write a closed segment is deleted (0 keeps them)
+            max_bytes: Total size of the directory's segments above which the
+                oldest closed ones are deleted (0 for no limit)
+        """
+        self.directory = Path(directory)
+        self.flush_bytes = flush_bytes
+        self.flush_interval = flush_interval
+        self.segment_bytes = segment_bytes
+        self.max_pending = max_pending
+        self.max_age = max_age
+        self.max_bytes = max_bytes
+        self.pruned = 0
+        self.recorded = 0
+        self.dropped = 0
+        self.written = 0
+        self.flushes = 0
+        self.segments = 0
+        self.bytes_written = 0
+        self._pending: List[str] = []
+        self._pending_bytes = 0
+        self._wake: Optional[asyncio.Event] = None
+        self._task: Optional[asyncio.Task] = None
+        self._file = None
+        self._segment_size = 0
+        # Serializes writes between the background task and a final flush
+        self._write_lock = threading.Lock()
+
+    def record(self, **fields):
+        """Queue one event (a ``ts`` field is added). Never blocks."""
+        if len(self._pending) >= self.max_pending:
+            self.dropped += 1
+            return
+        line = json.dumps({"ts": round(time.time(), 3), **fields}, separators=(",", ":"))
+        self._pending.append(line)
+        self._pending_bytes += len(line) + 1
+        self.recorded += 1
+        if self._pending_bytes >= self.flush_bytes and self._wake is not None:
+            self._wake.set()
+
+    def start(self):
+        """Start the writer task on the running event loop."""
+        if self._task is None or self._task.done():
+            self._wake = asyncio.Event()
+            self._task = asyncio.get_running_loop().create_task(self._run())
+
+    async def stop(self):
+        """Stop the writer, then write what is still buffered and close the segment."""
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        await self.flush()
+        await asyncio.to_thread(self.close)
+
+    async def flush(self):
+        """Write the buffered events off the event loop."""
+        if not self._pending:
+            return
+        batch, self._pending, self._pending_bytes = self._pending, [], 0
+        try:
+            await asyncio.to_thread(self._write, batch)
+        except OSError as e:
+            logger.error(f"Failed to write {len(batch)} interactions to {self.directory}: {e}")
+            self.dropped += len(batch)
+
+    async def _run(self):
+        pruned_at = 0.0
+        while True:
+            try:
+                await asyncio.wait_for(self._wake.wait(), timeout=self.flush_interval)
+            except asyncio.TimeoutError:
+                pass
+            self._wake.clear()
+            await self.flush()
+            if (self.max_age or self.max_bytes) and time.monotonic() - pruned_at >= PRUNE_INTERVAL:
+                pruned_at = time.monotonic()
+                try:
+                    await asyncio.to_thread(self.prune)
+                except OSError as e:
+                    logger.warning(f"Failed to prune interaction segments in {self.directory}: {e}")
+
+    def prune(self) -> int:
+        """Delete closed segments beyond ``max_age`` or ``max_bytes``; returns how many.
+
+        Only segments a newer one of the same process has replaced are
+        deleted, so no worker loses the segment it is writing. Blocking.
+        """
+        if not self.directory.is_dir():
+            return 0
+        paths = sorted(self.directory.glob(SEGMENT_GLOB))
+        sizes = {}
+        modified = {}
+        for path in paths:
+            try:
+                status = path.stat()
+            except FileNotFoundError:
+                # Pruned by another worker meanwhile
+                continue
+            sizes[path] = status.st_size
+            modified[path] = status.st_mtime
+        total = sum(sizes.values())
+        now = time.time()
+        removed = 0
+        # Oldest first, so the size limit deletes the oldest segments
+        for path in sorted(closed_segments(list(sizes)), key=lambda path: segment_key(path.name)[1]):
+            expired = self.max_age and now - modified[path] > self.max_age
+            if not expired and not (self.max_bytes and total > self.max_bytes):
+                continue
+            try:
+                path.unlink()
+            except FileNotFoundError:
+                pass
+            total -= sizes[path]
+            removed += 1
+        self.pruned += removed
+        return removed
+
+    def _write(self, batch: List[str]):
+        data = ("\n".join(batch) + "\n").encode("utf-8")
+        with self._write_lock:
+            if self._file is not None and self._segment_size + len(data) > self.segment_bytes:
+                self._close_segment()
+            if self._file is None:
+                self.directory.mkdir(parents=True, exist_ok=True)
+                name = f"interactions-{time.time_ns()}-{os.getpid()}.ndjson"
+                self._file = open(self.directory / name, "ab")
+                self._segment_size = 0
+                self.segments += 1
+            # Whole lines in one write, so readers only ever see a partial last line
+            self._file.write(data)
+            self._file.flush()
+            self._segment_size += len(data)
+            self.written += len(batch)
+            self.flushes += 1
+            self.bytes_written += len(data)
+
+    def close(self):
+        """Close the current segment; the next write starts a new one."""
+        with self._write_lock:
+            self._close_segment()
+
+    def _close_segment(self):
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+    def stats(self) -> Dict:
+        return {
+            "directory": str(self.directory),
+            "recorded": self.recorded,
+            "written": self.written,
+            "pending": len(self._pending),
+            "dropped": self.dropped,
+            "flushes": self.flushes,
+            "segments": self.segments,
+            "bytes_written": self.bytes_written,
+            "pruned": self.pruned
+        }
+
+
+class InteractionMetrics:
+    def __init__(self, directory: str, bucket_seconds: int = 60, max_buckets: int = 24 * 60):
+        """Conversation metrics over the segments in ``directory``, updated incrementally.
+
+        Args:
+            directory: Directory the ``InteractionLog`` (of every worker) writes to
+            bucket_seconds: Width of a time-series bucket
+            max_buckets: Buckets kept; older ones are dropped from the series
+                but stay in the totals, except for distinct sessions, which
+                are counted over the kept buckets. Events older than every
+                kept bucket only count in the totals (as ``late``)
+        """
+        self.directory = Path(directory)
+        self.bucket_seconds = bucket_seconds
+        self.max_buckets = max_buckets
+        self.events = 0
+        self.late = 0
+        self.malformed = 0
+        self.bytes_read = 0
+        self.sentiments = {label: 0 for label in SENTIMENTS}
+        self.inputs: Dict[str, int] = {}
+        self._offsets: Dict[str, int] = {}
+        # Closed segments read to the end
+        self._finished = set()
+        self._buckets: Dict[int, Dict] = {}
+        self._lock = threading.Lock()
+
+    def update(self) -> int:
+        """Read the events appended since the last update; returns how many.
+
+        Blocking; run it off the event loop.
+        """
+        added = 0
+        with self._lock:
+            paths = sorted(self.directory.glob(SEGMENT_GLOB))
+            present = {path.name for path in paths}
+            # Listed before they are read, so their size is final
+            closed = {path.name for path in closed_segments(paths)}
+            for path in paths:
+                if path.name in self._finished:
+                    continue
+                offset = self._offsets.get(path.name, 0)
+                try:
+                    size = path.stat().st_size
+                    if size <= offset:
+                        if path.name in closed:
+                            self._finished.add(path.name)
+                        continue
+                    with open(path, "rb") as segment:
+                        segment.seek(offset)
+                        data = segment.read(size - offset)
+                except OSError as e:
+                    logger.warning(f"Failed to read interaction segment {path}: {e}")
+                    continue
+                # A line still being written is left for the next update
+                end = data.rfind(b"\n") + 1
+                for line in data[:end].splitlines():
+                    try:
+                        self._add(json.loads(line))
+                    except (ValueError, TypeError, KeyError):
+                        self.malformed += 1
+                        continue
+                    added += 1
+                self._offsets[path.name] = offset + end
+                self.bytes_read += end
+                if path.name in closed and offset + end == size:
+                    self._finished.add(path.name)
+            for name in set(self._offsets) - present:
+                del self._offsets[name]
+            self._finished &= present
+        return added
+
+    def _add(self, event: Dict):
+        start = int(event["ts"] // self.bucket_seconds) * self.bucket_seconds
+        label = event.get("sentiment")
+        source = event.get("input", "text")
+        self.events += 1
+        if label in self.sentiments:
+            self.sentiments[label] += 1
+        self.inputs[source] = self.inputs.get(source, 0) + 1
+        bucket = self._buckets.get(start)
+        if bucket is None:
+            if len(self._buckets) >= self.max_buckets and start < min(self._buckets):
+                # Older than the whole series: its bucket would be dropped at once
+                self.late += 1
+                return
+            bucket = self._buckets[start] = {
+                "messages": 0, "sentiment_sum": 0.0, "sentiment_count": 0,
+                "response_ms_sum": 0.0, "response_count": 0, "response_ms_max": 0.0,
+                "sessions": set(), **{label: 0 for label in SENTIMENTS}
+            }
+            if len(self._buckets) > self.max_buckets:
+                del self._buckets[min(self._buckets)]
+        bucket["messages"] += 1
+        if label in self.sentiments:
+            bucket[label] += 1
+        score = event.get("sentiment_score")
+        if score is not None:
+            bucket["sentiment_sum"] += score
+            bucket["sentiment_count"] += 1
+        response_ms = event.get("response_ms")
+        if response_ms is not None:
+            bucket["response_ms_sum"] += response_ms
+            bucket["response_count"] += 1
+            bucket["response_ms_max"] = max(bucket["response_ms_max"], response_ms)
+        if event.get("session_id") is not None:
+            bucket["sessions"].add(event["session_id"])
+
+    def snapshot(self) -> Dict:
+        """Totals and the per-bucket time series, oldest bucket first."""
+        with self._lock:
+            starts = sorted(self._buckets)
+            buckets = [self._buckets[start] for start in starts]
+            series = {
+                "time": starts,
+                "messages": [bucket["messages"] for bucket in buckets],
+                "sessions": [len(bucket["sessions"]) for bucket in buckets],
+                **{label: [bucket[label] for bucket in buckets] for label in SENTIMENTS},
+                "mean_sentiment": [
+                    round(bucket["sentiment_sum"] / bucket["sentiment_count"], 4)
+                    if bucket["sentiment_count"] else None
+                    for bucket in buckets
+                ],
+                "mean_response_ms": [
+                    round(bucket["response_ms_sum"] / bucket["response_count"], 2)
+                    if bucket["response_count"] else None
+                    for bucket in buckets
+                ],
+                "max_response_ms": [round(bucket["response_ms_max"], 2) for bucket in buckets]
+            }
+            return {
+                "totals": {
+                    "messages": self.events,
+                    "sessions": len(set().union(*(bucket["sessions"] for bucket in buckets))),
+                    "sentiment": dict(self.sentiments),
+                    "input": dict(self.inputs)
+                },
+                "bucket_seconds": self.bucket_seconds,
+                "series": series
+            }
+
+    def stats(self) -> Dict:
+        return {
+            "events": self.events,
+            "late": self.late,
+            "segments": len(self._offsets),
+            "finished_segments": len(self._finished),
+            "bytes_read": self.bytes_read,
+            "malformed": self.malformed
+        }
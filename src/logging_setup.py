@@ -0,0 +1,271 @@
+"""
+Non-blocking, structured logging with per-logger sampling and rate limits.
+
+Records are handed to a background thread through a bounded queue, so a
+logging call on the event loop never waits on stderr. Each record carries
+the session and request ids of the code that emitted it (see ``bind``).
+"""
+import atexit
+import contextvars
+import json
+import logging
+import logging.handlers
+import queue
+import random
+import sys
+import threading
+import time
+import zlib
+from typing import Dict, Optional, Tuple
+
+session_id_var: contextvars.ContextVar = contextvars.ContextVar("session_id", default=None)
+request_id_var: contextvars.ContextVar = contextvars.ContextVar("request_id", default=None)
+
+# Pass as ``extra=`` on records that contain user text or responses
+PAYLOAD = {"payload": True}
+
+TEXT_FORMAT = "%(asctime)s - %(name)s - %(levelname)s - %(message)s"
+
+# Record attributes that are not user supplied ``extra`` fields
+_RESERVED = set(vars(logging.makeLogRecord({}))) | {
+    "message", "asctime", "payload", "fields", "session_id", "request_id"
+}
+
+
+def bind(session_id: Optional[str] = None, request_id: Optional[str] = None):
+    """Attach ids to every record logged from the current context (task or thread)."""
+    if session_id is not None:
+        session_id_var.set(session_id)
+    if request_id is not None:
+        request_id_var.set(request_id)
+
+
+def parse_rules(spec: Optional[str]) -> Dict[str, float]:
+    """Parse ``"src.main=0.1,src.ai=0.5"`` into ``{logger prefix: value}``.
+
+    Malformed entries are ignored.
+    """
+    rules = {}
+    for item in (spec or "").split(","):
+        name, _, value = item.partition("=")
+        try:
+            rules[name.strip()] = float(value)
+        except ValueError:
+            continue
+    rules.pop("", None)
+    return rules
+
+
+class JsonFormatter(logging.Formatter):
+    """One JSON object per line: time, level, logger, message, ids and extra fields."""
+
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            "ts": round(record.created, 6),
+            "level": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage()
+        }
+        for name in ("session_id", "request_id"):
+            value = getattr(record, name, None)
+            if value is not None:
+                entry[name] = value
+        entry.update(getattr(record, "fields", None) or {})
+        for name, value in vars(record).items():
+            if name not in _RESERVED and name not in entry:
+                entry[name] = value
+        if record.exc_info:
+            entry["exc_info"] = self.formatException(record.exc_info)
+        return json.dumps(entry, default=str)
+
+
+class TextFormatter(logging.Formatter):
+    """The classic text format, followed by the ids and fields as ``key=value`` pairs."""
+
+    def __init__(self):
+        super().__init__(TEXT_FORMAT)
+
+    def format(self, record: logging.LogRecord) -> str:
+        line = super().format(record)
+        pairs = {name: getattr(record, name, None) for name in ("session_id", "request_id")}
+        pairs.update(getattr(record, "fields", None) or {})
+        extra = " ".join(f"{name}={value}" for name, value in pairs.items() if value is not None)
+        return f"{line} [{extra}]" if extra else line
+
+
+class SamplingFilter(logging.Filter):
+    def __init__(self, sample_rates: Optional[Dict[str, float]] = None,
+                 rate_limits: Optional[Dict[str, float]] = None, log_payloads: bool = True):
+        """Drop a share of routine records per logger, before they are queued.
+
+        Rules apply to a logger and its children; the longest matching prefix
+        wins. Warnings and errors always pass.
+
+        Args:
+            sample_rates: Share of records kept (0.0-1.0) per logger prefix.
+                Records with a request id are kept or dropped per request, so
+                a sampled request keeps all of its records.
+            rate_limits: Records per second allowed per logger prefix
+            log_payloads: Keep records marked with ``PAYLOAD``
+        """
+        super().__init__()
+        self.sample_rates = dict(sample_rates or {})
+        self.rate_limits = dict(rate_limits or {})
+        self.log_payloads = log_payloads
+        self.sampled_out = 0
+        self.rate_limited = 0
+        self.payloads_dropped = 0
+        self._lock = threading.Lock()
+        # prefix -> (tokens, last refill)
+        self._buckets: Dict[str, Tuple[float, float]] = {}
+        # logger name -> (sample rule, rate limit rule), resolved once per logger
+        self._rules: Dict[str, Tuple[Optional[str], Optional[str]]] = {}
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        if record.levelno >= logging.WARNING:
+            return True
+        if not self.log_payloads and getattr(record, "payload", False):
+            self.payloads_dropped += 1
+            return False
+        rules = self._rules.get(record.name)
+        if rules is None:
+            rules = self._rules[record.name] = (
+                _longest_prefix(record.name, self.sample_rates),
+                _longest_prefix(record.name, self.rate_limits)
+            )
+        sample_rule, limit_rule = rules
+        if sample_rule is not None and not self._sampled(record, self.sample_rates[sample_rule]):
+            self.sampled_out += 1
+            return False
+        if limit_rule is not None and not self._take_token(limit_rule):
+            self.rate_limited += 1
+            return False
+        return True
+
+    def _sampled(self, record: logging.LogRecord, rate: float) -> bool:
+        request_id = getattr(record, "request_id", None) or request_id_var.get()
+        if request_id is not None:
+            return zlib.crc32(request_id.encode()) % 10000 < rate * 10000
+        return random.random() < rate
+
+    def _take_token(self, rule: str) -> bool:
+        """Token bucket holding up to one second's worth of records."""
+        limit = self.rate_limits[rule]
+        now = time.monotonic()
+        with self._lock:
+            tokens, last = self._buckets.get(rule, (limit, now))
+            tokens = min(limit, tokens + (now - last) * limit)
+            allowed = tokens >= 1
+            self._buckets[rule] = (tokens - 1 if allowed else tokens, now)
+        return allowed
+
+
+def _longest_prefix(name: str, rules: Dict[str, float]) -> Optional[str]:
+    best = None
+    for prefix in rules:
+        if name == prefix or name.startswith(prefix + "."):
+            if best is None or len(prefix) > len(best):
+                best = prefix
+    return best
+
+
+class ContextQueueHandler(logging.handlers.QueueHandler):
+    """Queue handler that stamps context ids and never blocks the caller.
+
+    Formatting is left to the listener thread; when the queue is full the
+    record is dropped and counted instead of waiting for the writer.
+    """
+
+    def __init__(self, log_queue: queue.Queue):
+        super().__init__(log_queue)
+        self.dropped = 0
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        if getattr(record, "session_id", None) is None:
+            record.session_id = session_id_var.get()
+        if getattr(record, "request_id", None) is None:
+            record.request_id = request_id_var.get()
+        return record
+
+    def enqueue(self, record: logging.LogRecord):
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+
+
+class LoggingRuntime:
+    """The installed queue handler, its listener thread and the sampling filter."""
+
+    def __init__(self, handler: ContextQueueHandler, listener: logging.handlers.QueueListener,
+                 sampling: SamplingFilter):
+        self.handler = handler
+        self.listener = listener
+        self.sampling = sampling
+
+    def stop(self):
+        """Flush queued records and stop the listener thread."""
+        logging.getLogger().removeHandler(self.handler)
+        if self.listener._thread is not None:
+            self.listener.stop()
+
+    def stats(self) -> Dict:
+        return {
+            "queued": self.handler.queue.qsize(),
+            "dropped_queue_full": self.handler.dropped,
+            "sampled_out": self.sampling.sampled_out,
+            "rate_limited": self.sampling.rate_limited,
+            "payloads_dropped": self.sampling.payloads_dropped
+        }
+
+
+_runtime: Optional[LoggingRuntime] = None
+
+
+def configure_logging(level: str = "INFO", json_format: bool = True, log_payloads: bool = True,
+                      sample_rates: Optional[Dict[str, float]] = None,
+                      rate_limits: Optional[Dict[str, float]] = None,
+                      queue_size: int = 10000, stream=None) -> LoggingRuntime:
+    """Route the root logger through a queue to a background writer.
+
+    Replaces any earlier configuration made by this function.
+
+    Args:
+        level: Root log level name
+        json_format: Write JSON lines instead of the text format
+        log_payloads: Keep records marked with ``PAYLOAD`` (user text, responses)
+        sample_rates: Share of records kept per logger prefix (see ``SamplingFilter``)
+        rate_limits: Records per second allowed per logger prefix
+        queue_size: Records buffered for the writer before new ones are dropped
+        stream: Output stream (defaults to stderr)
+
+    Returns:
+        The installed runtime, whose ``stats()`` reports dropped records
+    """
+    global _runtime
+    if _runtime is not None:
+        _runtime.stop()
+    output = logging.StreamHandler(stream if stream is not None else sys.stderr)
+    output.setFormatter(JsonFormatter() if json_format else TextFormatter())
+    handler = ContextQueueHandler(queue.Queue(maxsize=queue_size))
+    sampling = SamplingFilter(sample_rates, rate_limits, log_payloads)
+    handler.addFilter(sampling)
+    listener = logging.handlers.QueueListener(handler.queue, output, respect_handler_level=True)
+    listener.start()
+
+    root = logging.getLogger()
+    root.setLevel(level.upper() if isinstance(level, str) else level)
+    root.addHandler(handler)
+    _runtime = LoggingRuntime(handler, listener, sampling)
+    return _runtime
+
+
+def shutdown_logging():
+    """Flush and stop the background writer, if one is running."""
+    global _runtime
+    if _runtime is not None:
+        _runtime.stop()
+        _runtime = None
+
+
+atexit.register(shutdown_logging)
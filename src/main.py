@@ -1,23 +1,45 @@
 from fastapi import FastAPI, WebSocket, Request, WebSocketDisconnect
 from fastapi.templating import Jinja2Templates
 from fastapi.staticfiles import StaticFiles
-from fastapi.responses import HTMLResponse, FileResponse, JSONResponse
+from fastapi.responses import HTMLResponse, JSONResponse, Response
 import uvicorn
+import argparse
 import logging
 from pathlib import Path
 import json
 from .ai.dia_model import DiaAgent
+from .ai.tts_pool import TTSWorkerPool, TTSBusyError
+from .ai.audio_cache import AudioCache
+from .ai.audio_encoder import AudioEncoder
+from .ai.retrieval import KnowledgeBase
+from .ai.audio_store import AudioJanitor, AudioStore
+from .ai.audio_memory import AudioBufferPool
+from .ai.tts_backends import create_backend
+from .ai.warmup import TemplateWarmup
+from .ai.sessions import SessionStore
+from .ai.state_store import create_state_store
+from .ai.sentiment import SentimentAnalyzer, SentimentStage
+from .ai.speech_input import EnergyVAD, create_recognizer
+from .ai.audio_format import media_type_for, media_type_for_extension
+from .audio_http import audio_response, confine, etag_for, file_body, memory_body
+from .interaction_log import InteractionLog, InteractionMetrics
+from .metrics import CONTENT_TYPE as METRICS_CONTENT_TYPE, MetricsRegistry
+from .logging_setup import PAYLOAD, bind, configure_logging, parse_rules
+from . import config
 import os
 import asyncio
-from typing import Set
-
-# Setup logging
-logging.basicConfig(
-    level=logging.INFO,
-    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
-    handlers=[
-        logging.StreamHandler()  # Log to console for now
-    ]
+import time
+import uuid
+from typing import List, Optional, Set
+
+# Setup logging: a background thread writes the records so the event loop never blocks on stderr
+log_runtime = configure_logging(
+    level=config.LOG_LEVEL,
+    json_format=config.LOG_FORMAT == "json",
+    log_payloads=config.LOG_PAYLOADS,
+    sample_rates=parse_rules(config.LOG_SAMPLING),
+    rate_limits=parse_rules(config.LOG_RATE_LIMIT),
+    queue_size=config.LOG_QUEUE_SIZE
 )
 logger = logging.getLogger(__name__)
 
@@ -27,9 +49,116 @@ app = FastAPI(title="Voice Assistant")
 # Initialize Dia agent
 dia_agent = None
 
+# Speech backend selected with TTS_BACKEND
+tts_backend = None
+
+# Worker pool that runs speech synthesis off the event loop
+tts_pool = None
+
+# Server-side speech recognition (STT_RECOGNIZER) and its worker pool
+stt_recognizer = None
+stt_pool = None
+
+# Persistent cache of rendered audio
+audio_cache = None
+
+# Uncached rendered audio and the background sweeper for both directories
+audio_store = None
+audio_janitor = None
+
+# In-memory tier for short utterances (AUDIO_MEMORY_ENABLED)
+audio_memory = None
+
+# Transcoder to a compact codec (AUDIO_CODEC)
+audio_encoder = None
+
+# Local document retrieval for general questions (KNOWLEDGE_DIR)
+knowledge = None
+
+# Append-only interaction log and the dashboard aggregates read from it
+interaction_log = None
+interaction_metrics = None
+
+# Optional background pre-rendering of canned responses
+warmup = None
+warmup_task = None
+
+# Conversation state per client
+sessions = None
+
+# Batched sentiment scoring of incoming messages
+sentiment_stage = None
+
 # Store active WebSocket connections
 active_connections: Set[WebSocket] = set()
 
+def _hit_ratio(source) -> Optional[float]:
+    if source is None:
+        return None
+    lookups = source.hits + source.misses
+    return source.hits / lookups if lookups else 0.0
+
+def _batch_stat(*keys: str, scale: float = 1.0) -> Optional[float]:
+    stats = tts_backend.batch_stats() if tts_backend is not None else None
+    if stats is None:
+        return None
+    for key in keys:
+        stats = stats[key]
+    return stats * scale
+
+# Metrics served on /metrics
+metrics = MetricsRegistry()
+stage_latency = metrics.histogram(
+    "voice_agent_stage_seconds",
+    "Time spent in each stage of handling a message",
+    ["stage"]
+)
+messages_total = metrics.counter("voice_agent_messages_total", "WebSocket messages received")
+errors_total = metrics.counter("voice_agent_errors_total", "Errors by type", ["type"])
+cancelled_total = metrics.counter("voice_agent_cancelled_total", "Replies cancelled by the client")
+metrics.gauge(
+    "voice_agent_active_connections", "Open WebSocket connections",
+    lambda: len(active_connections)
+)
+metrics.gauge(
+    "voice_agent_tts_queue_depth", "Synthesis jobs waiting for a worker",
+    lambda: tts_pool.pending if tts_pool is not None else None
+)
+metrics.gauge(
+    "voice_agent_tts_workers_busy", "Synthesis workers running a job",
+    lambda: tts_pool.busy if tts_pool is not None else None
+)
+metrics.gauge(
+    "voice_agent_tts_batch_mean_size", "Mean number of requests per batched synthesis call",
+    lambda: _batch_stat("mean_batch_size")
+)
+metrics.gauge(
+    "voice_agent_tts_batch_queue_wait_p95_seconds",
+    "95th percentile of the time requests wait for their batch to start",
+    lambda: _batch_stat("queue_wait_ms", "p95", scale=0.001)
+)
+metrics.gauge(
+    "voice_agent_tts_batch_pending", "Requests waiting for the next synthesis batch",
+    lambda: _batch_stat("pending")
+)
+metrics.gauge(
+    "voice_agent_stt_queue_depth", "Utterances waiting for a recognition worker",
+    lambda: stt_pool.pending if stt_pool is not None else None
+)
+metrics.gauge(
+    "voice_agent_audio_bytes_per_speech_second",
+    "Encoded audio bytes per second of speech (AUDIO_CODEC)",
+    lambda: audio_encoder.bytes_per_second() if audio_encoder is not None else None
+)
+metrics.gauge(
+    "voice_agent_audio_cache_hit_ratio", "Share of audio cache lookups that were hits",
+    lambda: _hit_ratio(audio_cache)
+)
+metrics.gauge(
+    "voice_agent_audio_memory_hit_ratio", "Share of in-memory audio lookups that were hits",
+    lambda: _hit_ratio(audio_memory)
+)
+
 # Mount static files
 static_path = Path(__file__).parent / "ui" / "static"
 static_path.mkdir(parents=True, exist_ok=True)
@@ -40,10 +169,147 @@ templates = Jinja2Templates(directory=str(Path(__file__).parent / "ui" / "templa
 
 @app.on_event("startup")
 async def startup_event():
-    global dia_agent
+    global dia_agent, tts_backend, tts_pool, audio_cache, warmup, warmup_task, sessions
+    global sentiment_stage, audio_store, audio_janitor, audio_memory, stt_recognizer, stt_pool
+    global audio_encoder, knowledge, interaction_log, interaction_metrics
     try:
-        logger.info("Initializing Voice Agent...")
-        dia_agent = DiaAgent()
+        logger.info(f"Initializing Voice Agent (worker {config.WORKER_ID}, pid {os.getpid()})...")
+        shared_state = None
+        if config.STATE_BACKEND:
+            shared_state = create_state_store(
+                config.STATE_BACKEND, config.STATE_DIR, ttl=config.SESSION_IDLE_TIMEOUT
+            )
+        sessions = SessionStore(
+            max_exchanges=config.SESSION_MAX_EXCHANGES,
+            idle_timeout=config.SESSION_IDLE_TIMEOUT,
+            max_sessions=config.SESSION_MAX_SESSIONS,
+            shared=shared_state
+        )
+        audio_store = AudioStore(
+            worker_directory(config.AUDIO_DIR),
+            max_bytes=config.AUDIO_MAX_BYTES,
+            max_age=config.AUDIO_MAX_AGE
+        )
+        audio_cache = None
+        if config.AUDIO_CACHE_ENABLED:
+            audio_cache = AudioCache(
+                worker_directory(config.AUDIO_CACHE_DIR),
+                max_bytes=config.AUDIO_CACHE_MAX_BYTES,
+                max_age=config.AUDIO_CACHE_MAX_AGE
+            )
+        audio_memory = None
+        if config.AUDIO_MEMORY_ENABLED:
+            # Other workers can only serve audio on disk, so with several
+            # workers every buffer is also written to the spill tier
+            write_through = config.WORKER_ID is not None and config.SERVE_WORKERS > 1
+            spill = None
+            if config.AUDIO_MEMORY_SPILL or write_through:
+                spill = audio_cache if audio_cache is not None else audio_store
+            audio_memory = AudioBufferPool(
+                max_bytes=config.AUDIO_MEMORY_MAX_BYTES,
+                max_item_bytes=config.AUDIO_MEMORY_MAX_ITEM_BYTES,
+                spill=spill,
+                write_through=write_through
+            )
+        audio_janitor = AudioJanitor(
+            [store for store in (audio_store, audio_cache) if store is not None],
+            interval=config.AUDIO_SWEEP_INTERVAL
+        )
+        audio_janitor.start()
+        knowledge = None
+        if config.KNOWLEDGE_DIR:
+            knowledge = KnowledgeBase(
+                config.KNOWLEDGE_DIR,
+                config.KNOWLEDGE_INDEX_DIR,
+                passage_words=config.KNOWLEDGE_PASSAGE_WORDS,
+                min_score=config.KNOWLEDGE_MIN_SCORE,
+                refresh_interval=config.KNOWLEDGE_REFRESH_INTERVAL,
+                latency=stage_latency
+            )
+            # Workers after the first find the index built and only map it
+            await asyncio.to_thread(knowledge.refresh)
+            knowledge.start()
+        dia_agent = DiaAgent(retriever=knowledge)
+        interaction_log = None
+        interaction_metrics = None
+        if config.INTERACTION_LOG_DIR:
+            interaction_log = InteractionLog(
+                config.INTERACTION_LOG_DIR,
+                flush_bytes=config.INTERACTION_LOG_FLUSH_BYTES,
+                flush_interval=config.INTERACTION_LOG_FLUSH_INTERVAL,
+                segment_bytes=config.INTERACTION_LOG_SEGMENT_BYTES,
+                max_pending=config.INTERACTION_LOG_MAX_PENDING,
+                max_age=config.INTERACTION_LOG_MAX_AGE,
+                max_bytes=config.INTERACTION_LOG_MAX_BYTES
+            )
+            interaction_log.start()
+            interaction_metrics = InteractionMetrics(
+                config.INTERACTION_LOG_DIR, bucket_seconds=config.DASHBOARD_BUCKET_SECONDS
+            )
+        sentiment_stage = None
+        if config.SENTIMENT_ENABLED:
+            sentiment_stage = SentimentStage(
+                SentimentAnalyzer.from_file(
+                    config.SENTIMENT_LEXICON_PATH, cache_size=config.SENTIMENT_CACHE_SIZE
+                ),
+                max_batch_size=config.SENTIMENT_BATCH_MAX_SIZE
+            )
+        audio_encoder = None
+        if config.AUDIO_CODEC:
+            audio_encoder = AudioEncoder(
+                codec=config.AUDIO_CODEC,
+                bitrate=config.AUDIO_BITRATE,
+                workers=config.AUDIO_ENCODER_WORKERS,
+                latency=stage_latency
+            )
+            audio_encoder.start()
+        tts_backend = create_tts_backend()
+        tts_workers = config.TTS_WORKERS
+        if config.TTS_BACKEND == "dia":
+            # Dia's pool threads only wait on its batcher; run enough to fill a batch
+            tts_workers = max(tts_workers, config.DIA_BATCH_MAX_SIZE)
+        if tts_backend.max_workers is not None and tts_workers > tts_backend.max_workers:
+            logger.warning(
+                f"TTS backend {tts_backend.name} can only run {tts_backend.max_workers} "
+                f"worker(s) per process; ignoring TTS_WORKERS={tts_workers}"
+            )
+            tts_workers = tts_backend.max_workers
+        tts_pool = TTSWorkerPool(
+            tts_backend,
+            workers=tts_workers,
+            queue_size=config.TTS_QUEUE_SIZE,
+            latency=stage_latency
+        )
+        tts_pool.start()
+        stt_recognizer = None
+        stt_pool = None
+        if config.STT_RECOGNIZER:
+            stt_recognizer = create_recognizer(config.STT_RECOGNIZER)
+            missing = stt_recognizer.missing_modules()
+            if missing:
+                logger.warning(
+                    f"Speech input disabled: recognizer {config.STT_RECOGNIZER} needs {', '.join(missing)}"
+                )
+                stt_recognizer = None
+        if stt_recognizer is not None:
+            logger.info(f"Using speech recognizer: {config.STT_RECOGNIZER}")
+            # Recognizers follow the same one-engine-per-thread rule as TTS engines
+            stt_pool = TTSWorkerPool(
+                stt_recognizer,
+                workers=config.STT_WORKERS,
+                queue_size=config.STT_QUEUE_SIZE,
+                latency=stage_latency,
+                name="stt",
+                stage="transcription"
+            )
+            stt_pool.start()
+        if config.TTS_WARMUP:
+            if audio_cache is None:
+                logger.warning("TTS warmup requested but the audio cache is disabled; skipping")
+            else:
+                # Runs in the background so the server is ready immediately
+                warmup = TemplateWarmup(dia_agent.response_templates())
+                warmup_task = asyncio.create_task(warmup.run(tts_pool.synthesize))
         logger.info("Voice Agent initialized successfully")
     except Exception as e:
         logger.error(f"Failed to initialize Voice agent: {str(e)}")
@@ -51,79 +317,671 @@ async def startup_event():
 
 @app.on_event("shutdown")
 async def shutdown_event():
+    if warmup_task and not warmup_task.done():
+        warmup_task.cancel()
+    if sentiment_stage:
+        await sentiment_stage.close()
+    if knowledge:
+        await knowledge.stop()
+    if interaction_log:
+        await interaction_log.stop()
+    if tts_pool:
+        tts_pool.shutdown()
+    if stt_pool:
+        stt_pool.shutdown()
+    if audio_encoder:
+        audio_encoder.shutdown()
+    if tts_backend:
+        tts_backend.close()
     if dia_agent:
         dia_agent.cleanup()
+    if audio_janitor:
+        await audio_janitor.stop()
+
+def worker_directory(directory: str, worker_id: Optional[int] = None) -> str:
+    """Return a worker's own subdirectory of ``directory`` when serving with several workers.
+    
+    Each worker indexes and evicts only the audio it rendered, so workers
+    never race on the same journal.
+    """
+    if worker_id is None:
+        worker_id = config.WORKER_ID
+    if worker_id is None:
+        return directory
+    return os.path.join(directory, f"worker-{worker_id}")
+
+def sibling_audio_paths(filename: str) -> List[Path]:
+    """Where other workers would have written ``filename`` (empty with a single worker)."""
+    if config.WORKER_ID is None:
+        return []
+    paths = []
+    for worker_id in range(config.SERVE_WORKERS):
+        if worker_id == config.WORKER_ID:
+            continue
+        for directory in (config.AUDIO_CACHE_DIR, config.AUDIO_DIR):
+            path = confine(Path(worker_directory(directory, worker_id)), filename)
+            if path is not None:
+                paths.append(path)
+    return paths
+
+def create_tts_backend():
+    """Build the speech backend configured for this deployment."""
+    options = {
+        "audio_cache": audio_cache, "audio_store": audio_store, "audio_memory": audio_memory,
+        "encoder": audio_encoder
+    }
+    if config.TTS_BACKEND == "pyttsx3":
+        # Shares the agent's voice settings
+        options["agent"] = dia_agent
+    elif config.TTS_BACKEND == "dia":
+        options["max_batch_size"] = config.DIA_BATCH_MAX_SIZE
+        options["batch_window_ms"] = config.DIA_BATCH_WINDOW_MS
+    elif config.TTS_BACKEND == "sine":
+        options["seconds_per_char"] = config.SINE_SECONDS_PER_CHAR
+    logger.info(f"Using TTS backend: {config.TTS_BACKEND}")
+    return create_backend(config.TTS_BACKEND, **options)
+
+def resolve_audio_path(filename: str) -> Optional[Path]:
+    """Return the on-disk location of a generated audio file.
+    
+    Returns None for names that would resolve outside the audio store.
+    """
+    if tts_backend is not None:
+        directory = tts_backend.audio_path(filename).parent
+    else:
+        directory = Path(config.AUDIO_DIR)
+    return confine(directory, filename)
+
+def verify_audio(filename: str):
+    """Check that generated audio can be served, with at most one stat call.
+    
+    Raises:
+        RuntimeError: If the audio is missing or empty
+    """
+    buffer = tts_backend.audio_buffer(filename)
+    if buffer is not None:
+        size = len(buffer)
+    else:
+        full_path = resolve_audio_path(filename)
+        try:
+            size = os.stat(full_path).st_size if full_path is not None else None
+        except OSError:
+            size = None
+        if size is None:
+            raise RuntimeError("Generated audio file not found")
+    if size == 0:
+        raise RuntimeError("Generated audio file is empty")
+
+def log_exchange(text: str, response_text: str, received: float, **fields):
+    """Log one structured record per handled message.
+    
+    The user's text and the reply are only included when ``LOG_PAYLOADS`` is on.
+    """
+    fields["duration_ms"] = round((time.perf_counter() - received) * 1000, 2)
+    if config.LOG_PAYLOADS:
+        fields["text"] = text
+        fields["response"] = response_text
+    logger.info("Message handled", extra={"fields": fields})
+
+class PendingReply:
+    """A message being answered on a connection.
+    
+    The reply's ordered frames (the text, then streamed audio) are queued in
+    ``outbox`` and sent by the connection's writer strictly in the order the
+    messages arrived. An ``audio_ready`` event for audio rendered to a file
+    is sent by the reply's own task as soon as the audio exists, once the
+    text has gone out.
+    """
+    
+    __slots__ = ("message_id", "outbox", "task", "sent", "finished", "cancelled", "notified")
+    
+    def __init__(self, message_id=None):
+        self.message_id = message_id
+        self.outbox: asyncio.Queue = asyncio.Queue()
+        self.task: Optional[asyncio.Task] = None
+        # Set by the writer once the ordered frames are out
+        self.sent = asyncio.Event()
+        self.finished = False
+        self.cancelled = False
+        self.notified = False
+    
+    def put(self, frame):
+        self.outbox.put_nowait(frame)
+    
+    def finish(self):
+        if not self.finished:
+            self.finished = True
+            self.outbox.put_nowait(_END_OF_REPLY)
+    
+    @property
+    def done(self) -> bool:
+        return self.sent.is_set() and (self.task is None or self.task.done())
+    
+    def cancel(self):
+        """Abort the reply: pending synthesis is dropped and unsent frames are discarded."""
+        self.cancelled = True
+        if self.task is not None and not self.task.done():
+            self.task.cancel()
+
+# Marks the end of a reply's ordered frames in its outbox
+_END_OF_REPLY = object()
+
+class Connection:
+    """Send side of one WebSocket: replies in flight and a lock serializing sends.
+    
+    ``renders`` bounds the replies whose audio is queued or being synthesized
+    to ``WS_MAX_PENDING``; a slot is held until the audio has been sent.
+    """
+    
+    def __init__(self, websocket: WebSocket):
+        self.websocket = websocket
+        self.in_flight: List[PendingReply] = []
+        self.send_lock = asyncio.Lock()
+        self.renders = asyncio.Semaphore(config.WS_MAX_PENDING)
+        self.closed = False
+    
+    def start(self, reply: PendingReply, coroutine=None):
+        """Track ``reply`` until it is sent and ``coroutine`` (its producer) has finished."""
+        if coroutine is not None:
+            reply.task = asyncio.create_task(coroutine)
+            # Also covers a task cancelled before it started running
+            reply.task.add_done_callback(lambda _: (reply.finish(), self.retire(reply)))
+        self.in_flight.append(reply)
+    
+    async def send_text(self, frame: str):
+        async with self.send_lock:
+            with stage_latency.time(stage="send"):
+                await self.websocket.send_text(frame)
+    
+    async def send_bytes(self, frame: bytes):
+        async with self.send_lock:
+            await self.websocket.send_bytes(frame)
+    
+    async def notify_cancelled(self, reply: PendingReply):
+        """Tell the client a reply was aborted (once, whoever notices first)."""
+        if reply.notified or self.closed:
+            return
+        reply.notified = True
+        await self.send_text(json.dumps({'type': 'cancelled', 'id': reply.message_id}))
+    
+    def retire(self, reply: PendingReply):
+        if reply.done and reply in self.in_flight:
+            self.in_flight.remove(reply)
+
+async def stream_speech(reply: PendingReply, text: str):
+    """Queue synthesized audio for the client as binary frames.
+    
+    Queues an ``audio_start`` header frame with the codec and sample rate,
+    the audio itself as binary frames in the order the worker produces them,
+    then an ``audio_end`` frame. Failures are reported with ``audio_error``.
+    """
+    total_bytes = 0
+    message_id = reply.message_id
+    try:
+        async for item in tts_pool.stream(text, chunk_size=config.AUDIO_STREAM_CHUNK_SIZE):
+            if isinstance(item, dict):
+                reply.put(json.dumps({'type': 'audio_start', 'id': message_id, **item}))
+            else:
+                total_bytes += len(item)
+                reply.put(item)
+    except TTSBusyError as e:
+        logger.warning(f"Speech synthesis rejected: {e}")
+        errors_total.inc(type="tts_busy")
+        reply.put(json.dumps({
+            'type': 'audio_error',
+            'id': message_id,
+            'error': "The voice service is busy right now. Please try again in a moment.",
+            'busy': True
+        }))
+        return
+    except Exception as e:
+        logger.error(f"Failed to stream speech: {e}")
+        logger.exception("Full traceback:")
+        errors_total.inc(type="synthesis")
+        reply.put(json.dumps({
+            'type': 'audio_error',
+            'id': message_id,
+            'error': f"Sorry, I couldn't generate the voice response: {str(e)}",
+            'busy': False
+        }))
+        return
+    reply.put(json.dumps({'type': 'audio_end', 'id': message_id, 'bytes': total_bytes}))
+
+async def render_audio(text: str) -> dict:
+    """Render ``text`` to a file and describe the outcome as an ``audio_ready``/``audio_error`` event."""
+    try:
+        # Cache hits skip the worker queue entirely. The lookup can wait on the
+        # store's lock and write its journal, so it runs off the event loop
+        audio_path = await asyncio.to_thread(tts_backend.cached_speech, text)
+        if audio_path is None:
+            audio_path = await tts_pool.synthesize(text)
+        with stage_latency.time(stage="verify"):
+            verify_audio(audio_path)
+    except TTSBusyError as e:
+        logger.warning(f"Speech synthesis rejected: {e}")
+        errors_total.inc(type="tts_busy")
+        return {
+            'type': 'audio_error',
+            'error': "The voice service is busy right now. Please try again in a moment.",
+            'busy': True
+        }
+    except Exception as e:
+        logger.error(f"Failed to generate speech: {e}")
+        logger.exception("Full traceback:")
+        errors_total.inc(type="synthesis")
+        return {
+            'type': 'audio_error',
+            'error': f"Sorry, I couldn't generate the voice response: {str(e)}",
+            'busy': False
+        }
+    return {'type': 'audio_ready', 'audio_path': audio_path}
+
+async def answer(connection: Connection, reply: PendingReply, message_data: dict, text: str,
+                 response_text: str, sentiment: Optional[str], received: float):
+    """Produce the reply to one message: the text at once, the audio when it exists.
+    
+    Nothing is synthesized when the client sent ``require_audio: false``.
+    """
+    require_audio = message_data.get('require_audio', True) is not False
+    stream_audio = require_audio and bool(message_data.get('stream_audio'))
+    audio = None
+    try:
+        reply.put(json.dumps({
+            'type': 'text',
+            'id': reply.message_id,
+            'text': response_text,
+            'sentiment': sentiment,
+            'audio_path': None,
+            'audio_pending': require_audio and not stream_audio,
+            'audio_stream': stream_audio,
+            'error': None,
+            'busy': False
+        }))
+        if stream_audio:
+            # Binary frames carry no id, so streamed audio stays in the ordered outbox
+            await stream_speech(reply, response_text)
+        else:
+            reply.finish()
+            if require_audio:
+                audio = await render_audio(response_text)
+                await reply.sent.wait()
+                if not reply.cancelled:
+                    await connection.send_text(json.dumps({**audio, 'id': reply.message_id}))
+        log_exchange(
+            text, response_text, received,
+            sentiment=sentiment, require_audio=require_audio, streamed=stream_audio,
+            audio_path=(audio or {}).get('audio_path'), busy=(audio or {}).get('busy', False),
+            error=(audio or {}).get('error')
+        )
+    except asyncio.CancelledError:
+        if reply.sent.is_set():
+            # The writer is done with this reply, so the notice is ours to send
+            await connection.notify_cancelled(reply)
+        raise
+
+async def write_replies(connection: Connection, replies: asyncio.Queue):
+    """Send each reply's ordered frames, one reply after another, in arrival order."""
+    while True:
+        reply = await replies.get()
+        try:
+            while True:
+                frame = await reply.outbox.get()
+                if frame is _END_OF_REPLY:
+                    break
+                if reply.cancelled:
+                    continue
+                if isinstance(frame, bytes):
+                    await connection.send_bytes(frame)
+                else:
+                    await connection.send_text(frame)
+            reply.sent.set()
+            if reply.cancelled:
+                await connection.notify_cancelled(reply)
+        finally:
+            reply.sent.set()
+            connection.retire(reply)
+
+def cancel_replies(in_flight: List[PendingReply], message_id=None) -> int:
+    """Cancel the replies still in flight (only ``message_id``'s, if given)."""
+    cancelled = 0
+    for reply in in_flight:
+        if reply.cancelled or (message_id is not None and reply.message_id != message_id):
+            continue
+        reply.cancel()
+        cancelled += 1
+    cancelled_total.inc(cancelled)
+    return cancelled
+
+async def respond(connection: Connection, replies: asyncio.Queue, session_id: str,
+                  client_id: Optional[str], message_data: dict, text: str, received: float,
+                  source: str = "text"):
+    """Generate the reply to ``text`` and queue it for the writer.
+    
+    ``source`` ("text" or "voice") is how the message arrived, for the interaction log.
+    """
+    # Replies are generated in arrival order, so the session history stays in order
+    with stage_latency.time(stage="response"):
+        session = sessions.get_or_create(session_id)
+        sentiment = None
+        sentiment_score = None
+        if sentiment_stage:
+            result = await sentiment_stage.analyze(text)
+            sentiment, sentiment_score = result.label, result.score
+        response_text = dia_agent.process_message(text, session=session, sentiment=sentiment)
+        if client_id is not None:
+            sessions.save(session)
+    
+    if interaction_log is not None:
+        payload = {"text": text, "response": response_text} if config.LOG_PAYLOADS else {}
+        interaction_log.record(
+            id=message_data.get('id'),
+            session_id=session_id,
+            worker=config.WORKER_ID,
+            input=source,
+            sentiment=sentiment,
+            sentiment_score=sentiment_score,
+            response_ms=round((time.perf_counter() - received) * 1000, 2),
+            **payload
+        )
+    
+    require_audio = message_data.get('require_audio', True) is not False
+    if require_audio:
+        # Waits (and stops the reader) while the connection has its fill of syntheses
+        await connection.renders.acquire()
+    reply = PendingReply(message_data.get('id'))
+    connection.start(reply, answer(
+        connection, reply, message_data, text, response_text, sentiment, received
+    ))
+    if require_audio:
+        # Released once the audio has been sent, or the reply was cancelled
+        reply.task.add_done_callback(lambda _: connection.renders.release())
+    await replies.put(reply)
+
+class Listener:
+    """Speech input of one connection: PCM frames in, transcripts and replies out.
+    
+    Utterances found by the VAD are transcribed on the STT worker pool as soon
+    as they end, and answered in the order they were spoken. While an
+    utterance is in progress, a ``partial`` transcript is sent every
+    ``STT_PARTIAL_INTERVAL_MS`` of audio, unless the pool has a backlog, so
+    partials never hold up a final transcript for long.
+    """
+    
+    def __init__(self, connection: Connection, respond, options: dict):
+        """
+        Args:
+            connection: The connection transcripts are sent on
+            respond: ``await respond(message_data, text, received)`` answers a final transcript
+            options: The ``listen`` message (``sample_rate``, ``require_audio``, ``stream_audio``)
+        """
+        self.connection = connection
+        self.respond = respond
+        self.utterance = 0
+        self.vad: Optional[EnergyVAD] = None
+        self._partial: Optional[asyncio.Task] = None
+        self._finals: asyncio.Queue = asyncio.Queue()
+        self._task = asyncio.create_task(self._transcribe_in_order())
+        self.listen(options)
+    
+    def listen(self, options: dict):
+        """(Re)start listening with the settings of a ``listen`` message."""
+        if self.vad is not None:
+            self.flush()
+        self.options = {
+            name: options[name] for name in ('require_audio', 'stream_audio') if name in options
+        }
+        try:
+            self.sample_rate = int(options.get('sample_rate') or config.STT_SAMPLE_RATE)
+        except (TypeError, ValueError):
+            self.sample_rate = config.STT_SAMPLE_RATE
+        self.vad = EnergyVAD(
+            sample_rate=self.sample_rate,
+            frame_ms=config.VAD_FRAME_MS,
+            threshold_db=config.VAD_THRESHOLD_DB,
+            hangover_ms=config.VAD_HANGOVER_MS,
+            min_speech_ms=config.VAD_MIN_SPEECH_MS,
+            max_utterance_s=config.VAD_MAX_UTTERANCE_S
+        )
+        self.partial_samples = int(self.sample_rate * config.STT_PARTIAL_INTERVAL_MS / 1000)
+        self._next_partial = self.partial_samples
+    
+    def feed(self, pcm: bytes):
+        for samples in self.vad.feed(pcm):
+            self._submit(samples)
+        if self.vad.in_speech:
+            self._maybe_partial()
+    
+    def flush(self):
+        """End of input: transcribe the utterance in progress."""
+        samples = self.vad.flush()
+        if samples is not None:
+            self._submit(samples)
+    
+    def close(self):
+        self._task.cancel()
+        if self._partial is not None:
+            self._partial.cancel()
+        while not self._finals.empty():
+            future = self._finals.get_nowait()[1]
+            if future is not None:
+                future.cancel()
+    
+    def _recognize(self, samples):
+        """Queue ``samples`` on the STT pool and return the future of the transcript."""
+        sample_rate = self.sample_rate
+        return stt_pool.submit(
+            lambda engine: stt_recognizer.transcribe(samples, sample_rate, engine=engine)
+        )
+    
+    def _submit(self, samples):
+        ended = time.perf_counter()
+        self.utterance += 1
+        self._next_partial = self.partial_samples
+        try:
+            future = self._recognize(samples)
+        except TTSBusyError as e:
+            logger.warning(f"Speech recognition rejected: {e}")
+            errors_total.inc(type="stt_busy")
+            future = None
+        self._finals.put_nowait((f"utterance-{self.utterance}", future, ended))
+    
+    def _maybe_partial(self):
+        if not self.partial_samples or self.vad.speech_samples < self._next_partial:
+            return
+        if (self._partial is not None and not self._partial.done()) or stt_pool.pending:
+            return
+        self._next_partial = self.vad.speech_samples + self.partial_samples
+        try:
+            future = self._recognize(self.vad.current())
+        except TTSBusyError:
+            return
+        self._partial = asyncio.create_task(self._send_partial(self.utterance + 1, future))
+    
+    async def _send_partial(self, utterance: int, future):
+        try:
+            text = await future
+        except Exception as e:
+            logger.debug(f"Partial transcription failed: {e}")
+            return
+        # Drop partials that lost the race with their utterance's final transcript
+        if text and utterance > self.utterance:
+            await self.connection.send_text(json.dumps({
+                'type': 'partial', 'id': f"utterance-{utterance}", 'text': text
+            }))
+    
+    async def _transcribe_in_order(self):
+        while True:
+            utterance_id, future, ended = await self._finals.get()
+            if future is None:
+                await self.connection.send_text(json.dumps({
+                    'type': 'transcript_error', 'id': utterance_id,
+                    'error': "The speech recognizer is busy right now. Please try again in a moment.",
+                    'busy': True
+                }))
+                continue
+            try:
+                text = (await future).strip()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"Failed to transcribe speech: {e}")
+                errors_total.inc(type="transcription")
+                await self.connection.send_text(json.dumps({
+                    'type': 'transcript_error', 'id': utterance_id,
+                    'error': f"Sorry, I couldn't understand the audio: {str(e)}",
+                    'busy': False
+                }))
+                continue
+            await self.connection.send_text(json.dumps({
+                'type': 'transcript', 'id': utterance_id, 'text': text
+            }))
+            if not text:
+                continue
+            bind(request_id=uuid.uuid4().hex[:16])
+            messages_total.inc()
+            message_data = {**self.options, 'id': utterance_id, 'text': text}
+            await self.respond(message_data, text, ended)
+            stage_latency.observe(time.perf_counter() - ended, stage="end_of_speech_to_reply")
 
 @app.get("/", response_class=HTMLResponse)
 async def home(request: Request):
-    """Render the home page."""
+    """Render the home page.
+    
+    The page streams spoken replies only when that starts playback sooner;
+    otherwise it fetches the rendered file from ``/audio``, which the browser
+    can cache for repeat plays.
+    """
+    stream_audio = tts_backend is not None and tts_backend.prefers_streaming
     return templates.TemplateResponse(
+        request,
         "index.html",
-        {"request": request, "title": "Voice Assistant"}
+        {"title": "Voice Assistant", "stream_audio": stream_audio}
     )
 
 @app.websocket("/ws")
 async def websocket_endpoint(websocket: WebSocket):
-    """Handle WebSocket connections for real-time voice chat."""
-    logger.info("New WebSocket connection attempt...")
+    """Handle WebSocket connections for real-time voice chat.
+    
+    Clients that pass a ``client_id`` query parameter keep their conversation
+    across reconnects; otherwise the session lasts as long as the connection.
+    
+    Every message is answered in two phases: a ``text`` frame as soon as the
+    reply is generated, then an ``audio_ready`` (or ``audio_error``) event
+    once its audio has been rendered, both tagged with the message's ``id``
+    (the client's, or one assigned by the server). ``require_audio: false``
+    skips synthesis; ``stream_audio: true`` streams the audio as binary
+    frames after the text instead.
+    
+    Clients without speech recognition of their own can send their voice as
+    binary frames of 16-bit mono PCM, after an optional ``{"type": "listen",
+    "sample_rate": ...}`` (which may also carry ``require_audio`` and
+    ``stream_audio``); ``{"type": "listen_end"}`` ends the current utterance.
+    The server replies with ``partial`` transcripts while an utterance is in
+    progress, a final ``transcript`` once it ends, and then answers it like a
+    text message whose ``id`` is the utterance's.
+    
+    The connection is split into this reader loop and a writer task. Text
+    (and streamed audio) is sent in the order the messages arrived. At most
+    ``WS_MAX_PENDING`` replies per connection have audio queued or being
+    rendered; further messages are not read until one of them has been sent.
+    ``{"type": "cancel"}`` (barge-in) aborts every reply still in flight, or
+    only the one named by its ``id``: queued synthesis is dropped, streaming
+    stops, and each aborted reply ends with a ``cancelled`` frame.
+    """
     await websocket.accept()
-    logger.info("WebSocket connection accepted")
     active_connections.add(websocket)
+    client_id = websocket.query_params.get("client_id")
+    session_id = sessions.get_or_create(client_id).session_id
+    bind(session_id=session_id)
+    logger.info("WebSocket connection accepted")
+    
+    # Bounded: once it is full the reader stops reading until the writer catches up
+    replies: asyncio.Queue = asyncio.Queue(maxsize=config.WS_MAX_PENDING)
+    connection = Connection(websocket)
+    in_flight = connection.in_flight
+    writer = asyncio.create_task(write_replies(connection, replies))
+    listener: Optional[Listener] = None
+    
+    async def respond_to_speech(message_data: dict, text: str, received: float):
+        await respond(
+            connection, replies, session_id, client_id, message_data, text, received, source="voice"
+        )
     
     try:
         while True:
             try:
-                logger.info("Waiting for message...")
-                data = await websocket.receive_text()
-                logger.info(f"Received message: {data}")
+                receive = asyncio.ensure_future(websocket.receive())
+                await asyncio.wait({receive, writer}, return_when=asyncio.FIRST_COMPLETED)
+                if not receive.done():
+                    # The writer failed (e.g. the client went away mid-send)
+                    receive.cancel()
+                    writer.result()
+                    break
+                message = receive.result()
+                if message["type"] == "websocket.disconnect":
+                    raise WebSocketDisconnect(message.get("code", 1000))
+                if message.get("bytes") is not None:
+                    if stt_pool is None:
+                        continue
+                    if listener is None:
+                        listener = Listener(connection, respond_to_speech, {})
+                    listener.feed(message["bytes"])
+                    continue
+                data = message.get("text")
+                received = time.perf_counter()
+                request_id = uuid.uuid4().hex[:16]
+                bind(request_id=request_id)
+                logger.debug(f"Received message: {data}", extra=PAYLOAD)
+                messages_total.inc()
                 
                 try:
                     # Parse the incoming message
-                    message_data = json.loads(data)
-                    text = message_data.get('text', '')
-                    
-                    logger.info(f"Processing message: {text}")
-                    # Process message using Voice Agent
-                    response_text = dia_agent.process_message(text)
-                    logger.info(f"Generated response: {response_text}")
-                    
-                    # Always generate audio for responses
-                    audio_path = None
-                    error_message = None
-                    try:
-                        logger.info("Generating speech...")
-                        audio_path = dia_agent.generate_speech(response_text)
-                        # Verify the audio file exists
-                        import tempfile
-                        full_path = os.path.join(tempfile.gettempdir(), audio_path)
-                        if not os.path.exists(full_path):
-                            raise RuntimeError("Generated audio file not found")
-                        if os.path.getsize(full_path) == 0:
-                            raise RuntimeError("Generated audio file is empty")
-                        logger.info(f"Speech generated successfully: {audio_path}")
-                    except Exception as e:
-                        logger.error(f"Failed to generate speech: {e}")
-                        logger.exception("Full traceback:")
-                        audio_path = None
-                        error_message = f"Sorry, I couldn't generate the voice response: {str(e)}"
-                    
-                    # Send response
-                    response = {
-                        'text': response_text,
-                        'audio_path': audio_path,
-                        'error': error_message
-                    }
-                    logger.info(f"Sending response: {response}")
-                    await websocket.send_text(json.dumps(response))
-                    logger.info("Response sent successfully")
-                    
+                    with stage_latency.time(stage="json_parse"):
+                        message_data = json.loads(data)
                 except json.JSONDecodeError as e:
                     logger.error(f"Failed to parse message as JSON: {e}")
-                    await websocket.send_text(json.dumps({
+                    errors_total.inc(type="invalid_json")
+                    reply = PendingReply(request_id)
+                    reply.put(json.dumps({
+                        'type': 'text',
+                        'id': request_id,
                         'text': "I couldn't understand that message. Could you try again?",
                         'audio_path': None,
                         'error': "Invalid message format"
                     }))
+                    reply.finish()
+                    connection.start(reply)
+                    await replies.put(reply)
+                    continue
+                
+                if message_data.get('type') == 'cancel':
+                    cancelled = cancel_replies(in_flight, message_data.get('id'))
+                    logger.info(f"Cancelled {cancelled} replies")
+                    continue
+                
+                if message_data.get('type') == 'listen':
+                    if stt_pool is None:
+                        await connection.send_text(json.dumps({
+                            'type': 'transcript_error',
+                            'error': "Speech input is not enabled on this server",
+                            'busy': False
+                        }))
+                        continue
+                    if listener is None:
+                        listener = Listener(connection, respond_to_speech, message_data)
+                    else:
+                        listener.listen(message_data)
+                    continue
+                if message_data.get('type') == 'listen_end':
+                    if listener is not None:
+                        listener.flush()
+                    continue
+                
+                message_data.setdefault('id', request_id)
+                await respond(
+                    connection, replies, session_id, client_id,
+                    message_data, message_data.get('text', ''), received
+                )
                     
             except WebSocketDisconnect:
                 logger.info("WebSocket disconnected")
@@ -132,8 +990,21 @@ async def websocket_endpoint(websocket: WebSocket):
     except Exception as e:
         logger.error(f"WebSocket error: {str(e)}")
         logger.exception("Full traceback:")
+        errors_total.inc(type="websocket")
     finally:
+        connection.closed = True
+        if listener is not None:
+            listener.close()
+        for reply in list(in_flight):
+            reply.cancel()
+        writer.cancel()
+        try:
+            await writer
+        except (asyncio.CancelledError, Exception):
+            pass
         active_connections.remove(websocket)
+        if client_id is None:
+            sessions.remove(session_id)
         try:
             await websocket.close()
         except Exception as e:
@@ -142,60 +1013,177 @@ async def websocket_endpoint(websocket: WebSocket):
 @app.get("/health")
 async def health_check():
     """Health check endpoint."""
-    return {"status": "healthy", "agent": "ready" if dia_agent else "not_initialized"}
+    health = {"status": "healthy", "agent": "ready" if dia_agent else "not_initialized"}
+    if config.WORKER_ID is not None:
+        health["worker"] = {"id": config.WORKER_ID, "pid": os.getpid()}
+    if tts_backend:
+        health["tts_backend"] = tts_backend.name
+    if tts_pool:
+        health["tts_pool"] = {
+            "workers": tts_pool.workers,
+            "busy": tts_pool.busy,
+            "pending": tts_pool.pending,
+            "cancelled": tts_pool.cancelled,
+            "queue_size": tts_pool.queue_size
+        }
+    batching = tts_backend.batch_stats() if tts_backend else None
+    if batching is not None:
+        health["tts_batching"] = batching
+    if audio_cache is not None:
+        health["audio_cache"] = audio_cache.stats()
+    if audio_store is not None:
+        health["audio_store"] = audio_store.stats()
+    if audio_memory is not None:
+        health["audio_memory"] = audio_memory.stats()
+    if audio_encoder is not None:
+        health["audio_encoder"] = audio_encoder.stats()
+    if knowledge is not None:
+        health["knowledge"] = knowledge.stats()
+    if interaction_log is not None:
+        health["interaction_log"] = interaction_log.stats()
+        health["dashboard"] = interaction_metrics.stats()
+    if warmup:
+        health["warmup"] = warmup.progress()
+    if sessions is not None:
+        health["sessions"] = sessions.stats()
+    if sentiment_stage:
+        health["sentiment"] = sentiment_stage.stats()
+    if stt_pool:
+        health["speech_input"] = {
+            "recognizer": stt_recognizer.name,
+            "workers": stt_pool.workers,
+            "busy": stt_pool.busy,
+            "pending": stt_pool.pending,
+            "queue_size": stt_pool.queue_size
+        }
+    health["logging"] = log_runtime.stats()
+    return health
+
+@app.get("/metrics")
+async def get_metrics():
+    """Expose latency histograms, gauges and error counters in the Prometheus text format."""
+    return Response(content=metrics.render(), media_type=METRICS_CONTENT_TYPE)
+
+@app.get("/dashboard", response_class=HTMLResponse)
+async def dashboard(request: Request):
+    """Render the conversation metrics dashboard (charts are drawn from ``/dashboard/data``)."""
+    return templates.TemplateResponse(
+        request,
+        "dashboard.html",
+        {"title": "Conversation Metrics"}
+    )
+
+@app.get("/dashboard/data")
+async def dashboard_data():
+    """Conversation totals and per-bucket series, after reading only the newly logged interactions."""
+    if interaction_metrics is None:
+        return JSONResponse(
+            status_code=404,
+            content={"error": "Interaction log is disabled"}
+        )
+    await asyncio.to_thread(interaction_metrics.update)
+    return interaction_metrics.snapshot()
+
+@app.get("/sessions/{session_id}")
+async def get_session(session_id: str):
+    """Report the history length and approximate memory held by a session."""
+    session = sessions.get(session_id) if sessions is not None else None
+    if session is None:
+        return JSONResponse(
+            status_code=404,
+            content={"error": "Session not found"}
+        )
+    return {
+        "session_id": session.session_id,
+        "exchanges": len(session),
+        "max_exchanges": session.max_exchanges,
+        "bytes": session.memory_usage(),
+        "idle_seconds": round(time.time() - session.last_active, 3)
+    }
 
 @app.get("/audio/{filename}")
-async def get_audio(filename: str):
-    """Serve generated audio files."""
-    import tempfile
-    audio_path = Path(tempfile.gettempdir()) / filename
-    logger.info(f"Requested audio file: {audio_path}")
+async def get_audio(filename: str, request: Request):
+    """Serve generated audio files.
+    
+    Filenames are content hashes, so responses are cacheable forever and
+    revalidation (If-None-Match) and seeking (Range) are supported. Audio
+    held in memory is streamed from the buffer without touching the disk.
+    """
+    buffer = tts_backend.audio_buffer(filename) if tts_backend is not None else None
+    if buffer is not None:
+        return audio_response(
+            request,
+            size=len(buffer),
+            etag=etag_for(filename),
+            media_type=media_type_for(bytes(buffer[:12])),
+            body=memory_body(buffer)
+        )
+    
+    audio_path = resolve_audio_path(filename)
+    if audio_path is None:
+        logger.warning(f"Rejected audio file name: {filename!r}")
+        errors_total.inc(type="audio_not_found")
+        return JSONResponse(
+            status_code=404,
+            content={"error": "Audio file not found"}
+        )
     
-    if not audio_path.exists():
+    stat = None
+    # Audio rendered by another worker lives in that worker's directory
+    for candidate in [audio_path] + sibling_audio_paths(filename):
+        try:
+            stat = os.stat(candidate)
+        except OSError:
+            continue
+        audio_path = candidate
+        break
+    if stat is None:
         logger.error(f"Audio file not found: {audio_path}")
+        errors_total.inc(type="audio_not_found")
         return JSONResponse(
             status_code=404,
             content={"error": "Audio file not found"}
         )
         
-    if audio_path.stat().st_size == 0:
+    if stat.st_size == 0:
         logger.error(f"Audio file is empty: {audio_path}")
+        errors_total.inc(type="audio_empty")
         return JSONResponse(
             status_code=500,
             content={"error": "Audio file is empty"}
         )
-        
-    logger.info("Audio file found and valid, serving...")
-    return FileResponse(
-        audio_path,
-        media_type="audio/mpeg",
-        headers={
-            "Cache-Control": "no-cache",
-            "X-Content-Type-Options": "nosniff"
-        }
+    
+    return audio_response(
+        request,
+        size=stat.st_size,
+        etag=etag_for(filename),
+        media_type=media_type_for_extension(audio_path.suffix),
+        body=file_body(audio_path)
     )
 
-def main():
-    """Main entry point of the application."""
+def main(argv: Optional[List[str]] = None):
+    """Main entry point of the application.
+    
+    Serves with ``--workers`` processes (``SERVE_WORKERS``) and no reload;
+    ``--reload`` runs a single auto-reloading process for development.
+    """
+    parser = argparse.ArgumentParser(description="Run the voice agent server")
+    parser.add_argument("--host", default=config.SERVE_HOST)
+    parser.add_argument("--port", type=int, default=config.SERVE_PORT)
+    parser.add_argument("--workers", type=int, default=config.SERVE_WORKERS,
+                        help="Worker processes, each with its own engines")
+    parser.add_argument("--reload", action="store_true", help="Development mode: reload on code changes")
+    parser.add_argument("--log-level", default="info")
+    args = parser.parse_args(argv)
+
     logger.info("Starting Conversational Agent...")
-    # Use a different port if 8000 is in use
-    try:
-        uvicorn.run(
-            "main:app",
-            host="0.0.0.0",
-            port=8000,
-            reload=True,
-            log_level="info"
-        )
-    except OSError:
-        logger.info("Port 8000 in use, trying port 8001")
-        uvicorn.run(
-            "main:app",
-            host="0.0.0.0",
-            port=8001,
-            reload=True,
-            log_level="info"
-        )
+    if args.reload:
+        uvicorn.run("src.main:app", host=args.host, port=args.port, reload=True, log_level=args.log_level)
+    elif args.workers > 1:
+        from .serve import WorkerSupervisor
+        WorkerSupervisor(args.host, args.port, args.workers, log_level=args.log_level).run()
+    else:
+        uvicorn.run("src.main:app", host=args.host, port=args.port, log_level=args.log_level)
 
 if __name__ == "__main__":
-    main() 
\ No newline at end of file
+    main()
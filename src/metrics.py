@@ -0,0 +1,186 @@
+"""
+In-process metrics rendered in the Prometheus text exposition format.
+"""
+import bisect
+import math
+import threading
+import time
+from contextlib import contextmanager
+from typing import Callable, Dict, Iterator, List, Optional, Sequence, Tuple
+
+# Latency buckets in seconds, from sub-millisecond parsing up to slow synthesis
+DEFAULT_BUCKETS = (
+    0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0
+)
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+
+class _Metric:
+    kind = ""
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+
+    def _key(self, labels: Dict[str, str]) -> Tuple[str, ...]:
+        if set(labels) != set(self.labelnames):
+            raise ValueError(f"{self.name} expects labels {self.labelnames}, got {tuple(labels)}")
+        return tuple(str(labels[name]) for name in self.labelnames)
+
+    def _labels(self, key: Tuple[str, ...], extra: str = "") -> str:
+        pairs = [f'{name}="{_escape(value)}"' for name, value in zip(self.labelnames, key)]
+        if extra:
+            pairs.append(extra)
+        return "{" + ",".join(pairs) + "}" if pairs else ""
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.kind}"]
+        lines.extend(self._samples())
+        return lines
+
+    def _samples(self) -> List[str]:
+        raise NotImplementedError
+
+
+class Counter(_Metric):
+    """Monotonically increasing count, optionally split by labels."""
+
+    kind = "counter"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        super().__init__(name, documentation, labelnames)
+        self._values: Dict[Tuple[str, ...], float] = {}
+
+    def inc(self, amount: float = 1.0, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+    def value(self, **labels) -> float:
+        return self._values.get(self._key(labels), 0.0)
+
+    def _samples(self) -> List[str]:
+        with self._lock:
+            values = sorted(self._values.items())
+        return [f"{self.name}{self._labels(key)} {_format(value)}" for key, value in values]
+
+
+class Gauge(_Metric):
+    """Point-in-time value, either set directly or read from ``function`` at scrape time."""
+
+    kind = "gauge"
+
+    def __init__(self, name: str, documentation: str,
+                 function: Optional[Callable[[], Optional[float]]] = None):
+        super().__init__(name, documentation)
+        self.function = function
+        self._value = 0.0
+
+    def set(self, value: float):
+        self._value = value
+
+    def value(self) -> Optional[float]:
+        return self.function() if self.function is not None else self._value
+
+    def _samples(self) -> List[str]:
+        value = self.value()
+        # A gauge whose source is not running (e.g. a disabled cache) is omitted
+        return [] if value is None else [f"{self.name} {_format(value)}"]
+
+
+class Histogram(_Metric):
+    """Distribution of observed values over fixed buckets, optionally split by labels."""
+
+    kind = "histogram"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = (),
+                 buckets: Sequence[float] = DEFAULT_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets))
+        # label values -> (per-bucket counts with a final +Inf slot, [sum, count])
+        self._series: Dict[Tuple[str, ...], Tuple[List[int], List[float]]] = {}
+
+    def observe(self, value: float, **labels):
+        key = self._key(labels)
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(key)
+            if series is None:
+                series = self._series[key] = ([0] * (len(self.buckets) + 1), [0.0, 0])
+            series[0][index] += 1
+            series[1][0] += value
+            series[1][1] += 1
+
+    @contextmanager
+    def time(self, **labels) -> Iterator[None]:
+        """Observe the wall-clock duration of the ``with`` block."""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - start, **labels)
+
+    def count(self, **labels) -> int:
+        series = self._series.get(self._key(labels))
+        return int(series[1][1]) if series is not None else 0
+
+    def _samples(self) -> List[str]:
+        with self._lock:
+            series = sorted((key, (list(counts), list(totals)))
+                            for key, (counts, totals) in self._series.items())
+        lines = []
+        for key, (counts, (total, count)) in series:
+            cumulative = 0
+            for bound, bucket_count in zip(self.buckets + (math.inf,), counts):
+                cumulative += bucket_count
+                le = 'le="' + _format(bound) + '"'
+                lines.append(f"{self.name}_bucket{self._labels(key, le)} {cumulative}")
+            lines.append(f"{self.name}_sum{self._labels(key)} {_format(total)}")
+            lines.append(f"{self.name}_count{self._labels(key)} {int(count)}")
+        return lines
+
+
+class MetricsRegistry:
+    """Collection of metrics exposed together on ``/metrics``."""
+
+    def __init__(self):
+        self._metrics: Dict[str, _Metric] = {}
+
+    def register(self, metric: _Metric) -> _Metric:
+        if metric.name in self._metrics:
+            raise ValueError(f"Metric {metric.name} is already registered")
+        self._metrics[metric.name] = metric
+        return metric
+
+    def counter(self, name: str, documentation: str, labelnames: Sequence[str] = ()) -> Counter:
+        return self.register(Counter(name, documentation, labelnames))
+
+    def gauge(self, name: str, documentation: str,
+              function: Optional[Callable[[], Optional[float]]] = None) -> Gauge:
+        return self.register(Gauge(name, documentation, function))
+
+    def histogram(self, name: str, documentation: str, labelnames: Sequence[str] = (),
+                  buckets: Sequence[float] = DEFAULT_BUCKETS) -> Histogram:
+        return self.register(Histogram(name, documentation, labelnames, buckets))
+
+    def render(self) -> str:
+        """Return every metric in the Prometheus text format."""
+        lines = []
+        for metric in self._metrics.values():
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format(value: float) -> str:
+    if value == math.inf:
+        return "+Inf"
+    if float(value).is_integer():
+        return str(int(value))
+    return repr(float(value))
@@ -0,0 +1,122 @@
+"""
+Production serving: a fixed set of worker processes sharing one listening socket.
+"""
+import logging
+import multiprocessing
+import os
+import signal
+import socket
+import time
+from typing import List, Optional
+
+from . import config
+
+logger = logging.getLogger(__name__)
+
+APP = "src.main:app"
+
+
+def _run_worker(index: int, sock: socket.socket, log_level: str):
+    """Entry point of a worker process: serve the app on the inherited socket.
+
+    Each worker imports the app itself and runs its startup, so engines,
+    caches and sessions are created per process and never shared.
+    """
+    import uvicorn
+
+    config.WORKER_ID = index
+    server = uvicorn.Server(uvicorn.Config(APP, log_level=log_level, lifespan="on"))
+    server.run(sockets=[sock])
+
+
+class WorkerSupervisor:
+    def __init__(self, host: str = "0.0.0.0", port: int = 8000, workers: int = 2,
+                 log_level: str = "info", restart_delay: float = 1.0):
+        """Run ``workers`` copies of the app without reload.
+
+        Workers that exit unexpectedly are restarted under the same index,
+        so they reuse their audio directories.
+
+        Args:
+            host: Interface to listen on
+            port: Port to listen on
+            workers: Number of worker processes
+            log_level: uvicorn log level for the workers
+            restart_delay: Seconds to wait before restarting a crashed worker
+        """
+        if workers < 1:
+            raise ValueError("workers must be at least 1")
+        self.host = host
+        self.port = port
+        self.workers = workers
+        self.log_level = log_level
+        self.restart_delay = restart_delay
+        self.restarts = 0
+        self._context = multiprocessing.get_context("spawn")
+        self._processes: List[Optional[multiprocessing.Process]] = [None] * workers
+        self._socket: Optional[socket.socket] = None
+        self._stopping = False
+
+    def start(self):
+        """Bind the socket and start every worker."""
+        self._socket = socket.socket(socket.AF_INET6 if ":" in self.host else socket.AF_INET)
+        self._socket.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+        self._socket.bind((self.host, self.port))
+        self._socket.set_inheritable(True)
+        self.port = self._socket.getsockname()[1]
+        # Workers read their settings from the environment when they import the app
+        os.environ["SERVE_WORKERS"] = str(self.workers)
+        for index in range(self.workers):
+            self._spawn(index)
+        logger.info(f"Serving on {self.host}:{self.port} with {self.workers} workers")
+
+    def run(self):
+        """Start the workers and supervise them until SIGINT or SIGTERM."""
+        for signum in (signal.SIGINT, signal.SIGTERM):
+            signal.signal(signum, lambda *_: self.request_stop())
+        self.start()
+        try:
+            while not self._stopping:
+                self.check()
+                time.sleep(0.5)
+        finally:
+            self.stop()
+
+    def check(self):
+        """Restart workers that have exited."""
+        for index, process in enumerate(self._processes):
+            if process is not None and not process.is_alive() and not self._stopping:
+                logger.warning(f"Worker {index} (pid {process.pid}) exited with {process.exitcode}; restarting")
+                self.restarts += 1
+                time.sleep(self.restart_delay)
+                self._spawn(index)
+
+    def request_stop(self):
+        self._stopping = True
+
+    def stop(self, timeout: float = 10.0):
+        """Ask every worker to shut down gracefully, then kill stragglers."""
+        self._stopping = True
+        for process in self._processes:
+            if process is not None and process.is_alive():
+                process.terminate()
+        deadline = time.monotonic() + timeout
+        for process in self._processes:
+            if process is None:
+                continue
+            process.join(max(0.0, deadline - time.monotonic()))
+            if process.is_alive():
+                process.kill()
+                process.join()
+        if self._socket is not None:
+            self._socket.close()
+            self._socket = None
+
+    def _spawn(self, index: int):
+        process = self._context.Process(
+            target=_run_worker,
+            args=(index, self._socket, self.log_level),
+            name=f"voice-agent-worker-{index}"
+        )
+        process.start()
+        self._processes[index] = process
@@ -0,0 +1,64 @@
+import os
+import time
+from src.ai.audio_cache import AudioCache
+
+
+def _render(tmp_path, name, size):
+    path = tmp_path / name
+    path.write_bytes(b"x" * size)
+    return str(path)
+
+
+def test_key_depends_on_engine_settings():
+    base = AudioCache.make_key("Hello", "pyttsx3", voice="voice-a", rate=175, volume=1.0)
+    assert base == AudioCache.make_key("Hello", "pyttsx3", volume=1.0, rate=175, voice="voice-a")
+    assert base != AudioCache.make_key("Hello", "pyttsx3", voice="voice-b", rate=175, volume=1.0)
+    assert base != AudioCache.make_key("Hello", "pyttsx3", voice="voice-a", rate=200, volume=1.0)
+    assert base != AudioCache.make_key("Hello", "dia", voice="voice-a", rate=175, volume=1.0)
+
+
+def test_put_then_get_hits(tmp_path):
+    cache = AudioCache(str(tmp_path / "cache"))
+    assert cache.get("abc") is None
+    filename = cache.put("abc", _render(tmp_path, "speech.mp3", 10))
+    assert cache.get("abc") == filename
+    assert cache.path_for(filename).exists()
+    assert cache.stats()["hits"] == 1
+    assert cache.stats()["misses"] == 1
+
+
+def test_evicts_least_recently_used_over_budget(tmp_path):
+    cache = AudioCache(str(tmp_path / "cache"), max_bytes=25)
+    cache.put("a", _render(tmp_path, "a.mp3", 10))
+    cache.put("b", _render(tmp_path, "b.mp3", 10))
+    cache.get("a")
+    cache.put("c", _render(tmp_path, "c.mp3", 10))
+    assert cache.get("b") is None
+    assert cache.get("a") is not None
+    assert cache.total_bytes == 20
+
+
+def test_expired_entries_are_dropped(tmp_path):
+    cache = AudioCache(str(tmp_path / "cache"), max_age=60)
+    filename = cache.put("a", _render(tmp_path, "a.mp3", 10))
+    path = cache.path_for(filename)
+    cache._index["a"] = (filename, 10, time.time() - 120, time.time())
+    assert cache.get("a") is None
+    assert not os.path.exists(path)
+
+
+def test_index_survives_restart(tmp_path):
+    directory = str(tmp_path / "cache")
+    AudioCache(directory).put("a", _render(tmp_path, "a.mp3", 10))
+    reopened = AudioCache(directory)
+    assert len(reopened) == 1
+    assert reopened.get("a") is not None
+
+
+def test_put_bytes_keeps_the_extension(tmp_path):
+    cache = AudioCache(str(tmp_path / "cache"))
+    filename = cache.put_bytes("abc", b"RIFF", ".wav")
+    assert filename.endswith(".wav")
+    assert cache.get("abc") == filename
+    assert cache.path_for(filename).read_bytes() == b"RIFF"
+    assert cache.path_for("tts_abc.mp3") is None
@@ -0,0 +1,78 @@
+import io
+
+import pytest
+import soundfile as sf
+
+from src.ai.audio_encoder import AudioEncoder, compression_level, encode_pcm
+from src.ai.audio_format import detect_container, pcm_to_wav
+from src.ai.tts_backends import SineBackend
+
+
+def _speech(text="hello there how are you today", sample_rate=16000):
+    return b"".join(SineBackend(sample_rate=sample_rate)._render(text))
+
+
+@pytest.fixture
+def encoder():
+    encoder = AudioEncoder(codec="opus", bitrate=24000)
+    encoder.start()
+    yield encoder
+    encoder.shutdown()
+
+
+def test_compression_level_follows_the_bitrate():
+    assert compression_level("opus", 6000) == 1.0
+    assert compression_level("opus", 256000) == 0.0
+    assert compression_level("opus", 24000) > compression_level("opus", 64000)
+    assert compression_level("opus", 10 ** 7) == 0.0
+
+
+@pytest.mark.parametrize("codec,container", [("opus", "ogg"), ("flac", "flac")])
+def test_encode_pcm_round_trips(codec, container):
+    pcm = _speech()
+    encoded, sample_rate = encode_pcm(pcm, 16000, 1, codec, 24000)
+    assert detect_container(encoded) == container
+    decoded, decoded_rate = sf.read(io.BytesIO(encoded), dtype="int16")
+    assert decoded_rate == sample_rate == 16000
+    assert abs(len(decoded) - len(pcm) // 2) < 1000
+
+
+def test_opus_resamples_unsupported_rates():
+    encoded, sample_rate = encode_pcm(_speech(sample_rate=22050), 22050, 1, "opus", 24000)
+    assert sample_rate == 24000
+    assert sf.info(io.BytesIO(encoded)).samplerate == 24000
+
+
+def test_encoder_shrinks_wav_by_an_order_of_magnitude(encoder):
+    wav = pcm_to_wav(_speech(), 16000)
+    encoded, sample_rate = encoder.encode(wav)
+    assert encoded.startswith(b"OggS") and sample_rate == 16000
+    assert len(wav) / len(encoded) >= 8
+    stats = encoder.stats()
+    assert stats["encoded"] == 1
+    assert stats["bytes_per_second"] < 4000
+    assert encoder.bytes_per_second() == pytest.approx(len(encoded) / stats["speech_seconds"], rel=0.01)
+
+
+def test_encoder_passes_through_compressed_or_unstarted(encoder):
+    ogg = b"OggS" + bytes(100)
+    assert encoder.encode(ogg) == (ogg, None)
+    assert encoder.stats()["passed_through"] == 1
+    wav = pcm_to_wav(_speech("hi"), 16000)
+    assert AudioEncoder().encode(wav) == (wav, None)
+
+
+def test_backend_stores_encoded_audio(encoder, tmp_path):
+    from src.ai.audio_store import AudioStore
+
+    backend = SineBackend(audio_store=AudioStore(tmp_path), encoder=encoder)
+    plain = SineBackend(audio_store=AudioStore(tmp_path))
+    assert backend.cache_key("hello") != plain.cache_key("hello")
+    filename = backend.generate_speech("hello")
+    assert filename.endswith(".ogg")
+    assert backend.audio_path(filename).read_bytes().startswith(b"OggS")
+
+
+def test_unknown_codec():
+    with pytest.raises(ValueError, match="Unknown audio codec"):
+        AudioEncoder(codec="mp3")
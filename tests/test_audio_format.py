@@ -0,0 +1,33 @@
+import io
+import wave
+from src.ai.audio_format import describe_audio, detect_container, media_type_for
+
+
+def _wav_bytes(frames=b"\x01\x00\x02\x00", sample_rate=22050):
+    buffer = io.BytesIO()
+    with wave.open(buffer, "wb") as wav:
+        wav.setnchannels(1)
+        wav.setsampwidth(2)
+        wav.setframerate(sample_rate)
+        wav.writeframes(frames)
+    return buffer.getvalue()
+
+
+def test_detects_common_containers():
+    assert detect_container(_wav_bytes()) == "wav"
+    assert detect_container(b"OggS\x00\x02") == "ogg"
+    assert detect_container(b"fLaC\x00\x00") == "flac"
+    assert detect_container(b"ID3\x04\x00") == "mpeg"
+    assert detect_container(b"\x00\x00\x00\x00") is None
+
+
+def test_wav_is_labelled_as_wav_not_mpeg():
+    assert media_type_for(_wav_bytes()) == "audio/wav"
+
+
+def test_pcm_wav_is_unwrapped_for_streaming():
+    audio = describe_audio(_wav_bytes(sample_rate=16000))
+    assert audio["codec"] == "pcm_s16le"
+    assert audio["sample_rate"] == 16000
+    assert audio["channels"] == 1
+    assert audio["payload"] == b"\x01\x00\x02\x00"
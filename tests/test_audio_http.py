@@ -0,0 +1,35 @@
+import pytest
+from src.audio_http import RangeNotSatisfiable, confine, etag_matches, parse_range
+
+
+def test_parse_range_forms():
+    assert parse_range("bytes=0-99", 1000) == (0, 99)
+    assert parse_range("bytes=900-", 1000) == (900, 999)
+    assert parse_range("bytes=-100", 1000) == (900, 999)
+    assert parse_range("bytes=950-2000", 1000) == (950, 999)
+
+
+def test_parse_range_ignores_what_it_cannot_serve():
+    assert parse_range(None, 1000) is None
+    assert parse_range("items=0-1", 1000) is None
+    assert parse_range("bytes=0-1,5-6", 1000) is None
+    assert parse_range("bytes=abc-", 1000) is None
+
+
+def test_range_past_the_end_is_unsatisfiable():
+    with pytest.raises(RangeNotSatisfiable):
+        parse_range("bytes=1000-", 1000)
+
+
+def test_etag_matching():
+    assert etag_matches('"abc"', '"abc"')
+    assert etag_matches('"x", W/"abc"', '"abc"')
+    assert etag_matches("*", '"abc"')
+    assert not etag_matches('"abd"', '"abc"')
+    assert not etag_matches(None, '"abc"')
+
+
+def test_confine_rejects_paths_outside_the_directory(tmp_path):
+    assert confine(tmp_path, "tts_abc.wav") == (tmp_path / "tts_abc.wav").resolve()
+    for name in ["../secret.wav", "..", "a/b.wav", "tts_abc", ".hidden.wav"]:
+        assert confine(tmp_path, name) is None
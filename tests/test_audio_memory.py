@@ -0,0 +1,54 @@
+from src.ai.audio_memory import AudioBufferPool
+from src.ai.audio_store import AudioStore
+
+
+def test_buffers_are_served_without_copying():
+    pool = AudioBufferPool(max_bytes=100)
+    audio = b"RIFF" + b"x" * 20
+    filename = pool.put("abc", audio, ".wav")
+    assert filename == "tts_abc.wav"
+    view = pool.buffer(filename)
+    assert isinstance(view, memoryview)
+    assert view.obj is audio
+    assert pool.get("abc") == filename
+    assert pool.buffer("tts_abc.mp3") is None
+
+
+def test_least_recently_used_buffers_are_dropped_without_spill():
+    pool = AudioBufferPool(max_bytes=25)
+    pool.put("a", b"x" * 10, ".wav")
+    pool.put("b", b"x" * 10, ".wav")
+    pool.get("a")
+    pool.put("c", b"x" * 10, ".wav")
+    assert pool.get("b") is None
+    assert pool.total_bytes == 20
+    assert pool.stats()["dropped"] == 1
+
+
+def test_evicted_buffers_spill_to_disk(tmp_path):
+    store = AudioStore(str(tmp_path))
+    pool = AudioBufferPool(max_bytes=15, spill=store)
+    first = pool.put("a", b"a" * 10, ".wav")
+    pool.put("b", b"b" * 10, ".wav")
+    assert pool.buffer(first) is None
+    assert pool.get("a") == first == "speech_a.wav"
+    assert store.path_for(first).read_bytes() == b"a" * 10
+    assert pool.stats()["spilled"] == 1
+
+
+def test_large_audio_is_not_admitted():
+    pool = AudioBufferPool(max_bytes=100, max_item_bytes=10)
+    assert pool.admits(10)
+    assert not pool.admits(11)
+
+
+def test_write_through_puts_every_buffer_on_disk(tmp_path):
+    store = AudioStore(str(tmp_path))
+    pool = AudioBufferPool(max_bytes=15, spill=store, write_through=True)
+    first = pool.put("a", b"a" * 10, ".wav")
+    assert pool.buffer(first) is not None
+    assert store.path_for(first).read_bytes() == b"a" * 10
+    pool.put("b", b"b" * 10, ".wav")
+    assert pool.buffer(first) is None
+    assert pool.get("a") == first
+    assert pool.stats()["spilled"] == 0
@@ -0,0 +1,112 @@
+import asyncio
+import threading
+import time
+from src.ai.audio_store import JOURNAL_NAME, AudioJanitor, AudioStore
+
+
+def test_quota_evicts_least_recently_used(tmp_path):
+    store = AudioStore(str(tmp_path), max_bytes=25)
+    first = store.put_bytes("a", b"x" * 10, ".wav")
+    store.put_bytes("b", b"x" * 10, ".wav")
+    assert store.path_for(first) is not None
+    store.put_bytes("c", b"x" * 10, ".wav")
+    assert store.lookup("b") is None
+    assert not (tmp_path / "speech_b.wav").exists()
+    stats = store.stats()
+    assert stats["bytes"] == 20
+    assert stats["evicted_files"] == 1
+    assert stats["evicted_bytes"] == 10
+
+
+def test_sweep_removes_expired_files(tmp_path):
+    store = AudioStore(str(tmp_path), max_age=60)
+    filename = store.put_bytes("old", b"x" * 10, ".wav")
+    store.put_bytes("new", b"x" * 10, ".wav")
+    store._index["old"] = (filename, 10, time.time() - 120, time.time())
+    assert store.sweep() == 1
+    assert not (tmp_path / filename).exists()
+    assert store.stats()["expired_files"] == 1
+    assert store.lookup("new") is not None
+
+
+def test_lookups_do_not_wait_for_a_sweep_to_delete_files(tmp_path):
+    store = AudioStore(str(tmp_path), max_age=60)
+    filename = store.put_bytes("old", b"x" * 10, ".wav")
+    store.put_bytes("new", b"x" * 10, ".wav")
+    store._index["old"] = (filename, 10, time.time() - 120, time.time())
+    unlinking = threading.Event()
+    release = threading.Event()
+    unlink = store._unlink
+
+    def slow_unlink(name):
+        unlinking.set()
+        release.wait(5)
+        unlink(name)
+
+    store._unlink = slow_unlink
+    sweep = threading.Thread(target=store.sweep)
+    sweep.start()
+    try:
+        assert unlinking.wait(5)
+        started = time.perf_counter()
+        assert store.lookup("new") is not None
+        assert store.lookup("old") is None
+        assert time.perf_counter() - started < 1
+    finally:
+        release.set()
+        sweep.join(5)
+    assert not (tmp_path / filename).exists()
+
+
+def test_index_is_rebuilt_from_the_journal_without_listing(tmp_path, monkeypatch):
+    store = AudioStore(str(tmp_path))
+    store.put_bytes("a", b"x" * 10, ".wav")
+    store.put_bytes("b", b"x" * 5, ".wav")
+    store.sweep()
+    store.put_bytes("c", b"x" * 3, ".wav")
+    store._remove("b")
+    store.close()
+    (tmp_path / "untracked.wav").write_bytes(b"y")
+
+    def no_listing(*args, **kwargs):
+        raise AssertionError("directory was listed")
+
+    monkeypatch.setattr("os.scandir", no_listing)
+    monkeypatch.setattr("os.listdir", no_listing)
+    reopened = AudioStore(str(tmp_path))
+    assert len(reopened) == 2
+    assert reopened.total_bytes == 13
+    assert reopened.lookup("a") == "speech_a.wav"
+
+
+def test_journal_is_compacted(tmp_path):
+    store = AudioStore(str(tmp_path), max_bytes=10)
+    for i in range(2000):
+        store.put_bytes(f"k{i}", b"x" * 10, ".wav")
+    store.sweep()
+    lines = (tmp_path / JOURNAL_NAME).read_text().splitlines()
+    assert len(lines) == 1
+
+
+def test_existing_files_are_adopted_once(tmp_path):
+    (tmp_path / "speech_legacy.wav").write_bytes(b"x" * 4)
+    store = AudioStore(str(tmp_path))
+    assert store.lookup("legacy") == "speech_legacy.wav"
+    assert (tmp_path / JOURNAL_NAME).exists()
+
+
+def test_janitor_sweeps_in_the_background(tmp_path):
+    store = AudioStore(str(tmp_path), max_age=60)
+    filename = store.put_bytes("old", b"x", ".wav")
+    store._index["old"] = (filename, 1, time.time() - 120, time.time())
+    janitor = AudioJanitor([store], interval=0.01)
+
+    async def run():
+        janitor.start()
+        while store.stats()["sweeps"] == 0:
+            await asyncio.sleep(0.01)
+        await janitor.stop()
+
+    asyncio.run(run())
+    assert len(store) == 0
+    assert janitor.stats()[str(tmp_path)]["evicted_files"] == 1
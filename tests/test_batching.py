@@ -0,0 +1,77 @@
+import asyncio
+import threading
+import pytest
+from src.ai.batching import MicroBatcher
+
+
+def test_concurrent_requests_share_a_batch():
+    calls = []
+
+    def batch_fn(items):
+        calls.append(list(items))
+        return [item * 2 for item in items]
+
+    async def run():
+        batcher = MicroBatcher(batch_fn, max_batch_size=4, max_wait_ms=50)
+        results = await asyncio.gather(*(batcher.submit(i) for i in range(6)))
+        stats = batcher.stats()
+        await batcher.close()
+        return results, stats
+
+    results, stats = asyncio.run(run())
+    assert results == [0, 2, 4, 6, 8, 10]
+    assert [len(batch) for batch in calls] == [4, 2]
+    assert stats["batches"] == 2
+    assert stats["items"] == 6
+    assert stats["batch_size_histogram"] == {2: 1, 4: 1}
+
+
+def test_batch_errors_reach_every_caller():
+    def batch_fn(items):
+        raise RuntimeError("model failed")
+
+    async def run():
+        batcher = MicroBatcher(batch_fn, max_batch_size=2, max_wait_ms=10)
+        outcomes = await asyncio.gather(batcher.submit(1), batcher.submit(2), return_exceptions=True)
+        await batcher.close()
+        return outcomes
+
+    outcomes = asyncio.run(run())
+    assert all(isinstance(outcome, RuntimeError) for outcome in outcomes)
+
+
+def test_lone_request_waits_at_most_the_window():
+    async def run():
+        batcher = MicroBatcher(lambda items: items, max_batch_size=8, max_wait_ms=20)
+        result = await asyncio.wait_for(batcher.submit("solo"), timeout=1)
+        wait = batcher.stats()["queue_wait_ms"]["max"]
+        await batcher.close()
+        return result, wait
+
+    result, wait = asyncio.run(run())
+    assert result == "solo"
+    assert wait == pytest.approx(20, abs=30)
+
+
+def test_worker_threads_share_batches():
+    calls = []
+
+    def batch_fn(items):
+        calls.append(list(items))
+        return [item * 2 for item in items]
+
+    batcher = MicroBatcher(batch_fn, max_batch_size=4, max_wait_ms=200)
+    results = {}
+    threads = [
+        threading.Thread(target=lambda i=i: results.setdefault(i, batcher.submit_threadsafe(i, timeout=5)))
+        for i in range(3)
+    ]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    stats = batcher.stats()
+    batcher.shutdown()
+    assert results == {0: 0, 1: 2, 2: 4}
+    assert [sorted(batch) for batch in calls] == [[0, 1, 2]]
+    assert stats["batch_size_histogram"] == {3: 1}
@@ -0,0 +1,26 @@
+import pytest
+from src.ai.inference import InferenceOptions
+
+
+def test_int8_computes_in_float32():
+    assert InferenceOptions("int8").compute_dtype == "float32"
+    assert InferenceOptions("bfloat16").compute_dtype == "bfloat16"
+
+
+def test_unknown_mode_is_rejected():
+    with pytest.raises(ValueError):
+        InferenceOptions("int4")
+
+
+def test_options_from_environment(monkeypatch):
+    monkeypatch.setenv("DIA_INFERENCE_MODE", "bfloat16")
+    monkeypatch.setenv("DIA_NUM_THREADS", "4")
+    monkeypatch.setenv("DIA_INTEROP_THREADS", "1")
+    monkeypatch.setenv("DIA_TORCH_COMPILE", "true")
+    options = InferenceOptions.from_env()
+    assert options.mode == "bfloat16"
+    assert options.num_threads == 4
+    assert options.interop_threads == 1
+    assert options.use_torch_compile is True
+    # An explicit mode wins over the environment
+    assert InferenceOptions.from_env(mode="int8").mode == "int8"
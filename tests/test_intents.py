@@ -0,0 +1,69 @@
+import json
+import pytest
+from src.ai.intents import Intent, IntentMatcher, tokenize
+
+
+@pytest.fixture
+def matcher():
+    return IntentMatcher.from_file()
+
+
+@pytest.mark.parametrize("text, intent", [
+    ("Hello!", "greeting"),
+    ("hi there", "greeting"),
+    ("Who are you?", "identity"),
+    ("What's your name", "identity"),
+    ("Goodbye", "goodbye"),
+    ("ok, see you later", "goodbye"),
+    ("Thanks a lot", "thanks"),
+    ("thank you so much", "thanks"),
+])
+def test_classifies_bundled_intents(matcher, text, intent):
+    assert matcher.classify(text) == intent
+
+
+@pytest.mark.parametrize("text", [
+    "Is this working?",
+    "Which one should I pick?",
+    "They said nothing",
+    "Could you show me the way",
+])
+def test_keywords_match_whole_words_only(matcher, text):
+    assert matcher.classify(text) is None
+
+
+def test_phrases_need_every_word_in_order(matcher):
+    assert matcher.classify("you see") is None
+    assert matcher.classify("I'll see you tomorrow") == "goodbye"
+
+
+def test_highest_priority_wins_regardless_of_position(matcher):
+    assert matcher.classify("Thanks, bye! Oh and hello") == "greeting"
+    assert matcher.classify("thanks and goodbye") == "goodbye"
+
+
+def test_ties_go_to_the_first_intent():
+    matcher = IntentMatcher([
+        Intent("first", 1, ("alpha",)),
+        Intent("second", 1, ("beta",)),
+    ])
+    assert matcher.classify("beta alpha") == "first"
+
+
+def test_batch_matches_single_classification(matcher):
+    texts = ["hello", "this is fine", "Hello", "who are you", "bye"] * 3
+    assert matcher.classify_batch(texts) == [matcher.classify(t) for t in texts]
+
+
+def test_loads_custom_file(tmp_path):
+    path = tmp_path / "intents.json"
+    path.write_text(json.dumps({"intents": [
+        {"name": "weather", "priority": 5, "keywords": ["weather", "forecast"]}
+    ]}))
+    matcher = IntentMatcher.from_file(str(path))
+    assert matcher.classify("What's the forecast?") == "weather"
+    assert matcher.classify("hello") is None
+
+
+def test_tokenize_keeps_contractions():
+    assert tokenize("What's UP, you're?") == ["what's", "up", "you're"]
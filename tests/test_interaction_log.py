@@ -0,0 +1,146 @@
+import asyncio
+import json
+import os
+
+from src.interaction_log import InteractionLog, InteractionMetrics
+
+
+def _lines(directory):
+    return [
+        json.loads(line)
+        for path in sorted(directory.glob("interactions-*.ndjson"))
+        for line in path.read_text().splitlines()
+    ]
+
+
+def test_events_are_written_by_interval_not_on_record(tmp_path):
+    async def scenario():
+        log = InteractionLog(str(tmp_path), flush_interval=0.05)
+        log.start()
+        log.record(id="m1", sentiment="positive")
+        assert _lines(tmp_path) == []
+        await asyncio.sleep(0.2)
+        written = _lines(tmp_path)
+        await log.stop()
+        return written
+
+    written = asyncio.run(scenario())
+    assert [event["id"] for event in written] == ["m1"]
+    assert "ts" in written[0]
+
+
+def test_full_batches_flush_early_and_segments_rotate(tmp_path):
+    async def scenario():
+        log = InteractionLog(str(tmp_path), flush_bytes=200, flush_interval=60, segment_bytes=1000)
+        log.start()
+        for number in range(40):
+            log.record(id=f"m{number}", input="text")
+            await asyncio.sleep(0)
+        await asyncio.sleep(0.1)
+        flushed = log.written
+        await log.stop()
+        return log, flushed
+
+    log, flushed = asyncio.run(scenario())
+    assert flushed > 0
+    assert log.written == 40
+    assert log.segments > 1
+    assert [event["id"] for event in _lines(tmp_path)] == [f"m{number}" for number in range(40)]
+
+
+def test_events_beyond_max_pending_are_dropped(tmp_path):
+    log = InteractionLog(str(tmp_path), max_pending=3)
+    for number in range(5):
+        log.record(id=number)
+    assert log.stats()["pending"] == 3
+    assert log.dropped == 2
+
+
+def test_metrics_read_only_new_complete_lines(tmp_path):
+    segment = tmp_path / "interactions-1-1.ndjson"
+    events = [
+        {"ts": 120.0, "session_id": "a", "sentiment": "positive", "sentiment_score": 0.5, "response_ms": 10},
+        {"ts": 130.0, "session_id": "b", "sentiment": "negative", "sentiment_score": -0.3, "response_ms": 30},
+        {"ts": 200.0, "session_id": "a", "input": "voice", "sentiment": "neutral", "response_ms": 20},
+    ]
+    segment.write_text("".join(json.dumps(event) + "\n" for event in events[:2]) + '{"ts": 2')
+    metrics = InteractionMetrics(str(tmp_path), bucket_seconds=60)
+
+    assert metrics.update() == 2
+    assert metrics.update() == 0
+    read = metrics.bytes_read
+    # The partial line is completed, and a second worker's segment appears
+    with open(segment, "a") as f:
+        f.write('10.0, "session_id": "c"}\nnot json\n')
+    (tmp_path / "interactions-2-2.ndjson").write_text(json.dumps(events[2]) + "\n")
+    assert metrics.update() == 2
+    assert metrics.malformed == 1
+    assert metrics.bytes_read > read
+
+    snapshot = metrics.snapshot()
+    assert snapshot["totals"]["messages"] == 4
+    assert snapshot["totals"]["sessions"] == 3
+    assert snapshot["totals"]["sentiment"] == {"positive": 1, "neutral": 1, "negative": 1}
+    assert snapshot["totals"]["input"] == {"text": 3, "voice": 1}
+    series = snapshot["series"]
+    assert series["time"] == [120, 180]
+    assert series["messages"] == [2, 2]
+    assert series["mean_sentiment"] == [0.1, None]
+    assert series["mean_response_ms"] == [20.0, 20.0]
+
+
+def test_distinct_sessions_age_out_with_their_buckets(tmp_path):
+    (tmp_path / "interactions-1-1.ndjson").write_text("".join(
+        json.dumps({"ts": ts, "session_id": session}) + "\n"
+        for ts, session in [(0.0, "a"), (10.0, "b"), (70.0, "b"), (130.0, "c")]
+    ))
+    metrics = InteractionMetrics(str(tmp_path), bucket_seconds=60, max_buckets=2)
+    metrics.update()
+    snapshot = metrics.snapshot()
+    assert snapshot["totals"]["messages"] == 4
+    assert snapshot["totals"]["sessions"] == 2
+    assert snapshot["series"]["sessions"] == [1, 1]
+
+
+def test_closed_segments_are_pruned_and_not_read_again(tmp_path):
+    line = json.dumps({"ts": 1.0, "session_id": "a"}) + "\n"
+    for name in ("interactions-1-7.ndjson", "interactions-2-7.ndjson", "interactions-3-7.ndjson",
+                 "interactions-1-8.ndjson"):
+        (tmp_path / name).write_text(line * 10)
+    metrics = InteractionMetrics(str(tmp_path))
+    assert metrics.update() == 40
+    # Every segment but the newest of each process is closed
+    assert metrics.stats()["finished_segments"] == 2
+    with open(tmp_path / "interactions-1-7.ndjson", "a") as f:
+        f.write(line)
+    assert metrics.update() == 0
+
+    log = InteractionLog(str(tmp_path), max_age=0, max_bytes=len(line) * 30)
+    assert log.prune() == 1
+    assert not (tmp_path / "interactions-1-7.ndjson").exists()
+    old = tmp_path / "interactions-2-7.ndjson"
+    os.utime(old, (1.0, 1.0))
+    log = InteractionLog(str(tmp_path), max_age=3600, max_bytes=0)
+    assert log.prune() == 1
+    assert not old.exists()
+    # Segments still being written are never deleted
+    assert sorted(path.name for path in tmp_path.iterdir()) == [
+        "interactions-1-8.ndjson", "interactions-3-7.ndjson"
+    ]
+    assert metrics.update() == 0
+    assert metrics.stats()["segments"] == 2
+
+
+def test_events_older_than_the_series_only_count_in_the_totals(tmp_path):
+    (tmp_path / "interactions-1-1.ndjson").write_text("".join(
+        json.dumps({"ts": ts, "session_id": "a", "sentiment": "positive"}) + "\n"
+        for ts in (120.0, 180.0, 10.0)
+    ))
+    metrics = InteractionMetrics(str(tmp_path), bucket_seconds=60, max_buckets=2)
+    assert metrics.update() == 3
+    snapshot = metrics.snapshot()
+    assert snapshot["series"]["time"] == [120, 180]
+    assert snapshot["series"]["messages"] == [1, 1]
+    assert snapshot["totals"]["messages"] == 3
+    assert snapshot["totals"]["sentiment"]["positive"] == 3
+    assert metrics.stats()["late"] == 1
@@ -0,0 +1,81 @@
+import io
+import json
+import logging
+import queue
+from src.logging_setup import (
+    PAYLOAD, ContextQueueHandler, JsonFormatter, SamplingFilter, bind, configure_logging,
+    parse_rules, request_id_var, session_id_var, shutdown_logging
+)
+
+
+def _record(name="src.main", level=logging.INFO, message="hello", **extra):
+    record = logging.makeLogRecord({"name": name, "levelno": level, "levelname": logging.getLevelName(level),
+                                    "msg": message})
+    record.__dict__.update(extra)
+    return record
+
+
+def test_parse_rules():
+    assert parse_rules("src.main=0.1, src.ai=5,broken,=3") == {"src.main": 0.1, "src.ai": 5.0}
+    assert parse_rules(None) == {}
+
+
+def test_json_records_carry_ids_and_fields():
+    record = _record(session_id="s1", request_id="r1", fields={"duration_ms": 1.5})
+    entry = json.loads(JsonFormatter().format(record))
+    assert entry["message"] == "hello"
+    assert entry["session_id"] == "s1"
+    assert entry["request_id"] == "r1"
+    assert entry["duration_ms"] == 1.5
+
+
+def test_payload_records_can_be_dropped():
+    sampling = SamplingFilter(log_payloads=False)
+    assert not sampling.filter(_record(**PAYLOAD))
+    assert sampling.filter(_record())
+    assert sampling.payloads_dropped == 1
+
+
+def test_sampling_keeps_whole_requests_and_all_warnings():
+    sampling = SamplingFilter(sample_rates={"src": 0.5})
+    for request_id in (f"request-{i}" for i in range(50)):
+        decisions = {sampling.filter(_record(request_id=request_id)) for _ in range(5)}
+        assert len(decisions) == 1
+    assert 0 < sampling.sampled_out < 250
+    assert all(SamplingFilter(sample_rates={"src": 0.0}).filter(_record(level=logging.WARNING))
+               for _ in range(10))
+    # Other loggers are not affected
+    assert all(sampling.filter(_record(name="uvicorn")) for _ in range(10))
+
+
+def test_rate_limit_per_logger_prefix():
+    sampling = SamplingFilter(rate_limits={"src.ai": 5})
+    kept = sum(sampling.filter(_record(name="src.ai.tts_pool")) for _ in range(20))
+    assert kept == 5
+    assert sampling.rate_limited == 15
+
+
+def test_queue_handler_never_blocks():
+    handler = ContextQueueHandler(queue.Queue(maxsize=1))
+    handler.handle(_record())
+    handler.handle(_record())
+    assert handler.dropped == 1
+
+
+def test_records_are_written_by_the_background_thread():
+    stream = io.StringIO()
+    runtime = configure_logging(level="DEBUG", stream=stream, log_payloads=False)
+    try:
+        bind(session_id="session-1", request_id="request-1")
+        logger = logging.getLogger("src.test_logging")
+        logger.info("Message handled", extra={"fields": {"busy": False}})
+        logger.debug("user said something private", extra=PAYLOAD)
+    finally:
+        session_id_var.set(None)
+        request_id_var.set(None)
+        shutdown_logging()
+    lines = [json.loads(line) for line in stream.getvalue().splitlines()]
+    assert [line["message"] for line in lines] == ["Message handled"]
+    assert lines[0]["request_id"] == "request-1"
+    assert lines[0]["busy"] is False
+    assert runtime.stats()["payloads_dropped"] == 1
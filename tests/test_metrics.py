@@ -0,0 +1,41 @@
+import pytest
+from src.metrics import MetricsRegistry
+
+
+def test_histogram_renders_cumulative_buckets():
+    registry = MetricsRegistry()
+    latency = registry.histogram("stage_seconds", "Stage latency", ["stage"], buckets=(0.1, 1.0))
+    latency.observe(0.05, stage="parse")
+    latency.observe(0.5, stage="parse")
+    latency.observe(5.0, stage="parse")
+    text = registry.render()
+    assert "# TYPE stage_seconds histogram" in text
+    assert 'stage_seconds_bucket{stage="parse",le="0.1"} 1' in text
+    assert 'stage_seconds_bucket{stage="parse",le="1"} 2' in text
+    assert 'stage_seconds_bucket{stage="parse",le="+Inf"} 3' in text
+    assert 'stage_seconds_sum{stage="parse"} 5.55' in text
+    assert 'stage_seconds_count{stage="parse"} 3' in text
+
+
+def test_counter_and_gauges():
+    registry = MetricsRegistry()
+    errors = registry.counter("errors_total", "Errors", ["type"])
+    errors.inc(type="busy")
+    errors.inc(type="busy")
+    registry.gauge("depth", "Queue depth", lambda: 3)
+    registry.gauge("ratio", "Hit ratio", lambda: None)
+    text = registry.render()
+    assert 'errors_total{type="busy"} 2' in text
+    assert "\ndepth 3\n" in text
+    # Gauges without a source are declared but have no sample
+    assert "# TYPE ratio gauge" in text
+    assert "\nratio " not in text
+
+
+def test_labels_are_checked():
+    registry = MetricsRegistry()
+    errors = registry.counter("errors_total", "Errors", ["type"])
+    with pytest.raises(ValueError):
+        errors.inc(kind="busy")
+    with pytest.raises(ValueError):
+        registry.counter("errors_total", "Errors again")
@@ -0,0 +1,75 @@
+import multiprocessing
+import os
+import threading
+
+import numpy as np
+import pytest
+
+from src.ai.inference import InferenceOptions
+from src.ai.model_manager import ModelManager, get_model_manager, mapped_file_memory, resident_memory
+
+
+class CountingManager(ModelManager):
+    def __init__(self):
+        super().__init__()
+        self.loads = 0
+
+    def _load_weights(self):
+        self.loads += 1
+        return object()
+
+
+def test_weights_load_once_across_threads():
+    manager = CountingManager()
+    models = []
+    threads = [threading.Thread(target=lambda: models.append(manager.get_model())) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert manager.loads == 1
+    assert all(model is models[0] for model in models)
+
+
+def test_stats_report_load_time_and_memory():
+    manager = CountingManager()
+    assert manager.stats()["loaded"] is False
+    manager.get_model()
+    stats = manager.stats()
+    assert stats["loaded"] is True
+    assert stats["load_seconds"] >= 0
+    assert stats["rss_bytes"] > 0
+    assert stats["load_rss_delta_bytes"] is not None
+
+
+def test_managers_are_shared_per_configuration():
+    float32 = InferenceOptions("float32")
+    assert get_model_manager(float32) is get_model_manager(InferenceOptions("float32"))
+    assert get_model_manager(float32) is not get_model_manager(InferenceOptions("int8"))
+    assert resident_memory() > 0
+
+
+def _map_and_report(path, queue):
+    weights = np.load(path, mmap_mode="r")
+    weights.sum()
+    queue.put(mapped_file_memory(path))
+
+
+@pytest.mark.skipif(not os.path.exists("/proc/self/smaps"), reason="needs /proc/self/smaps")
+def test_spawned_processes_share_mapped_weights_through_the_page_cache(tmp_path):
+    path = str(tmp_path / "weights.npy")
+    np.save(path, np.ones(4 * 2 ** 20 // 8))
+    weights = np.load(path, mmap_mode="r")
+    weights.sum()
+    mine = mapped_file_memory(path)
+    assert mine["rss_bytes"] > 0
+
+    # Spawned, like the serve workers: nothing is inherited from this process
+    context = multiprocessing.get_context("spawn")
+    queue = context.Queue()
+    process = context.Process(target=_map_and_report, args=(path, queue))
+    process.start()
+    theirs = queue.get(timeout=30)
+    process.join()
+    assert theirs["shared_bytes"] >= 3 * 2 ** 20
+    assert theirs["private_bytes"] < 2 ** 20
@@ -0,0 +1,107 @@
+import os
+
+import numpy as np
+import pytest
+
+from src.ai.dia_model import DiaAgent
+from src.ai.retrieval import KnowledgeBase, RetrievalIndex, split_passages
+
+DOCUMENTS = {
+    "returns.md": (
+        "# Returns\n\n"
+        "Items can be returned within 30 days of delivery for a full refund. "
+        "Refunds go back to the original payment method.\n\n"
+        "Opened software cannot be returned unless it is faulty."
+    ),
+    "shipping.txt": (
+        "Standard shipping takes three to five business days.\n\n"
+        "Express shipping arrives the next business day when ordered before noon."
+    ),
+    "notes/hours.rst": "The support desk is open weekdays from nine to six, closed on public holidays.",
+    "ignored.json": '{"refund": "not a document"}',
+}
+
+
+def _write(directory, documents):
+    for name, text in documents.items():
+        path = directory / name
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_text(text)
+
+
+@pytest.fixture
+def knowledge(tmp_path):
+    _write(tmp_path / "docs", DOCUMENTS)
+    knowledge = KnowledgeBase(str(tmp_path / "docs"), str(tmp_path / "index"), min_score=1.0)
+    knowledge.refresh()
+    return knowledge
+
+
+def test_split_passages_packs_sentences():
+    text = "One two three. Four five six. Seven eight.\n\nNine ten."
+    assert split_passages(text, max_words=6) == ["One two three. Four five six.", "Seven eight.", "Nine ten."]
+    assert split_passages(" ".join(["word"] * 25), max_words=10) == [
+        " ".join(["word"] * 10), " ".join(["word"] * 10), " ".join(["word"] * 5)
+    ]
+
+
+def test_search_ranks_the_matching_passage_first(knowledge):
+    assert len(knowledge) == 6
+    best = knowledge.search("how long does express shipping take?")[0]
+    assert best.text.startswith("Express shipping")
+    assert best.document == "shipping.txt"
+    assert knowledge.search("when is the support desk open")[0].document == "notes/hours.rst"
+    assert knowledge.search("completely unrelated zebra") == []
+
+
+def test_index_arrays_are_memory_mapped(knowledge):
+    index = knowledge.index
+    assert isinstance(index.posting_weights, np.memmap)
+    assert (index.directory.parent / "CURRENT").read_text() == index.generation
+    # Another process pointing at the same directory maps the same generation
+    other = KnowledgeBase(str(knowledge.documents_dir), str(knowledge.index_dir))
+    assert other.refresh() is False
+    assert other.index.generation == index.generation
+
+
+def test_refresh_rebuilds_changed_documents_only(knowledge):
+    assert knowledge.refresh() is False
+    first = knowledge.index.generation
+    path = knowledge.documents_dir / "shipping.txt"
+    path.write_text("Shipping is free on orders over fifty euros.")
+    os.utime(path, ns=(1, 1))
+
+    assert knowledge.refresh() is True
+    assert knowledge.index.generation != first
+    assert knowledge.index.manifest["reused_documents"] == 2
+    assert knowledge.search("express next day before noon") == []
+    assert knowledge.search("free shipping over fifty euros")[0].text.startswith("Shipping is free")
+    # Reused passages are scored with the new corpus statistics
+    assert knowledge.search("refund original payment")[0].document == "returns.md"
+    # The previous generation is kept for processes still mapping it
+    assert {path.name for path in knowledge.index_dir.glob("gen-*")} == {first, knowledge.index.generation}
+
+
+def test_removed_documents_leave_the_index(knowledge):
+    (knowledge.documents_dir / "notes" / "hours.rst").unlink()
+    assert knowledge.refresh() is True
+    assert knowledge.search("support desk weekdays") == []
+    assert knowledge.stats()["documents"] == 2
+
+
+def test_agent_answers_general_questions_from_documents(knowledge):
+    agent = DiaAgent(retriever=knowledge)
+    assert agent.process_message("How long does express shipping take?").startswith("Express shipping")
+    # Intents still take precedence, and weak matches fall back to general replies
+    assert agent.process_message("hello") in agent.greetings
+    assert agent.process_message("tell me something about zebras") in agent.response_templates()
+    assert knowledge.stats()["answered"] == 1
+
+
+def test_empty_folder_builds_an_empty_index(tmp_path):
+    (tmp_path / "docs").mkdir()
+    knowledge = KnowledgeBase(str(tmp_path / "docs"), str(tmp_path / "index"))
+    assert knowledge.refresh() is True
+    assert len(knowledge) == 0
+    assert knowledge.answer("anything at all") is None
+    assert isinstance(knowledge.index, RetrievalIndex)
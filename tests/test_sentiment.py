@@ -0,0 +1,82 @@
+import asyncio
+import pytest
+from src.ai.dia_model import DiaAgent
+from src.ai.sentiment import SentimentAnalyzer, SentimentStage
+
+
+@pytest.fixture
+def analyzer():
+    return SentimentAnalyzer.from_file()
+
+
+@pytest.mark.parametrize("text, label", [
+    ("I love this, it works great", "positive"),
+    ("This is terrible and I'm really frustrated", "negative"),
+    ("What time does the store open?", "neutral"),
+    ("That was not good", "negative"),
+    ("Honestly not bad at all", "positive"),
+])
+def test_labels(analyzer, text, label):
+    assert analyzer.analyze(text).label == label
+
+
+def test_negation_does_not_leak_across_messages(analyzer):
+    batch = analyzer.analyze_batch(["I don't know", "good", "not", "great"])
+    assert batch[1].label == "positive"
+    assert batch[3].label == "positive"
+
+
+def test_batch_matches_individual_scores(analyzer):
+    texts = ["good day", "bad day", "a day", "", "really not happy", "good day"]
+    fresh = SentimentAnalyzer.from_file()
+    assert analyzer.analyze_batch(texts) == [fresh.analyze(text) for text in texts]
+
+
+def test_repeated_utterances_hit_the_cache(analyzer):
+    analyzer.analyze("Great job")
+    assert analyzer.cached("great   JOB") is not None
+    analyzer.analyze_batch(["great job", "great job"])
+    assert analyzer.stats()["misses"] == 1
+    assert analyzer.stats()["hits"] == 3
+
+
+def test_cache_is_bounded():
+    analyzer = SentimentAnalyzer({"good": 2.0}, cache_size=2)
+    analyzer.analyze_batch(["one", "two", "three"])
+    assert analyzer.stats()["cache_entries"] == 2
+    assert analyzer.cached("one") is None
+
+
+def test_stage_batches_concurrent_messages(analyzer):
+    stage = SentimentStage(analyzer, max_batch_size=8)
+
+    async def run():
+        try:
+            return await asyncio.gather(*(stage.analyze(f"good {i}") for i in range(8)))
+        finally:
+            await stage.close()
+
+    results = asyncio.run(run())
+    assert all(result.label == "positive" for result in results)
+    assert stage.stats()["batch_size_histogram"] == {8: 1}
+
+
+def test_stage_answers_repeats_from_the_cache(analyzer):
+    stage = SentimentStage(analyzer)
+
+    async def run():
+        first = await stage.analyze("so happy")
+        second = await stage.analyze("So happy")
+        return first, second
+
+    first, second = asyncio.run(run())
+    assert first == second
+    assert stage.stats()["batches"] == 1
+
+
+def test_sentiment_picks_the_tone_of_general_replies():
+    agent = DiaAgent()
+    empathetic = agent.process_message("my order never arrived", sentiment="negative")
+    assert empathetic.split(".")[0] + "." in agent.empathetic_acknowledgments
+    assert empathetic in agent.response_templates()
+    assert agent.process_message("hello", sentiment="negative") in agent.greetings
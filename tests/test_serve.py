@@ -0,0 +1,84 @@
+import json
+import time
+import httpx
+import pytest
+import websockets.sync.client
+from src.serve import WorkerSupervisor
+
+
+@pytest.fixture
+def serve_env(monkeypatch, tmp_path):
+    """Environment for worker processes using the synthetic speech backend."""
+    monkeypatch.setenv("TTS_BACKEND", "sine")
+    monkeypatch.setenv("AUDIO_CACHE_DIR", str(tmp_path / "audio"))
+    monkeypatch.setenv("AUDIO_DIR", str(tmp_path / "speech"))
+    monkeypatch.setenv("STATE_BACKEND", "file")
+    monkeypatch.setenv("STATE_DIR", str(tmp_path / "state"))
+    return monkeypatch
+
+
+def _serve(workers=2):
+    supervisor = WorkerSupervisor("127.0.0.1", 0, workers=workers, log_level="warning")
+    supervisor.start()
+    base_url = f"http://127.0.0.1:{supervisor.port}"
+    deadline = time.time() + 60
+    try:
+        while True:
+            try:
+                if httpx.get(f"{base_url}/health").status_code == 200:
+                    break
+            except httpx.TransportError:
+                if time.time() > deadline:
+                    raise
+                time.sleep(0.2)
+        yield base_url
+    finally:
+        supervisor.stop()
+
+
+@pytest.fixture
+def workers(serve_env):
+    """Two worker processes serving the app."""
+    yield from _serve()
+
+
+@pytest.fixture
+def memory_workers(serve_env):
+    """Two worker processes keeping rendered audio in memory."""
+    serve_env.setenv("AUDIO_MEMORY_ENABLED", "true")
+    yield from _serve()
+
+
+def _say_hello(base_url):
+    with websockets.sync.client.connect(base_url.replace("http", "ws", 1) + "/ws?client_id=alice") as ws:
+        ws.send('{"text": "hello"}')
+        ws.recv()
+        reply = ws.recv()
+    return json.loads(reply)["audio_path"]
+
+
+def _fetch_from_each_worker(base_url, audio_path):
+    """Fetch ``audio_path`` over new connections until both workers have served it."""
+    seen = set()
+    # New connections are spread across the workers by the kernel
+    for _ in range(100):
+        with httpx.Client(base_url=base_url) as client:
+            assert client.get(f"/audio/{audio_path}").status_code == 200
+            seen.add(client.get("/health").json()["worker"]["id"])
+            session = client.get("/sessions/alice").json()
+            assert session["exchanges"] == 1
+        if seen == {0, 1}:
+            break
+    return seen
+
+
+def test_workers_serve_each_others_audio(workers):
+    audio_path = _say_hello(workers)
+    assert _fetch_from_each_worker(workers, audio_path) == {0, 1}
+
+
+def test_audio_held_in_memory_is_served_by_other_workers(memory_workers):
+    audio_path = _say_hello(memory_workers)
+    assert _fetch_from_each_worker(memory_workers, audio_path) == {0, 1}
+    health = httpx.get(f"{memory_workers}/health").json()
+    assert health["audio_memory"] is not None
@@ -0,0 +1,457 @@
+import json
+import time
+import pytest
+from fastapi.testclient import TestClient
+from src import config, main
+
+
+@pytest.fixture
+def server(monkeypatch, tmp_path):
+    """Run the app with the synthetic speech backend."""
+    monkeypatch.setattr(config, "TTS_BACKEND", "sine")
+    monkeypatch.setattr(config, "STT_RECOGNIZER", "tones")
+    monkeypatch.setattr(config, "AUDIO_CACHE_DIR", str(tmp_path / "audio"))
+    monkeypatch.setattr(config, "AUDIO_DIR", str(tmp_path / "speech"))
+    monkeypatch.setattr(config, "INTERACTION_LOG_DIR", str(tmp_path / "interactions"))
+    monkeypatch.setattr(config, "INTERACTION_LOG_FLUSH_INTERVAL", 0.05)
+    with TestClient(main.app) as client:
+        yield client
+
+
+def test_health_reports_backend(server):
+    health = server.get("/health").json()
+    assert health["agent"] == "ready"
+    assert health["tts_backend"] == "sine"
+
+
+def test_message_round_trip_with_audio(server):
+    with server.websocket_connect("/ws") as websocket:
+        websocket.send_json({"id": "m1", "text": "hello", "require_audio": True})
+        response = websocket.receive_json()
+        ready = websocket.receive_json()
+    assert response["type"] == "text"
+    assert response["text"]
+    assert response["error"] is None
+    assert response["audio_pending"] is True
+    assert ready == {"type": "audio_ready", "id": "m1", "audio_path": ready["audio_path"]}
+    audio = server.get(f"/audio/{ready['audio_path']}")
+    assert audio.status_code == 200
+    assert audio.content.startswith(b"RIFF")
+
+
+def test_streamed_audio(server):
+    with server.websocket_connect("/ws") as websocket:
+        websocket.send_json({"text": "thanks", "stream_audio": True})
+        assert websocket.receive_json()["audio_stream"] is True
+        header = websocket.receive_json()
+        assert header["type"] == "audio_start"
+        assert header["codec"] == "pcm_s16le"
+        received = 0
+        while True:
+            message = websocket.receive()
+            if message.get("bytes") is not None:
+                received += len(message["bytes"])
+                continue
+            break
+    assert received > 0
+    assert '"audio_end"' in message["text"]
+
+
+def test_sessions_follow_client_id(server):
+    with server.websocket_connect("/ws?client_id=alice") as websocket:
+        websocket.send_json({"text": "hello"})
+        websocket.receive_json()
+    with server.websocket_connect("/ws?client_id=alice") as websocket:
+        websocket.send_json({"text": "thanks"})
+        websocket.receive_json()
+    session = server.get("/sessions/alice").json()
+    assert session["exchanges"] == 2
+    assert session["bytes"] > 0
+    assert server.get("/sessions/bob").status_code == 404
+
+
+def test_anonymous_sessions_end_with_the_connection(server):
+    with server.websocket_connect("/ws") as websocket:
+        websocket.send_json({"text": "hello"})
+        websocket.receive_json()
+    assert server.get("/health").json()["sessions"]["sessions"] == 0
+
+
+def test_reply_reports_sentiment(server):
+    with server.websocket_connect("/ws") as websocket:
+        websocket.send_json({"text": "this is awful and I am upset"})
+        response = websocket.receive_json()
+    assert response["sentiment"] == "negative"
+    assert server.get("/health").json()["sentiment"]["misses"] == 1
+
+
+def _audio_path(server, text="hello"):
+    with server.websocket_connect("/ws") as websocket:
+        websocket.send_json({"text": text, "require_audio": True})
+        assert websocket.receive_json()["type"] == "text"
+        return websocket.receive_json()["audio_path"]
+
+
+def test_audio_is_immutable_and_revalidates(server):
+    path = _audio_path(server)
+    first = server.get(f"/audio/{path}")
+    assert first.headers["content-type"] == "audio/wav"
+    assert "immutable" in first.headers["cache-control"]
+    etag = first.headers["etag"]
+    again = server.get(f"/audio/{path}", headers={"If-None-Match": etag})
+    assert again.status_code == 304
+    assert again.content == b""
+
+
+def test_audio_range_requests(server):
+    path = _audio_path(server)
+    full = server.get(f"/audio/{path}").content
+    partial = server.get(f"/audio/{path}", headers={"Range": "bytes=10-19"})
+    assert partial.status_code == 206
+    assert partial.content == full[10:20]
+    assert partial.headers["content-range"] == f"bytes 10-19/{len(full)}"
+    beyond = server.get(f"/audio/{path}", headers={"Range": f"bytes={len(full)}-"})
+    assert beyond.status_code == 416
+
+
+def test_health_reports_audio_store(server):
+    health = server.get("/health").json()
+    assert health["audio_store"]["files"] == 0
+    assert "evicted_files" in health["audio_cache"]
+
+
+def test_audio_rejects_traversal(server):
+    assert server.get("/audio/..%2F..%2Fetc%2Fpasswd").status_code == 404
+    assert server.get("/audio/missing.wav").status_code == 404
+
+
+def test_in_memory_audio_mode(monkeypatch, tmp_path):
+    monkeypatch.setattr(config, "TTS_BACKEND", "sine")
+    monkeypatch.setattr(config, "AUDIO_MEMORY_ENABLED", True)
+    monkeypatch.setattr(config, "AUDIO_CACHE_DIR", str(tmp_path / "audio"))
+    monkeypatch.setattr(config, "AUDIO_DIR", str(tmp_path / "speech"))
+    with TestClient(main.app) as client:
+        path = _audio_path(client, "hello there")
+        audio = client.get(f"/audio/{path}")
+        assert audio.status_code == 200
+        assert audio.headers["content-type"] == "audio/wav"
+        partial = client.get(f"/audio/{path}", headers={"Range": "bytes=0-3"})
+        assert partial.content == b"RIFF"
+        health = client.get("/health").json()
+    assert health["audio_memory"]["entries"] == 1
+    assert health["audio_cache"]["files"] == 0
+
+
+def test_metrics_expose_stage_latency(server):
+    with server.websocket_connect("/ws") as websocket:
+        websocket.send_json({"text": "hello"})
+        websocket.receive_json()
+        assert websocket.receive_json()["type"] == "audio_ready"
+        websocket.send_text("not json")
+        websocket.receive_json()
+        text = server.get("/metrics").text
+    for stage in ["json_parse", "response", "synthesis_queue_wait", "synthesis", "verify", "send"]:
+        assert f'voice_agent_stage_seconds_count{{stage="{stage}"}}' in text
+    assert f"voice_agent_active_connections {len(main.active_connections) + 1}" in text
+    assert "voice_agent_tts_queue_depth 0" in text
+    assert "voice_agent_audio_cache_hit_ratio " in text
+    assert 'voice_agent_errors_total{type="invalid_json"}' in text
+
+
+def test_pipelined_replies_arrive_in_order(server):
+    messages = ["Who are you?", "hello", "Can you tell me more about the weather today?", "thanks"]
+    with server.websocket_connect("/ws") as websocket:
+        for index, text in enumerate(messages):
+            websocket.send_json({"id": index, "text": text})
+        frames = [websocket.receive_json() for _ in range(2 * len(messages))]
+    texts = [frame for frame in frames if frame["type"] == "text"]
+    ready = [frame for frame in frames if frame["type"] == "audio_ready"]
+    assert [reply["id"] for reply in texts] == [0, 1, 2, 3]
+    assert sorted(frame["id"] for frame in ready) == [0, 1, 2, 3]
+    # Each audio_ready follows the text it belongs to
+    for frame in ready:
+        assert frames.index(frame) > frames.index(texts[frame["id"]])
+    assert all(frame["audio_path"] for frame in ready)
+
+
+def test_text_only_clients_skip_synthesis(server):
+    synthesized = main.stage_latency.count(stage="synthesis")
+    with server.websocket_connect("/ws") as websocket:
+        websocket.send_json({"id": 1, "text": "hello", "require_audio": False})
+        reply = websocket.receive_json()
+        websocket.send_json({"id": 2, "text": "thanks", "require_audio": False})
+        second = websocket.receive_json()
+    assert reply["type"] == "text" and reply["text"]
+    assert reply["audio_pending"] is False
+    assert second["id"] == 2
+    assert main.stage_latency.count(stage="synthesis") == synthesized
+    assert server.get("/health").json()["audio_cache"]["misses"] == 0
+
+
+def test_text_arrives_before_slow_audio(server):
+    main.tts_backend.seconds_per_char = 0.02
+    with server.websocket_connect("/ws") as websocket:
+        sent = time.perf_counter()
+        websocket.send_json({"id": "slow", "text": "Can you tell me more about the weather today?"})
+        reply = websocket.receive_json()
+        text_latency = time.perf_counter() - sent
+        ready = websocket.receive_json()
+        audio_latency = time.perf_counter() - sent
+    assert reply["type"] == "text" and reply["audio_pending"] is True
+    assert ready["type"] == "audio_ready" and ready["id"] == "slow"
+    assert text_latency < audio_latency
+
+
+def test_cancel_aborts_synthesis_in_flight(monkeypatch, tmp_path):
+    monkeypatch.setattr(config, "TTS_BACKEND", "sine")
+    monkeypatch.setattr(config, "TTS_WORKERS", 1)
+    monkeypatch.setattr(config, "SINE_SECONDS_PER_CHAR", 0.05)
+    monkeypatch.setattr(config, "AUDIO_STREAM_CHUNK_SIZE", 2560)
+    monkeypatch.setattr(config, "AUDIO_CACHE_DIR", str(tmp_path / "audio"))
+    monkeypatch.setattr(config, "AUDIO_DIR", str(tmp_path / "speech"))
+    with TestClient(main.app) as client:
+        with client.websocket_connect("/ws") as websocket:
+            websocket.send_json({"id": "long", "text": "tell me a long story about the sea", "stream_audio": True})
+            websocket.send_json({"id": "queued", "text": "hello"})
+            assert websocket.receive_json()["id"] == "long"
+            websocket.send_json({"type": "cancel"})
+            cancelled = time.perf_counter()
+            frames = []
+            while True:
+                message = websocket.receive()
+                if message.get("text") is None:
+                    continue
+                frames.append(json.loads(message["text"]))
+                if frames[-1].get("id") == "queued":
+                    break
+            # The worker stops at the next chunk instead of rendering the whole reply
+            while main.tts_pool.busy and time.perf_counter() - cancelled < 5:
+                time.sleep(0.01)
+            freed = time.perf_counter() - cancelled
+        health = client.get("/health").json()
+    assert {"type": "cancelled", "id": "long"} in frames
+    assert frames[-1] == {"type": "cancelled", "id": "queued"}
+    assert not any(frame.get("type") == "audio_end" for frame in frames)
+    assert freed < 1.0
+    assert health["tts_pool"]["cancelled"] >= 1
+
+
+def test_flooded_connection_keeps_synthesis_bounded(monkeypatch, tmp_path):
+    monkeypatch.setattr(config, "TTS_BACKEND", "sine")
+    monkeypatch.setattr(config, "TTS_WORKERS", 1)
+    monkeypatch.setattr(config, "WS_MAX_PENDING", 2)
+    monkeypatch.setattr(config, "SINE_SECONDS_PER_CHAR", 0.002)
+    monkeypatch.setattr(config, "AUDIO_CACHE_DIR", str(tmp_path / "audio"))
+    monkeypatch.setattr(config, "AUDIO_DIR", str(tmp_path / "speech"))
+    in_flight = []
+    queued = []
+    with TestClient(main.app) as client:
+        pool = main.tts_pool
+        synthesize = pool.synthesize
+
+        async def sampled(text):
+            in_flight.append(in_flight[-1] + 1 if in_flight else 1)
+            queued.append(pool.pending)
+            try:
+                return await synthesize(text)
+            finally:
+                in_flight.append(in_flight[-1] - 1)
+
+        monkeypatch.setattr(pool, "synthesize", sampled)
+        with client.websocket_connect("/ws") as websocket:
+            for number in range(12):
+                websocket.send_json({"id": number, "text": f"tell me about number {number}"})
+            ready = set()
+            while len(ready) < 12:
+                frame = websocket.receive_json()
+                if frame["type"] == "audio_ready":
+                    ready.add(frame["id"])
+    assert max(in_flight) == config.WS_MAX_PENDING
+    assert max(queued) < config.WS_MAX_PENDING
+
+
+def test_speech_input_is_disabled_without_recognizer_packages(monkeypatch, tmp_path):
+    from src.ai.speech_input import SphinxRecognizer
+
+    monkeypatch.setattr(SphinxRecognizer, "requires", ("no_such_recognizer_module",))
+    monkeypatch.setattr(config, "TTS_BACKEND", "sine")
+    monkeypatch.setattr(config, "STT_RECOGNIZER", "sphinx")
+    monkeypatch.setattr(config, "AUDIO_CACHE_DIR", str(tmp_path / "audio"))
+    monkeypatch.setattr(config, "AUDIO_DIR", str(tmp_path / "speech"))
+    with TestClient(main.app) as client:
+        assert client.get("/health").json()["agent"] == "ready"
+        with client.websocket_connect("/ws") as websocket:
+            websocket.send_json({"type": "listen"})
+            reply = websocket.receive_json()
+    assert main.stt_pool is None
+    assert reply["type"] == "transcript_error"
+
+
+def _speech(text, sample_rate=16000):
+    """PCM for ``text`` as the sine backend renders it, with silence around it."""
+    from src.ai.tts_backends import SineBackend
+
+    silence = bytes(2 * sample_rate // 2)
+    return silence + b"".join(SineBackend(sample_rate=sample_rate)._render(text)) + silence
+
+
+def test_speech_input_is_transcribed_and_answered(server):
+    audio = _speech("hello there") + _speech("thanks")
+    with server.websocket_connect("/ws") as websocket:
+        websocket.send_json({"type": "listen", "sample_rate": 16000, "require_audio": False})
+        for start in range(0, len(audio), 3200):
+            websocket.send_bytes(audio[start:start + 3200])
+        frames = []
+        while len([frame for frame in frames if frame["type"] == "text"]) < 2:
+            frames.append(websocket.receive_json())
+    transcripts = [frame for frame in frames if frame["type"] == "transcript"]
+    assert [frame["text"] for frame in transcripts] == ["hello there", "thanks"]
+    assert [frame["id"] for frame in transcripts] == ["utterance-1", "utterance-2"]
+    replies = [frame for frame in frames if frame["type"] == "text"]
+    assert [frame["id"] for frame in replies] == ["utterance-1", "utterance-2"]
+    assert replies[0]["audio_pending"] is False
+    text = server.get("/metrics").text
+    assert 'voice_agent_stage_seconds_count{stage="end_of_speech_to_reply"}' in text
+    assert 'voice_agent_stage_seconds_count{stage="transcription"}' in text
+
+
+def test_speech_input_sends_partials_and_flushes_on_listen_end(server, monkeypatch):
+    monkeypatch.setattr(config, "STT_PARTIAL_INTERVAL_MS", 200)
+    # No trailing silence: only listen_end ends the utterance
+    audio = bytes(3200) + _speech("can we talk more about the weather")[:-16000]
+    with server.websocket_connect("/ws") as websocket:
+        websocket.send_json({"type": "listen", "require_audio": False})
+        for start in range(0, len(audio), 3200):
+            websocket.send_bytes(audio[start:start + 3200])
+            # Paced like a live microphone, so partials get a worker
+            time.sleep(0.005)
+        websocket.send_json({"type": "listen_end"})
+        frames = []
+        while not frames or frames[-1]["type"] != "text":
+            frames.append(websocket.receive_json())
+    partials = [frame for frame in frames if frame["type"] == "partial"]
+    final = next(frame for frame in frames if frame["type"] == "transcript")
+    assert partials and all(frame["id"] == "utterance-1" for frame in partials)
+    assert final["text"].startswith(partials[0]["text"][:-1])
+    assert final["text"] == "can we talk more about the weather"
+    assert frames.index(final) > frames.index(partials[-1])
+
+
+def test_encoded_audio_is_served_as_ogg(monkeypatch, tmp_path):
+    monkeypatch.setattr(config, "TTS_BACKEND", "sine")
+    monkeypatch.setattr(config, "AUDIO_CODEC", "opus")
+    monkeypatch.setattr(config, "AUDIO_CACHE_DIR", str(tmp_path / "audio"))
+    monkeypatch.setattr(config, "AUDIO_DIR", str(tmp_path / "speech"))
+    with TestClient(main.app) as client:
+        path = _audio_path(client, "hello there")
+        audio = client.get(f"/audio/{path}")
+        health = client.get("/health").json()
+        text = client.get("/metrics").text
+    assert path.endswith(".ogg")
+    assert audio.headers["content-type"] == "audio/ogg"
+    assert audio.content.startswith(b"OggS")
+    assert health["audio_encoder"]["encoded"] == 1
+    assert "voice_agent_audio_bytes_per_speech_second " in text
+    assert 'voice_agent_stage_seconds_count{stage="encode"}' in text
+
+
+def _streamed_bytes(client, text):
+    with client.websocket_connect("/ws") as websocket:
+        websocket.send_json({"text": text, "stream_audio": True})
+        websocket.receive_json()
+        header = websocket.receive_json()
+        received = 0
+        while True:
+            message = websocket.receive()
+            if message.get("bytes") is None:
+                break
+            received += len(message["bytes"])
+    assert '"audio_end"' in message["text"]
+    return header["codec"], received
+
+
+def test_streamed_audio_is_encoded(monkeypatch, tmp_path):
+    monkeypatch.setattr(config, "TTS_BACKEND", "sine")
+    monkeypatch.setattr(config, "AUDIO_CACHE_DIR", str(tmp_path / "audio"))
+    monkeypatch.setattr(config, "AUDIO_DIR", str(tmp_path / "speech"))
+    text = "tell me more about the weather"
+    with TestClient(main.app) as client:
+        codec, raw = _streamed_bytes(client, text)
+    assert codec == "pcm_s16le"
+    monkeypatch.setattr(config, "AUDIO_CODEC", "opus")
+    monkeypatch.setattr(config, "AUDIO_CACHE_DIR", str(tmp_path / "opus"))
+    with TestClient(main.app) as client:
+        codec, encoded = _streamed_bytes(client, text)
+        health = client.get("/health").json()
+    assert codec == "ogg"
+    assert encoded < raw / 4
+    assert health["audio_encoder"]["encoded"] == 1
+
+
+def test_page_streams_audio_only_when_it_plays_sooner(monkeypatch, tmp_path):
+    monkeypatch.setattr(config, "TTS_BACKEND", "sine")
+    monkeypatch.setattr(config, "AUDIO_CACHE_DIR", str(tmp_path / "audio"))
+    monkeypatch.setattr(config, "AUDIO_DIR", str(tmp_path / "speech"))
+    with TestClient(main.app) as client:
+        assert "const streamAudio = true;" in client.get("/").text
+    # Encoded audio is only streamed once complete, so the page fetches files instead
+    monkeypatch.setattr(config, "AUDIO_CODEC", "opus")
+    with TestClient(main.app) as client:
+        assert "const streamAudio = false;" in client.get("/").text
+
+
+class FakeDia:
+    """Stands in for the Dia model: records the size of every generate call."""
+
+    def __init__(self):
+        self.batches = []
+
+    def generate(self, prompts, use_torch_compile=False, verbose=False):
+        import numpy as np
+
+        batch = prompts if isinstance(prompts, list) else [prompts]
+        self.batches.append(len(batch))
+        time.sleep(0.05)
+        audio = [np.zeros(4410, dtype=np.float32) for _ in batch]
+        return audio if isinstance(prompts, list) else audio[0]
+
+
+def test_concurrent_dia_requests_share_a_batch(monkeypatch, tmp_path):
+    from src.ai.model_manager import get_model_manager
+
+    model = FakeDia()
+    monkeypatch.setattr(get_model_manager(), "model", model)
+    monkeypatch.setattr(config, "TTS_BACKEND", "dia")
+    monkeypatch.setattr(config, "TTS_WORKERS", 1)
+    monkeypatch.setattr(config, "DIA_BATCH_WINDOW_MS", 300)
+    monkeypatch.setattr(config, "AUDIO_CACHE_DIR", str(tmp_path / "audio"))
+    monkeypatch.setattr(config, "AUDIO_DIR", str(tmp_path / "speech"))
+    with TestClient(main.app) as client:
+        with client.websocket_connect("/ws") as first, client.websocket_connect("/ws") as second:
+            first.send_json({"id": "a", "text": "hello there"})
+            second.send_json({"id": "b", "text": "how are you today"})
+            for websocket in (first, second):
+                assert websocket.receive_json()["type"] == "text"
+                assert websocket.receive_json()["type"] == "audio_ready"
+        health = client.get("/health").json()
+        text = client.get("/metrics").text
+    assert model.batches == [2]
+    assert health["tts_pool"]["workers"] == config.DIA_BATCH_MAX_SIZE
+    assert health["tts_batching"]["batch_size_histogram"] == {"2": 1}
+    assert "voice_agent_tts_batch_mean_size 2" in text
+
+
+def test_dashboard_aggregates_logged_interactions(server):
+    with server.websocket_connect("/ws?client_id=dash") as websocket:
+        for text in ("hello", "this is great, thank you"):
+            websocket.send_json({"text": text, "require_audio": False})
+            websocket.receive_json()
+    deadline = time.time() + 5
+    while server.get("/health").json()["interaction_log"]["written"] < 2 and time.time() < deadline:
+        time.sleep(0.05)
+    data = server.get("/dashboard/data").json()
+    assert data["totals"]["messages"] == 2
+    assert data["totals"]["sessions"] == 1
+    assert sum(data["series"]["messages"]) == 2
+    assert data["totals"]["sentiment"]["positive"] >= 1
+    assert server.get("/dashboard").status_code == 200
@@ -0,0 +1,93 @@
+import time
+import pytest
+from src.ai.sessions import Session, SessionStore
+from src.ai.state_store import FileStateStore
+
+
+def test_history_is_a_bounded_ring_buffer():
+    session = Session("s", max_exchanges=3)
+    for i in range(5):
+        session.add_exchange(f"message {i}", f"reply {i}")
+    assert len(session) == 3
+    history = session.history()
+    assert history[0] == {"role": "user", "content": "message 2"}
+    assert history[-1] == {"role": "assistant", "content": "reply 4"}
+
+
+def test_memory_usage_stays_flat_once_history_is_full():
+    session = Session("s", max_exchanges=10)
+    for i in range(10):
+        session.add_exchange(f"message {i:04d}", "Got it.")
+    full = session.memory_usage()
+    for i in range(10, 1000):
+        session.add_exchange(f"message {i:04d}", "Got it.")
+    assert session.memory_usage() == full
+
+
+def test_sessions_are_isolated():
+    store = SessionStore()
+    first = store.get_or_create("a")
+    second = store.get_or_create("b")
+    first.add_exchange("hello", "hi")
+    assert len(first) == 1
+    assert len(second) == 0
+    assert store.get_or_create("a") is first
+
+
+def test_new_sessions_get_unique_ids():
+    store = SessionStore()
+    assert store.get_or_create().session_id != store.get_or_create().session_id
+    assert len(store) == 2
+
+
+def test_idle_sessions_are_evicted():
+    store = SessionStore(idle_timeout=60)
+    store.get_or_create("old").last_active = time.time() - 120
+    store.get_or_create("fresh")
+    assert store.get("old") is None
+    assert store.get("fresh") is not None
+    assert store.stats()["evicted"] == 1
+
+
+def test_least_recently_active_session_is_evicted_at_capacity():
+    store = SessionStore(max_sessions=2)
+    store.get_or_create("a")
+    store.get_or_create("b")
+    store.get_or_create("a")
+    store.get_or_create("c")
+    assert "b" not in store
+    assert "a" in store and "c" in store
+
+
+def test_memory_accounting_per_session():
+    store = SessionStore()
+    store.get_or_create("a").add_exchange("x" * 1000, "reply")
+    store.get_or_create("b")
+    usage = store.memory_usage()
+    assert usage["a"] > usage["b"] + 1000
+    assert store.memory_usage("b") == {"b": usage["b"]}
+    assert store.memory_usage("missing") == {}
+    assert store.stats()["bytes"] == usage["a"] + usage["b"]
+
+
+def test_rejects_invalid_limits():
+    with pytest.raises(ValueError):
+        SessionStore(max_exchanges=0)
+
+
+def test_sessions_move_between_stores_through_shared_state(tmp_path):
+    shared = FileStateStore(str(tmp_path))
+    first = SessionStore(max_exchanges=2, shared=shared)
+    session = first.get_or_create("alice")
+    for i in range(3):
+        session.add_exchange(f"message {i}", "reply")
+    first.save(session)
+
+    # Another worker process sees the same history
+    second = SessionStore(max_exchanges=2, shared=FileStateStore(str(tmp_path)))
+    moved = second.get_or_create("alice")
+    assert [m["content"] for m in moved.history()] == ["message 1", "reply", "message 2", "reply"]
+    assert second.stats()["loaded"] == 1
+
+    second.remove("alice")
+    assert SessionStore(shared=shared).get("alice") is None
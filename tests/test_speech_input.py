@@ -0,0 +1,77 @@
+import numpy as np
+import pytest
+
+from src.ai.speech_input import (
+    EnergyVAD, SphinxRecognizer, ToneRecognizer, available_recognizers, create_recognizer
+)
+from src.ai.tts_backends import SineBackend
+
+
+def _tones(text, sample_rate=16000):
+    return b"".join(SineBackend(sample_rate=sample_rate)._render(text))
+
+
+def _silence(seconds, sample_rate=16000):
+    return bytes(2 * int(seconds * sample_rate))
+
+
+def _feed(vad, pcm, chunk=3200):
+    utterances = []
+    for start in range(0, len(pcm), chunk):
+        utterances.extend(vad.feed(pcm[start:start + chunk]))
+    return utterances
+
+
+def test_vad_segments_utterances_at_silence():
+    vad = EnergyVAD(hangover_ms=200)
+    pcm = _silence(0.5) + _tones("hello") + _silence(0.5) + _tones("there") + _silence(0.5)
+    utterances = _feed(vad, pcm, chunk=1000)
+    assert len(utterances) == 2
+    # 5 tones of 40 ms, plus at most the pre-roll and one partial frame
+    assert 0.2 <= len(utterances[0]) / 16000 <= 0.34
+    assert vad.stats() == {"utterances": 2, "discarded": 0}
+    assert not vad.in_speech
+
+
+def test_vad_keeps_pauses_shorter_than_the_hangover():
+    vad = EnergyVAD(hangover_ms=300)
+    utterances = _feed(vad, _tones("hi") + _silence(0.2) + _tones("there") + _silence(0.5))
+    assert len(utterances) == 1
+
+
+def test_vad_drops_short_noise_and_flushes_speech_in_progress():
+    vad = EnergyVAD(min_speech_ms=100)
+    assert _feed(vad, _silence(0.2) + _tones("a") + _silence(0.5)) == []
+    assert vad.discarded == 1
+    assert _feed(vad, _tones("hello")) == []
+    assert vad.in_speech and vad.current() is not None
+    assert len(vad.flush()) >= 5 * 640
+    assert vad.flush() is None
+
+
+def test_vad_cuts_long_utterances():
+    vad = EnergyVAD(max_utterance_s=0.5)
+    utterances = _feed(vad, _tones("a" * 40) + _silence(0.5))
+    assert len(utterances) >= 3
+    assert max(len(utterance) for utterance in utterances) <= 8000
+
+
+def test_tone_recognizer_decodes_the_sine_backend():
+    recognizer = create_recognizer("tones")
+    samples = np.frombuffer(_silence(0.1) + _tones("good morning") + _silence(0.1), dtype="<i2")
+    assert recognizer.transcribe(samples, 16000) == "good morning"
+    assert recognizer.transcribe(np.zeros(1600, dtype=np.int16), 16000) == ""
+    samples = np.frombuffer(_tones("thanks", sample_rate=8000), dtype="<i2")
+    assert ToneRecognizer().transcribe(samples, 8000) == "thanks"
+
+
+def test_unknown_recognizer():
+    assert {"sphinx", "tones"} <= set(available_recognizers())
+    with pytest.raises(ValueError, match="Unknown speech recognizer"):
+        create_recognizer("missing")
+
+
+def test_recognizers_report_missing_modules(monkeypatch):
+    assert ToneRecognizer().missing_modules() == []
+    monkeypatch.setattr(SphinxRecognizer, "requires", ("numpy", "no_such_recognizer_module"))
+    assert SphinxRecognizer().missing_modules() == ["no_such_recognizer_module"]
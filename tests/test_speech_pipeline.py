@@ -0,0 +1,43 @@
+import threading
+import numpy as np
+from src.ai.speech_pipeline import SentencePipeline, crossfade, split_sentences
+
+
+def test_split_sentences_keeps_order():
+    text = "Hello there. How are you today? I'm fine!"
+    assert split_sentences(text) == ["Hello there.", "How are you today?", "I'm fine!"]
+
+
+def test_long_sentences_split_at_clauses():
+    text = "first clause, second clause, third clause"
+    assert split_sentences(text, max_chars=20) == ["first clause,", "second clause,", "third clause"]
+
+
+def test_crossfade_blends_linearly():
+    blended = crossfade(np.ones(5, dtype=np.float32), np.zeros(5, dtype=np.float32))
+    assert blended[0] == 1.0
+    assert blended[-1] == 0.0
+    assert np.all(np.diff(blended) <= 0)
+
+
+def test_pipeline_emits_first_chunk_before_later_chunks_finish():
+    second_started = threading.Event()
+    release_second = threading.Event()
+
+    def generate(chunk):
+        if chunk.startswith("Second"):
+            second_started.set()
+            release_second.wait(5)
+        return np.ones(100, dtype=np.float32)
+
+    pipeline = SentencePipeline(generate, sample_rate=1000, crossfade_ms=10)
+    segments = pipeline.run("First one. Second one.")
+    first = next(segments)
+    # The first chunk is available while the second is still generating
+    assert second_started.wait(5)
+    assert not release_second.is_set()
+    release_second.set()
+    rest = list(segments)
+    total = len(first) + sum(len(segment) for segment in rest)
+    # Two 100-sample chunks overlapped by a 10-sample crossfade
+    assert total == 190
@@ -0,0 +1,64 @@
+import os
+import time
+import pytest
+from src.ai.state_store import FileStateStore, LocalStateStore, create_state_store
+
+
+@pytest.mark.parametrize("make_store", [
+    lambda tmp_path: LocalStateStore(),
+    lambda tmp_path: FileStateStore(str(tmp_path / "state"))
+])
+def test_get_set_delete(tmp_path, make_store):
+    store = make_store(tmp_path)
+    assert store.get("alice") is None
+    store.set("alice", {"exchanges": [["hi", "hello"]]})
+    assert store.get("alice") == {"exchanges": [["hi", "hello"]]}
+    store.delete("alice")
+    store.delete("alice")
+    assert store.get("alice") is None
+
+
+def test_file_store_is_shared_and_confined(tmp_path):
+    writer = FileStateStore(str(tmp_path))
+    reader = FileStateStore(str(tmp_path))
+    writer.set("../../etc/passwd", {"n": 1})
+    assert reader.get("../../etc/passwd") == {"n": 1}
+    assert [path.parent for path in tmp_path.iterdir()] == [tmp_path]
+
+
+def test_entries_expire(tmp_path):
+    store = FileStateStore(str(tmp_path), ttl=0.01)
+    store.set("alice", {})
+    time.sleep(0.05)
+    assert store.get("alice") is None
+    assert not any(tmp_path.iterdir())
+
+
+def test_expired_entries_of_clients_that_never_return_are_swept(tmp_path):
+    store = FileStateStore(str(tmp_path), ttl=60, sweep_interval=0)
+    store.set("gone", {})
+    store.set("active", {})
+    old = time.time() - 120
+    os.utime(store.path_for("gone"), (old, old))
+    (tmp_path / ".crashed.partial").write_text("{")
+    os.utime(tmp_path / ".crashed.partial", (old, old))
+    assert store.sweep() == 2
+    assert [path.name for path in tmp_path.iterdir()] == [store.path_for("active").name]
+
+    # Writes start a sweep in the background
+    os.utime(store.path_for("active"), (old, old))
+    store.sweep_interval = 3600
+    store.set("new", {})
+    deadline = time.time() + 5
+    while store.swept < 3 and time.time() < deadline:
+        time.sleep(0.01)
+    assert not store.path_for("active").exists()
+    assert store.get("new") == {}
+    assert store.swept == 3
+
+
+def test_create_state_store(tmp_path):
+    assert create_state_store("local").name == "local"
+    assert create_state_store("file", str(tmp_path)).name == "file"
+    with pytest.raises(ValueError):
+        create_state_store("redis")
@@ -13,7 +13,7 @@ def test_tts_generation():
     
     # Verify we got a filename back
     assert isinstance(filename, str)
-    assert filename.endswith('.mp3')
+    assert filename.endswith('.wav')
     
     # Check that the file exists
     filepath = os.path.join(tempfile.gettempdir(), filename)
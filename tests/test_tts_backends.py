@@ -0,0 +1,133 @@
+import asyncio
+import os
+import threading
+import pytest
+from src.ai.audio_cache import AudioCache
+from src.ai import dia_model
+from src.ai.dia_model import DiaAgent
+from src.ai.tts_backends import (
+    Pyttsx3Backend, SineBackend, SpeechResult, TTSBackend, available_backends, create_backend,
+    register_backend
+)
+from src.ai.tts_pool import TTSWorkerPool
+
+
+def test_registry_lists_builtin_backends():
+    assert {"pyttsx3", "dia", "sine"} <= set(available_backends())
+    assert isinstance(create_backend("sine"), SineBackend)
+    with pytest.raises(ValueError):
+        create_backend("missing")
+
+
+def test_custom_backends_can_be_registered():
+    @register_backend("silent-test")
+    class SilentBackend(TTSBackend):
+        name = "silent-test"
+
+        def synthesize(self, text, engine=None):
+            return SpeechResult(b"RIFF", "wav", 8000, 1, self.name)
+
+    assert create_backend("silent-test").synthesize("hi").audio == b"RIFF"
+
+
+def test_sine_backend_is_deterministic():
+    backend = SineBackend()
+    first = backend.synthesize("Hello there")
+    assert first == backend.synthesize("Hello there")
+    assert first.codec == "wav"
+    assert first.sample_rate == 16000
+    assert first.audio != backend.synthesize("Goodbye").audio
+
+
+def test_stream_matches_full_render():
+    backend = SineBackend()
+    items = list(backend.stream("abc", chunk_size=1000))
+    assert items[0] == {"codec": "pcm_s16le", "sample_rate": 16000, "channels": 1}
+    pcm = b"".join(items[1:])
+    assert all(len(chunk) <= 1000 for chunk in items[1:])
+    assert backend.synthesize("abc").audio.endswith(pcm)
+
+
+def test_async_variant():
+    result = asyncio.run(SineBackend().asynthesize("hi"))
+    assert result.audio == SineBackend().synthesize("hi").audio
+
+
+def test_generate_speech_uses_the_cache(tmp_path):
+    backend = SineBackend(audio_cache=AudioCache(str(tmp_path)))
+    filename = backend.generate_speech("Hello")
+    assert filename.endswith(".wav")
+    assert backend.cached_speech("Hello") == filename
+    assert backend.audio_path(filename).read_bytes() == backend.synthesize("Hello").audio
+
+
+def test_worker_pool_runs_backends_without_an_engine():
+    pool = TTSWorkerPool(SineBackend(), workers=1, queue_size=2)
+    pool.start()
+    try:
+        items = asyncio.run(_collect(pool.stream("hi")))
+        assert items[0]["codec"] == "pcm_s16le"
+    finally:
+        pool.shutdown()
+
+
+def test_pyttsx3_workers_get_distinct_engines():
+    backend = Pyttsx3Backend(DiaAgent(driver_name="dummy"))
+    assert backend.max_workers is None
+    pool = TTSWorkerPool(backend, workers=2, queue_size=2)
+    # Each job holds its worker until both have started, so both workers answer
+    barrier = threading.Barrier(2)
+
+    def engine_of_worker(engine):
+        barrier.wait(5)
+        return engine
+
+    async def run():
+        return await asyncio.gather(pool.submit(engine_of_worker), pool.submit(engine_of_worker))
+
+    pool.start()
+    try:
+        first, second = asyncio.run(run())
+    finally:
+        pool.shutdown()
+    assert first is not second
+    assert backend.agent.engine not in (first, second)
+
+
+def test_pyttsx3_drivers_with_shared_state_run_one_worker(monkeypatch):
+    engine = dia_model.pyttsx3.Engine
+    # Builds the backend without needing espeak installed
+    monkeypatch.setattr(dia_model.pyttsx3, "Engine", lambda driver_name=None: engine("dummy"))
+    assert Pyttsx3Backend(DiaAgent(driver_name="espeak")).max_workers == 1
+
+
+async def _collect(stream):
+    return [item async for item in stream]
+
+
+def test_dia_agent_writes_wav_files_with_the_shared_naming(tmp_path, monkeypatch):
+    np = pytest.importorskip("numpy")
+    from src.ai.audio_format import detect_container
+    from src.ai.dia_agent import DiaAgent as DiaTTSAgent
+    from src.ai.model_manager import ModelManager
+
+    class FakeModel:
+        def generate(self, prompts, **kwargs):
+            return np.zeros(441, dtype=np.float32)
+
+    class FakeManager(ModelManager):
+        def _load_weights(self):
+            return FakeModel()
+
+    monkeypatch.setattr("tempfile.tempdir", str(tmp_path))
+    agent = DiaTTSAgent(model_manager=FakeManager())
+    first, second = agent.generate_speech("hello"), agent.generate_speech("hello")
+    assert first != second
+    for path in (first, second):
+        name = os.path.basename(path)
+        assert name.startswith("speech_") and name.endswith(".wav")
+        with open(path, "rb") as f:
+            assert detect_container(f.read()) == "wav"
+    agent.cleanup()
+    agent.batcher.shutdown()
+    assert not os.path.exists(first)
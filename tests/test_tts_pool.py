@@ -0,0 +1,111 @@
+import asyncio
+import threading
+import time
+import pytest
+from src.ai.tts_pool import TTSWorkerPool, TTSBusyError
+
+
+class FakeAgent:
+    """Stand-in agent that records which engine rendered each request."""
+
+    def __init__(self, gate=None):
+        self.gate = gate
+        self.engines = []
+
+    def create_engine(self):
+        engine = object()
+        self.engines.append(engine)
+        return engine
+
+    def generate_speech(self, text, engine=None):
+        if self.gate is not None:
+            self.gate.wait(5)
+        return f"{text}:{self.engines.index(engine)}"
+
+
+def test_each_worker_owns_an_engine():
+    agent = FakeAgent()
+    pool = TTSWorkerPool(agent, workers=3, queue_size=4)
+    pool.start()
+    try:
+        async def run():
+            return await asyncio.gather(*(pool.synthesize(f"t{i}") for i in range(4)))
+
+        results = asyncio.run(run())
+        assert [r.split(":")[0] for r in results] == ["t0", "t1", "t2", "t3"]
+        assert len(agent.engines) == 3
+    finally:
+        pool.shutdown()
+
+
+def test_full_queue_raises_busy():
+    gate = threading.Event()
+    agent = FakeAgent(gate)
+    pool = TTSWorkerPool(agent, workers=1, queue_size=1)
+    pool.start()
+    try:
+        async def run():
+            first = pool.synthesize("first")
+            running = asyncio.ensure_future(first)
+            # Wait until the worker picks up the first job
+            while pool.busy == 0:
+                await asyncio.sleep(0.01)
+            queued = asyncio.ensure_future(pool.synthesize("second"))
+            await asyncio.sleep(0)
+            with pytest.raises(TTSBusyError):
+                pool.submit(lambda engine: None)
+            gate.set()
+            return await asyncio.gather(running, queued)
+
+        results = asyncio.run(run())
+        assert results == ["first:0", "second:0"]
+    finally:
+        gate.set()
+        pool.shutdown()
+
+
+class StreamingAgent(FakeAgent):
+    def iter_speech(self, text, engine=None, chunk_size=4):
+        yield {"codec": "pcm_s16le", "sample_rate": 16000, "channels": 1}
+        data = text.encode()
+        for start in range(0, len(data), chunk_size):
+            yield data[start:start + chunk_size]
+
+
+def test_stream_yields_header_then_chunks_in_order():
+    pool = TTSWorkerPool(StreamingAgent(), workers=1, queue_size=1)
+    pool.start()
+    try:
+        async def run():
+            return [item async for item in pool.stream("abcdefghij", chunk_size=4)]
+
+        items = asyncio.run(run())
+        assert items[0]["codec"] == "pcm_s16le"
+        assert items[1:] == [b"abcd", b"efgh", b"ij"]
+    finally:
+        pool.shutdown()
+
+
+def test_closing_a_stream_frees_the_worker():
+    class SlowAgent(StreamingAgent):
+        def iter_speech(self, text, engine=None, chunk_size=4):
+            for item in super().iter_speech(text, engine, chunk_size):
+                time.sleep(0.01)
+                yield item
+
+    pool = TTSWorkerPool(SlowAgent(), workers=1, queue_size=1)
+    pool.start()
+    try:
+        async def run():
+            stream = pool.stream("x" * 4000, chunk_size=4)
+            async for item in stream:
+                if isinstance(item, bytes):
+                    break
+            await stream.aclose()
+            # The worker stops at the next chunk and takes the next job
+            return await asyncio.wait_for(pool.synthesize("next"), timeout=1)
+
+        assert asyncio.run(run()) == "next:0"
+        assert pool.cancelled == 1
+    finally:
+        pool.shutdown()
@@ -0,0 +1,52 @@
+import asyncio
+import pytest
+from src.ai import dia_model
+from src.ai.dia_model import DiaAgent
+from src.ai.tts_pool import TTSBusyError
+from src.ai.warmup import TemplateWarmup
+
+
+class FakeEngine:
+    def getProperty(self, name):
+        return []
+
+    def setProperty(self, name, value):
+        pass
+
+
+@pytest.fixture
+def agent(monkeypatch):
+    monkeypatch.setattr(dia_model.pyttsx3, "Engine", lambda driver_name=None: FakeEngine())
+    return DiaAgent()
+
+
+def test_response_templates_cover_every_reply(agent):
+    templates = agent.response_templates()
+    expected = len(agent.greetings) + 3 + sum(
+        len(acknowledgments) * len(set(follow_ups + clarifications))
+        for acknowledgments, follow_ups, clarifications in agent.tones.values()
+    )
+    assert len(templates) == expected
+    for message in ["hello", "who are you", "bye", "thanks", "tell me about the weather today please"]:
+        for sentiment in [None, "positive", "neutral", "negative"]:
+            assert agent.process_message(message, sentiment=sentiment) in templates
+
+
+def test_warmup_retries_when_busy_and_reports_progress():
+    calls = []
+
+    async def synthesize(text):
+        calls.append(text)
+        if len(calls) == 1:
+            raise TTSBusyError("full")
+        if text == "bad":
+            raise RuntimeError("boom")
+        return text
+
+    warmup = TemplateWarmup(["a", "bad", "c"], retry_delay=0)
+    assert warmup.progress()["status"] == "pending"
+    asyncio.run(warmup.run(synthesize))
+    assert calls == ["a", "a", "bad", "c"]
+    assert warmup.progress() == {
+        "status": "done", "total": 3, "completed": 2, "failed": 1, "progress": 1.0
+    }